@@ -0,0 +1,123 @@
+-- Harvest Med Waste — Compact Score History
+-- Migration 003: Change-only, monthly-partitioned lead_score_history
+--
+-- A history row is written only when a lead's score, tier or one of its
+-- breakdown components changes (tools/db.py save_scores compares against
+-- leads.score_breakdown, the lead's current breakdown).
+--
+-- Breakdowns are SMALLINT[5] in tenths of a point, in this order:
+--   waste_volume, facility_type, proximity, opportunity, data_confidence
+-- e.g. {250,300,120,75,105} = 25, 30, 12, 7.5, 10.5
+--
+-- Partitions cover one calendar month each (lead_score_history_YYYY_MM).
+-- ensure_score_history_partition() creates them ahead of writes and
+-- drop_score_history_partitions() enforces the retention window.
+
+-- Current breakdown per lead: the baseline for change detection
+ALTER TABLE leads ADD COLUMN IF NOT EXISTS score_breakdown SMALLINT[];
+
+-- Create the partition holding `month` if it doesn't exist yet
+CREATE OR REPLACE FUNCTION ensure_score_history_partition(month DATE) RETURNS VOID AS $$
+DECLARE
+    start_date DATE := date_trunc('month', month)::DATE;
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF lead_score_history FOR VALUES FROM (%L) TO (%L)',
+        'lead_score_history_' || to_char(start_date, 'YYYY_MM'),
+        start_date, (start_date + INTERVAL '1 month')::DATE);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Drop partitions entirely older than the last `keep_months` months
+-- (the current month counts as one; at least 1). Returns the number dropped.
+CREATE OR REPLACE FUNCTION drop_score_history_partitions(keep_months INTEGER) RETURNS INTEGER AS $$
+DECLARE
+    cutoff DATE := (date_trunc('month', NOW()) - make_interval(months => keep_months - 1))::DATE;
+    part RECORD;
+    dropped INTEGER := 0;
+BEGIN
+    IF keep_months IS NULL OR keep_months < 1 THEN
+        RAISE EXCEPTION 'keep_months must be at least 1, got %', keep_months;
+    END IF;
+    FOR part IN
+        SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'lead_score_history'::REGCLASS
+          AND c.relname ~ '_\d{4}_\d{2}$'
+    LOOP
+        IF to_date(right(part.relname, 7), 'YYYY_MM') < cutoff THEN
+            EXECUTE format('DROP TABLE %I', part.relname);
+            dropped := dropped + 1;
+        END IF;
+    END LOOP;
+    RETURN dropped;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Convert the JSONB history table (skipped if already partitioned)
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_partitioned_table
+               WHERE partrelid = 'lead_score_history'::REGCLASS) THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE lead_score_history RENAME TO lead_score_history_v1;
+    DROP INDEX IF EXISTS idx_lead_score_history_lead_id;
+
+    CREATE TABLE lead_score_history (
+        lead_id         INTEGER NOT NULL REFERENCES leads(id) ON DELETE CASCADE,
+        scored_at       TIMESTAMP NOT NULL DEFAULT NOW(),
+        score           SMALLINT,
+        priority_tier   VARCHAR(10),
+        breakdown       SMALLINT[]
+    ) PARTITION BY RANGE (scored_at);
+
+    -- Trajectory lookups: one lead's rows, newest first, in each partition
+    CREATE INDEX idx_lead_score_history_lead_scored ON lead_score_history(lead_id, scored_at DESC);
+
+    PERFORM ensure_score_history_partition(m::DATE)
+    FROM generate_series(
+        date_trunc('month', LEAST(COALESCE((SELECT MIN(scored_at) FROM lead_score_history_v1), NOW()), NOW())),
+        date_trunc('month', GREATEST(COALESCE((SELECT MAX(scored_at) FROM lead_score_history_v1), NOW()), NOW())),
+        INTERVAL '1 month') AS m;
+
+    -- Keep only the old rows that changed something since the lead's previous row
+    INSERT INTO lead_score_history (lead_id, scored_at, score, priority_tier, breakdown)
+    SELECT lead_id, scored_at, score, priority_tier, breakdown
+    FROM (
+        SELECT lead_id, scored_at, score, priority_tier, breakdown,
+               LAG(score) OVER w AS previous_score,
+               LAG(priority_tier) OVER w AS previous_tier,
+               LAG(breakdown) OVER w AS previous_breakdown,
+               ROW_NUMBER() OVER w AS n
+        FROM (
+            SELECT lead_id, COALESCE(scored_at, NOW()) AS scored_at, score, priority_tier,
+                   ARRAY[
+                       ROUND(COALESCE((score_breakdown->>'waste_volume')::NUMERIC, 0) * 10),
+                       ROUND(COALESCE((score_breakdown->>'facility_type')::NUMERIC, 0) * 10),
+                       ROUND(COALESCE((score_breakdown->>'proximity')::NUMERIC, 0) * 10),
+                       ROUND(COALESCE((score_breakdown->>'opportunity')::NUMERIC, 0) * 10),
+                       ROUND(COALESCE((score_breakdown->>'data_confidence')::NUMERIC, 0) * 10)
+                   ]::SMALLINT[] AS breakdown
+            FROM lead_score_history_v1
+            WHERE lead_id IS NOT NULL
+        ) converted
+        WINDOW w AS (PARTITION BY lead_id ORDER BY scored_at)
+    ) ordered
+    WHERE n = 1
+       OR (previous_score, previous_tier, previous_breakdown)
+          IS DISTINCT FROM (score, priority_tier, breakdown);
+
+    UPDATE leads SET score_breakdown = latest.breakdown
+    FROM (
+        SELECT DISTINCT ON (lead_id) lead_id, breakdown
+        FROM lead_score_history
+        ORDER BY lead_id, scored_at DESC
+    ) latest
+    WHERE leads.id = latest.lead_id;
+
+    DROP TABLE lead_score_history_v1;
+END $$;
+
+SELECT ensure_score_history_partition(CURRENT_DATE);
+SELECT ensure_score_history_partition((CURRENT_DATE + INTERVAL '1 month')::DATE);
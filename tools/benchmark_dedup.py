@@ -0,0 +1,430 @@
+"""
+benchmark_dedup.py — Synthetic benchmark for the deduplication engine.
+
+Generates a reproducible set of normalized records shaped like the real
+Alabama data (dense Birmingham ZIPs, common name tokens, near-duplicate
+records with typos) and measures the fuzzy-matching pass:
+  - candidate pairs produced by blocking vs. the exhaustive pair count
+  - recall of blocked matching against exhaustive pairwise matching
+  - wall time of both approaches
+  - wall time and lead counts of a full deduplicate() over the same records,
+    and with --workers N its speedup on an N-process pool
+  - that incremental dedup from an empty master index gives the same
+    leads as a rebuild (exit status 1 if not)
+
+With --memory it instead measures the record footprint as plain dicts vs.
+compact LeadRecords, and peak memory of a full deduplicate() run, at
+--scale times the record count (default 10x, i.e. 200k records).
+
+With --audit it times a full deduplicate() with and without the match
+audit log (median of --repeats interleaved runs) and reports the logging
+overhead.
+
+Usage:
+    python tools/benchmark_dedup.py
+    python tools/benchmark_dedup.py --records 50000 --seed 7
+    python tools/benchmark_dedup.py --workers 4
+    python tools/benchmark_dedup.py --memory --scale 10
+    python tools/benchmark_dedup.py --audit --repeats 5
+"""
+
+import gc
+import io
+import os
+import json
+import sys
+import time
+import random
+import argparse
+import resource
+import statistics
+import tempfile
+import tracemalloc
+import contextlib
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.normalize import normalize_address, normalize_name
+from tools.deduplicate import (
+    FUZZY_NAME_THRESHOLD, FUZZY_ADDRESS_THRESHOLD, fuzzy_match_pairs, deduplicate,
+    deduplicate_incremental, MasterIndex,
+)
+from tools.lead_record import LeadRecord
+from tools.match_audit import MatchAuditLog
+
+SURNAMES = [
+    "SMITH", "JOHNSON", "WILLIAMS", "BROWN", "JONES", "DAVIS", "MILLER",
+    "WILSON", "MOORE", "TAYLOR", "ANDERSON", "THOMAS", "JACKSON", "WHITE",
+    "HARRIS", "MARTIN", "THOMPSON", "GARCIA", "ROBINSON", "CLARK", "LEWIS",
+    "WALKER", "HALL", "ALLEN", "YOUNG", "KING", "WRIGHT", "HILL", "SCOTT",
+    "GREEN", "ADAMS", "BAKER", "NELSON", "CARTER", "MITCHELL", "ROBERTS",
+]
+
+PLACE_WORDS = [
+    "BIRMINGHAM", "HOMEWOOD", "HOOVER", "VESTAVIA", "MOUNTAIN BROOK",
+    "TRUSSVILLE", "CAHABA", "RED MOUNTAIN", "SOUTHSIDE", "GREYSTONE",
+    "RIVERCHASE", "LIBERTY PARK", "FIVE POINTS", "OAK MOUNTAIN",
+]
+
+FACILITY_SUFFIXES = [
+    ("DENTAL", "Dental"), ("FAMILY DENTISTRY", "Dental"),
+    ("ANIMAL HOSPITAL", "Veterinary"), ("VETERINARY CLINIC", "Veterinary"),
+    ("URGENT CARE", "Urgent Care"), ("FAMILY MEDICINE", "Medical Practice"),
+    ("PEDIATRICS", "Medical Practice"), ("INTERNAL MEDICINE", "Medical Practice"),
+    ("SURGERY CENTER", "Surgery Center"), ("DIALYSIS", "Dialysis"),
+    ("PHARMACY", "Pharmacy"), ("PODIATRY", "Podiatry"), ("MEDICAL SPA", "Medical Spa"),
+]
+
+STREETS = [
+    "MAIN ST", "UNIVERSITY BLVD", "HIGHWAY 280", "MONTGOMERY HWY",
+    "LORNA RD", "VALLEYDALE RD", "GREEN SPRINGS HWY", "20TH ST S",
+    "CAHABA RD", "OXMOOR RD", "LAKESHORE PKWY", "CHESTNUT ST",
+    "PARK PL", "OAK GROVE RD", "FIELDSTOWN RD", "ACTON RD",
+]
+
+CITIES = ["BIRMINGHAM", "HOOVER", "HOMEWOOD", "VESTAVIA HILLS", "TRUSSVILLE",
+          "HUNTSVILLE", "MONTGOMERY", "MOBILE", "TUSCALOOSA", "DOTHAN"]
+
+# Share of records that land in one of the dense Birmingham ZIPs
+DENSE_ZIP_SHARE = 0.35
+DENSE_ZIPS = ["35205", "35209", "35216", "35243", "35244"]
+
+
+def _typo(text, rng):
+    """Introduce one character-level typo (drop, swap, or replace)."""
+    if len(text) < 4:
+        return text
+    pos = rng.randrange(1, len(text) - 2)
+    kind = rng.random()
+    if kind < 0.4:
+        return text[:pos] + text[pos + 1:]
+    if kind < 0.8:
+        return text[:pos] + text[pos + 1] + text[pos] + text[pos + 2:]
+    return text[:pos] + rng.choice("AEIOURSTNL") + text[pos + 1:]
+
+
+def make_synthetic_records(count, seed=42, duplicate_rate=0.15):
+    """Build `count` normalized records, about `duplicate_rate` of them
+    near-duplicates of another record (typo'd name/address, other source).
+
+    NPI and license numbers are left blank so every record reaches the
+    fuzzy pass.
+    """
+    rng = random.Random(seed)
+    zip_pool = [f"{rng.randint(35000, 36999):05d}" for _ in range(400)]
+    records = []
+
+    while len(records) < count:
+        suffix, facility_type = rng.choice(FACILITY_SUFFIXES)
+        stem = rng.choice(SURNAMES) if rng.random() < 0.6 else rng.choice(PLACE_WORDS)
+        name = f"{stem} {suffix}"
+        address = f"{rng.randint(1, 9999)} {rng.choice(STREETS)}"
+        zip5 = rng.choice(DENSE_ZIPS) if rng.random() < DENSE_ZIP_SHARE else rng.choice(zip_pool)
+        city = rng.choice(CITIES)
+
+        variants = [(name, address, "npi")]
+        if rng.random() < duplicate_rate:
+            dup_name = _typo(name, rng) if rng.random() < 0.7 else name + " LLC"
+            dup_addr = _typo(address, rng) if rng.random() < 0.5 else address.replace(" ST", " STREET")
+            variants.append((dup_name, dup_addr, rng.choice(["adph", "cms"])))
+
+        for v_name, v_addr, source in variants:
+            i = len(records)
+            records.append({
+                "source": source,
+                "source_id": f"{source}-syn{i}",
+                "facility_name": v_name.title(),
+                "facility_type": facility_type,
+                "address_line1": v_addr.title(),
+                "address_line2": "",
+                "city": city.title(),
+                "state": "AL",
+                "zip5": zip5,
+                "county": "",
+                "phone": "",
+                "fax": "",
+                "administrator": "",
+                "npi_number": "",
+                "license_number": "",
+                "taxonomy_code": "",
+                "entity_type": "NPI-2",
+                "_norm_name": normalize_name(v_name),
+                "_norm_address": normalize_address(v_addr),
+            })
+
+    return records[:count]
+
+
+def exhaustive_match_pairs(names, addresses):
+    """Reference matcher: compare every pair in the block (pre-blocking pass 4)."""
+    from rapidfuzz import fuzz
+
+    matches = set()
+    for i in range(len(names)):
+        for j in range(i + 1, len(names)):
+            name_sim = fuzz.ratio(names[i], names[j]) / 100.0
+            addr_sim = fuzz.ratio(addresses[i], addresses[j]) / 100.0
+            if name_sim > FUZZY_NAME_THRESHOLD and addr_sim > FUZZY_ADDRESS_THRESHOLD:
+                matches.add((i, j))
+    return matches
+
+
+def benchmark_fuzzy_pass(records, compare_exhaustive=True):
+    """Run the fuzzy pass over ZIP blocks and report reduction and recall."""
+    zip_blocks = defaultdict(list)
+    for rec in records:
+        zip_blocks[rec["zip5"]].append(rec)
+
+    exhaustive_pairs = 0
+    candidate_pairs = 0
+    blocked_matches = 0
+    exhaustive_matches = 0
+    recalled = 0
+    blocked_time = 0.0
+    exhaustive_time = 0.0
+
+    for block in zip_blocks.values():
+        names = [r["_norm_name"] for r in block]
+        addresses = [r["_norm_address"] for r in block]
+        exhaustive_pairs += len(block) * (len(block) - 1) // 2
+
+        start = time.perf_counter()
+        matches, candidates = fuzzy_match_pairs(names, addresses)
+        blocked_time += time.perf_counter() - start
+        candidate_pairs += candidates
+        blocked_matches += len(matches)
+
+        if compare_exhaustive:
+            start = time.perf_counter()
+            reference = exhaustive_match_pairs(names, addresses)
+            exhaustive_time += time.perf_counter() - start
+            exhaustive_matches += len(reference)
+            recalled += len(reference & matches)
+
+    result = {
+        "records": len(records),
+        "zip_blocks": len(zip_blocks),
+        "largest_block": max((len(b) for b in zip_blocks.values()), default=0),
+        "exhaustive_pairs": exhaustive_pairs,
+        "candidate_pairs": candidate_pairs,
+        "pair_reduction": 1 - candidate_pairs / exhaustive_pairs if exhaustive_pairs else 0.0,
+        "blocked_matches": blocked_matches,
+        "blocked_seconds": round(blocked_time, 3),
+    }
+    if compare_exhaustive:
+        result["exhaustive_matches"] = exhaustive_matches
+        result["recall"] = recalled / exhaustive_matches if exhaustive_matches else 1.0
+        result["exhaustive_seconds"] = round(exhaustive_time, 3)
+    return result
+
+
+def benchmark_pipeline(records, workers=1):
+    """Time a full deduplicate() run, where pass 4 sees every record that
+    has no NPI, license or exact same-name partner at its address.
+
+    With workers > 1 it is run a second time with the per-ZIP process pool
+    and the two lead lists are compared.
+    """
+    def run(n):
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            merged, _ = deduplicate([dict(r) for r in records], workers=n)
+        return merged, time.perf_counter() - start
+
+    merged, elapsed = run(1)
+    result = {
+        "leads": len(merged),
+        "multi_source": sum(1 for lead in merged if len(lead.get("sources", [])) > 1),
+        "seconds": round(elapsed, 2),
+    }
+    if workers > 1:
+        pooled, pooled_elapsed = run(workers)
+        result["pooled_seconds"] = round(pooled_elapsed, 2)
+        result["speedup"] = elapsed / pooled_elapsed
+        result["identical"] = pooled == merged
+    return result
+
+
+def benchmark_incremental(records):
+    """Check that deduplicate_incremental() from an empty master index
+    gives the same leads as a rebuild, and time both."""
+    def lead_groups(leads):
+        return {(lead["lead_uid"], frozenset(src["source_id"] for src in lead["sources"]))
+                for lead in leads}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        empty_file = os.path.join(tmp, "empty_index.json")
+        MasterIndex().save(empty_file)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            incremental, _, _, _ = deduplicate_incremental([dict(r) for r in records],
+                                                           index_file=empty_file)
+            incremental_time = time.perf_counter() - start
+            start = time.perf_counter()
+            rebuilt, _, _, _ = deduplicate_incremental([dict(r) for r in records], rebuild=True,
+                                                       index_file=os.path.join(tmp, "rebuilt_index.json"))
+            rebuild_time = time.perf_counter() - start
+
+    return {
+        "incremental_leads": len(incremental),
+        "incremental_multi_source": sum(1 for lead in incremental if len(lead["sources"]) > 1),
+        "incremental_seconds": round(incremental_time, 2),
+        "rebuild_leads": len(rebuilt),
+        "rebuild_multi_source": sum(1 for lead in rebuilt if len(lead["sources"]) > 1),
+        "rebuild_seconds": round(rebuild_time, 2),
+        "identical": lead_groups(incremental) == lead_groups(rebuilt),
+    }
+
+
+def benchmark_memory(count, seed=42):
+    """Measure record footprint (dict vs LeadRecord) and dedup peak memory."""
+    # Round-trip through JSON so every value is its own string object, as
+    # when the pipeline loads .tmp/normalized_records.json
+    payload = json.dumps(make_synthetic_records(count, seed=seed))
+
+    tracemalloc.start()
+    records = json.loads(payload)
+    del payload
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+
+    for i, rec in enumerate(records):
+        records[i] = LeadRecord.from_dict(rec)
+    compact_bytes = tracemalloc.get_traced_memory()[0]
+
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        merged, _ = deduplicate(records)
+    elapsed = time.perf_counter() - start
+    dedup_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {
+        "records": count,
+        "dict_mb": dict_bytes / 1e6,
+        "compact_mb": compact_bytes / 1e6,
+        "dedup_peak_mb": dedup_peak / 1e6,
+        "dedup_seconds": round(elapsed, 1),
+        "leads": len(merged),
+        # ru_maxrss is KB on Linux
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3,
+    }
+
+
+def benchmark_audit(records, repeats=5):
+    """Time deduplicate() with and without the audit log (median of `repeats`)."""
+    def run(audit):
+        # CPU time rather than wall time: the difference being measured is
+        # small, and wall time on a shared machine swamps it
+        gc.collect()
+        start = time.process_time()
+        with contextlib.redirect_stdout(io.StringIO()):
+            deduplicate([dict(r) for r in records], audit=audit)
+        return time.process_time() - start
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = os.path.join(tmp, "audit.jsonl")
+        plain = []
+        audited = []
+        # Interleave runs so drift (thermal, cache) hits both sides equally
+        for _ in range(repeats):
+            plain.append(run(None))
+            audited.append(run(MatchAuditLog(log_path)))
+        with open(log_path) as f:
+            events = sum(1 for _ in f)
+        log_bytes = os.path.getsize(log_path)
+
+    plain_median = statistics.median(plain)
+    audit_median = statistics.median(audited)
+    return {
+        "plain_seconds": round(plain_median, 3),
+        "audit_seconds": round(audit_median, 3),
+        "overhead": audit_median / plain_median - 1,
+        "events_per_run": events // repeats,
+        "log_kb_per_run": log_bytes / repeats / 1e3,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dedup fuzzy-matching pass")
+    parser.add_argument("--records", type=int, default=20000, help="Number of synthetic records")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed")
+    parser.add_argument("--skip-exhaustive", action="store_true",
+                        help="Skip the pairwise reference run (no recall figure)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Also time deduplicate() on this many processes (0 = all cores)")
+    parser.add_argument("--memory", action="store_true",
+                        help="Measure record/dedup memory instead of the fuzzy pass")
+    parser.add_argument("--scale", type=int, default=10,
+                        help="Record multiplier for --memory (default 10x)")
+    parser.add_argument("--audit", action="store_true",
+                        help="Measure match audit log overhead on a full deduplicate()")
+    parser.add_argument("--repeats", type=int, default=5,
+                        help="Runs per side for --audit (default 5)")
+    args = parser.parse_args()
+
+    if args.audit:
+        print("Harvest Med Waste — Dedup Audit Log Benchmark")
+        print(f"  Synthetic records: {args.records:,} (seed {args.seed}, median of {args.repeats})")
+        print()
+        r = benchmark_audit(make_synthetic_records(args.records, seed=args.seed), args.repeats)
+        print(f"  deduplicate():          {r['plain_seconds']}s CPU")
+        print(f"  deduplicate() + audit:  {r['audit_seconds']}s CPU ({r['overhead']:+.1%})")
+        print(f"  Events per run:         {r['events_per_run']:,} ({r['log_kb_per_run']:,.0f} KB)")
+        return
+
+    if args.memory:
+        count = args.records * args.scale
+        print("Harvest Med Waste — Dedup Memory Benchmark")
+        print(f"  Synthetic records: {count:,} ({args.scale}x, seed {args.seed})")
+        print()
+        r = benchmark_memory(count, seed=args.seed)
+        print(f"  Records as dicts:       {r['dict_mb']:,.1f} MB")
+        print(f"  Records as LeadRecord:  {r['compact_mb']:,.1f} MB "
+              f"({1 - r['compact_mb'] / r['dict_mb']:.0%} smaller)")
+        print(f"  deduplicate() peak:     {r['dedup_peak_mb']:,.1f} MB traced "
+              f"({r['leads']:,} leads in {r['dedup_seconds']}s)")
+        print(f"  Process max RSS:        {r['max_rss_mb']:,.1f} MB")
+        return
+
+    print("Harvest Med Waste — Dedup Benchmark")
+    print(f"  Synthetic records: {args.records:,} (seed {args.seed})")
+    print()
+
+    records = make_synthetic_records(args.records, seed=args.seed)
+    r = benchmark_fuzzy_pass(records, compare_exhaustive=not args.skip_exhaustive)
+
+    print("--- Fuzzy Pass (blocked) ---")
+    print(f"  ZIP blocks: {r['zip_blocks']} (largest {r['largest_block']:,} records)")
+    print(f"  Exhaustive pairs: {r['exhaustive_pairs']:,}")
+    print(f"  Candidate pairs:  {r['candidate_pairs']:,} "
+          f"({r['pair_reduction']:.1%} reduction)")
+    print(f"  Matches found:    {r['blocked_matches']:,} in {r['blocked_seconds']}s")
+    if "recall" in r:
+        print(f"  Exhaustive:       {r['exhaustive_matches']:,} matches in {r['exhaustive_seconds']}s")
+        print(f"  Recall:           {r['recall']:.2%}")
+
+    r = benchmark_pipeline(records, workers=args.workers or os.cpu_count() or 1)
+    print()
+    print("--- Full deduplicate() ---")
+    print(f"  Leads: {r['leads']:,} ({r['multi_source']:,} multi-source) in {r['seconds']}s")
+    if "speedup" in r:
+        print(f"  {args.workers or os.cpu_count()} workers: {r['pooled_seconds']}s "
+              f"({r['speedup']:.2f}x, {'identical' if r['identical'] else 'DIFFERENT'} leads)")
+
+    r = benchmark_incremental(records)
+    print()
+    print("--- Incremental vs. rebuild ---")
+    print(f"  From empty index: {r['incremental_leads']:,} leads "
+          f"({r['incremental_multi_source']:,} multi-source) in {r['incremental_seconds']}s")
+    print(f"  Rebuild:          {r['rebuild_leads']:,} leads "
+          f"({r['rebuild_multi_source']:,} multi-source) in {r['rebuild_seconds']}s")
+    print(f"  Lead groups and uids: {'identical' if r['identical'] else 'DIFFERENT'}")
+    if not r["identical"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
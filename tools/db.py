@@ -8,6 +8,7 @@ Usage:
     from tools.db import get_conn, execute, fetch_all, fetch_one
 """
 
+import io
 import os
 import json
 import psycopg2
@@ -126,14 +127,133 @@ def upsert_lead_source(lead_id, source, source_id, raw_data=None, confidence=Non
         cur.execute(sql, (lead_id, source, source_id, raw_json, confidence))
 
 
+def delete_leads(lead_uids):
+    """Delete leads by lead_uid. Their sources and score history cascade.
+
+    Returns the number of leads deleted.
+    """
+    if not lead_uids:
+        return 0
+    return execute("DELETE FROM leads WHERE lead_uid = ANY(%s)", (list(lead_uids),))
+
+
+# Score history breakdown arrays: components in this order, in tenths of
+# a point (same order as tools/score_engine.py COMPONENTS)
+SCORE_BREAKDOWN_COMPONENTS = ("waste_volume", "facility_type", "proximity", "opportunity", "data_confidence")
+
+# Months of score history kept; older monthly partitions are dropped
+SCORE_HISTORY_RETENTION_MONTHS = int(os.environ.get("SCORE_HISTORY_RETENTION_MONTHS", "24"))
+
+
+def pack_breakdown(breakdown):
+    """Score breakdown dict → list of tenths in SCORE_BREAKDOWN_COMPONENTS order."""
+    return [round(breakdown.get(name, 0) * 10) for name in SCORE_BREAKDOWN_COMPONENTS]
+
+
+def unpack_breakdown(values):
+    """Stored breakdown array → score breakdown dict."""
+    if values is None:
+        return {}
+    return {name: (v // 10 if v % 10 == 0 else v / 10)
+            for name, v in zip(SCORE_BREAKDOWN_COMPONENTS, values)}
+
+
 def record_score_history(lead_id, score, tier, breakdown):
-    """Record a lead score snapshot."""
+    """Set one lead's score, recording it in the history if it changed.
+
+    Goes through save_scores() so the lead row, which change detection
+    compares against, and its history stay in step. Returns True if the
+    lead changed.
+    """
+    return save_scores([(lead_id, score, tier, breakdown)]) > 0
+
+
+def fetch_score_trajectory(lead_id, since=None):
+    """A lead's score history, oldest first, with breakdowns as dicts.
+
+    Rows exist only where the score, tier or a component changed. `since`
+    (a date) limits the scan to the partitions from that month on.
+    """
     sql = """
-        INSERT INTO lead_score_history (lead_id, score, priority_tier, score_breakdown)
-        VALUES (%s, %s, %s, %s)
+        SELECT scored_at, score, priority_tier, breakdown
+        FROM lead_score_history
+        WHERE lead_id = %s AND scored_at >= %s
+        ORDER BY scored_at
+    """
+    rows = fetch_all(sql, (lead_id, since or "-infinity"))
+    for row in rows:
+        row["breakdown"] = unpack_breakdown(row["breakdown"])
+    return rows
+
+
+def prune_score_history(retention_months=SCORE_HISTORY_RETENTION_MONTHS):
+    """Drop score history partitions outside the retention window.
+
+    Also creates next month's partition so writes never wait on DDL.
+    `retention_months` counts the current month and must be at least 1.
+    Returns the number of partitions dropped.
     """
+    if retention_months < 1:
+        raise ValueError(f"retention_months must be at least 1, got {retention_months}")
     with get_cursor() as cur:
-        cur.execute(sql, (lead_id, score, tier, json.dumps(breakdown)))
+        cur.execute("SELECT ensure_score_history_partition((CURRENT_DATE + INTERVAL '1 month')::DATE)")
+        cur.execute("SELECT drop_score_history_partitions(%s) AS dropped", (retention_months,))
+        return cur.fetchone()["dropped"]
+
+
+def _copy_value(value):
+    """One field in COPY text format."""
+    if value is None:
+        return "\\N"
+    text = str(value)
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _copy_buffer(rows):
+    """Rows of values → a file-like buffer for COPY ... FROM STDIN."""
+    return io.StringIO("".join("\t".join(_copy_value(v) for v in row) + "\n" for row in rows))
+
+
+def save_scores(scores):
+    """Write changed lead scores and their score history in one transaction.
+
+    `scores` is a list of (lead_id, score, tier, breakdown). The scores
+    are COPYed into a temp table; a single UPDATE ... FROM applies those
+    whose score, tier or breakdown differs from the lead's current values
+    and feeds the same rows into lead_score_history, so unchanged leads
+    write nothing. Returns the number of leads changed.
+    """
+    with get_cursor() as cur:
+        cur.execute("SELECT ensure_score_history_partition(CURRENT_DATE)")
+        cur.execute("""
+            CREATE TEMP TABLE score_updates (
+                id INTEGER PRIMARY KEY,
+                lead_score INTEGER,
+                priority_tier VARCHAR(10),
+                breakdown SMALLINT[]
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert(
+            "COPY score_updates (id, lead_score, priority_tier, breakdown) FROM STDIN",
+            _copy_buffer((lead_id, score, tier, "{%s}" % ",".join(map(str, pack_breakdown(breakdown))))
+                         for lead_id, score, tier, breakdown in scores))
+        cur.execute("""
+            WITH changed AS (
+                UPDATE leads SET
+                    lead_score = u.lead_score,
+                    priority_tier = u.priority_tier,
+                    score_breakdown = u.breakdown,
+                    last_updated = NOW()
+                FROM score_updates u
+                WHERE leads.id = u.id
+                  AND (leads.lead_score, leads.priority_tier, leads.score_breakdown)
+                      IS DISTINCT FROM (u.lead_score, u.priority_tier, u.breakdown)
+                RETURNING leads.id, u.lead_score, u.priority_tier, u.breakdown
+            )
+            INSERT INTO lead_score_history (lead_id, score, priority_tier, breakdown)
+            SELECT id, lead_score, priority_tier, breakdown FROM changed
+        """)
+        return cur.rowcount
 
 
 def start_pipeline_run():
@@ -0,0 +1,360 @@
+"""
+dedup_external.py — Spill-to-disk deduplication for multi-state / national data.
+
+deduplicate() keeps every record and all match indexes in memory, which
+does not fit national NPI volumes on a small box. This module runs the
+same match hierarchy with bounded memory:
+  1. Stream the normalized JSON array into an on-disk SQLite shard store,
+     partitioned by 3-digit ZIP. ZIP3 areas larger than the memory budget
+     are re-split into 5-digit ZIP shards.
+  2. Deduplicate one shard at a time with match_groups() and spill the
+     resulting groups (plus their NPI / license keys) back to SQLite.
+  3. Merge groups that share an NPI or license number across shards with
+     a GROUP BY over the spilled keys.
+  4. Stream merged leads shard by shard to the output JSON array.
+
+Address, fuzzy and phone matches never cross a shard boundary. Exact
+address and fuzzy matching are ZIP-bound already; the phone and
+cross-ZIP street passes lose only pairs that span 3-digit ZIP areas (or
+5-digit ZIPs inside a re-split ZIP3).
+
+Usage:
+    python tools/deduplicate.py --external
+    python tools/deduplicate.py --external --memory-budget-mb 2048 --workers 0
+"""
+
+import json
+import os
+import sqlite3
+import sys
+from collections import defaultdict
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.deduplicate import (
+    MatchEntry,
+    audit_leads,
+    drop_individuals_at_org_addresses,
+    match_groups,
+    merge_records,
+    print_dedup_summary,
+)
+from tools.lead_record import LeadRecord
+from tools.match_audit import MatchAuditLog, record_id
+
+SHARD_DB_FILE = os.path.join(PROJECT_ROOT, ".tmp", "dedup_shards.db")
+DEFAULT_MEMORY_BUDGET_MB = 1024
+# Peak bytes per record while deduplicating a shard (records, indexes,
+# groups and merged leads), measured with tools/benchmark_dedup.py --memory
+BYTES_PER_RECORD_ESTIMATE = 2500
+INSERT_BATCH_SIZE = 10000
+READ_CHUNK_SIZE = 1 << 20
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    id INTEGER PRIMARY KEY,
+    shard TEXT NOT NULL,
+    zip5 TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS groups (
+    id INTEGER PRIMARY KEY,
+    shard TEXT NOT NULL,
+    members TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS group_keys (
+    key TEXT NOT NULL,
+    group_id INTEGER NOT NULL,
+    record_id TEXT NOT NULL
+);
+"""
+
+
+def iter_json_array(path, chunk_size=READ_CHUNK_SIZE):
+    """Yield the elements of a top-level JSON array without loading the file."""
+    decoder = json.JSONDecoder()
+    with open(path) as f:
+        buf = f.read(chunk_size)
+        pos = buf.index("[") + 1
+        while True:
+            # Skip separators, refilling the buffer as needed
+            while True:
+                while pos < len(buf) and buf[pos] in " \t\r\n,":
+                    pos += 1
+                if pos < len(buf):
+                    break
+                more = f.read(chunk_size)
+                if not more:
+                    return
+                buf, pos = more, 0
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                more = f.read(chunk_size)
+                if not more:
+                    raise
+                buf, pos = buf[pos:] + more, 0
+                continue
+            yield obj
+            pos = end
+            if pos > chunk_size:
+                buf, pos = buf[pos:], 0
+
+
+def _shard_capacity(memory_budget_mb):
+    return max(1, int(memory_budget_mb * 1024 * 1024 / BYTES_PER_RECORD_ESTIMATE))
+
+
+def _find(parent, x):
+    root = x
+    while parent.get(root, root) != root:
+        root = parent[root]
+    while parent.get(x, x) != root:
+        parent[x], x = root, parent[x]
+    return root
+
+
+class ShardStore:
+    """On-disk record and group store backing the external dedup."""
+
+    def __init__(self, path=SHARD_DB_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            os.remove(path)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.executescript(SCHEMA)
+
+    def close(self, keep=False):
+        self.conn.close()
+        if not keep and os.path.exists(self.path):
+            os.remove(self.path)
+
+    # ── Partitioning ───────────────────────────────────────────
+
+    def spill_records(self, records):
+        """Write records to the store keyed by ZIP3. Returns the count."""
+        count = 0
+        batch = []
+        for rec in records:
+            if isinstance(rec, LeadRecord):
+                rec = rec.to_dict()
+            zip5 = (rec.get("zip5") or "")[:5]
+            batch.append((zip5[:3], zip5, json.dumps(rec, default=str)))
+            if len(batch) >= INSERT_BATCH_SIZE:
+                self.conn.executemany(
+                    "INSERT INTO records (shard, zip5, data) VALUES (?, ?, ?)", batch)
+                count += len(batch)
+                batch = []
+        if batch:
+            self.conn.executemany(
+                "INSERT INTO records (shard, zip5, data) VALUES (?, ?, ?)", batch)
+            count += len(batch)
+        self.conn.commit()
+        return count
+
+    def split_oversized(self, capacity):
+        """Re-split ZIP3 shards over `capacity` records into ZIP5 shards."""
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_records_shard ON records (shard)")
+        oversized = [
+            shard for shard, n in self.conn.execute(
+                "SELECT shard, COUNT(*) FROM records GROUP BY shard")
+            if n > capacity and shard
+        ]
+        for shard in oversized:
+            self.conn.execute("UPDATE records SET shard = zip5 WHERE shard = ?", (shard,))
+        self.conn.commit()
+        return oversized
+
+    def shard_sizes(self):
+        return self.conn.execute(
+            "SELECT shard, COUNT(*) FROM records GROUP BY shard ORDER BY shard").fetchall()
+
+    def load_shard(self, shard):
+        return [
+            LeadRecord.from_dict(json.loads(data))
+            for (data,) in self.conn.execute(
+                "SELECT data FROM records WHERE shard = ? ORDER BY id", (shard,))
+        ]
+
+    # ── Groups ─────────────────────────────────────────────────
+
+    def save_groups(self, shard, groups):
+        """Spill a shard's match groups and their NPI / license keys."""
+        for group in groups:
+            members = [{"record": e.record.to_dict(), "confidence": e.confidence}
+                       for e in group]
+            cur = self.conn.execute(
+                "INSERT INTO groups (shard, members) VALUES (?, ?)",
+                (shard, json.dumps(members, default=str)))
+            keys = {}
+            for e in group:
+                if e.record.get("npi_number"):
+                    keys.setdefault("npi:" + e.record["npi_number"], record_id(e.record))
+                if e.record.get("license_number"):
+                    keys.setdefault("lic:" + e.record["license_number"], record_id(e.record))
+            self.conn.executemany(
+                "INSERT INTO group_keys (key, group_id, record_id) VALUES (?, ?, ?)",
+                [(k, cur.lastrowid, rid) for k, rid in keys.items()])
+        self.conn.commit()
+
+    def cross_shard_parents(self, audit=None):
+        """Union groups sharing an NPI or license key. Returns {group: root}."""
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_group_keys ON group_keys (key, group_id)")
+        parent = {}
+        rows = self.conn.execute("""
+            SELECT key, GROUP_CONCAT(group_id), GROUP_CONCAT(record_id, char(31))
+            FROM group_keys
+            GROUP BY key HAVING COUNT(DISTINCT group_id) > 1
+        """)
+        for key, ids, record_ids in rows:
+            if audit:
+                audit.union("cross_shard", key, record_ids.split("\x1f"))
+            ids = sorted({int(i) for i in ids.split(",")})
+            root = _find(parent, ids[0])
+            for gid in ids[1:]:
+                other = _find(parent, gid)
+                if other != root:
+                    # Lowest group id stays root so output order is stable
+                    root, other = min(root, other), max(root, other)
+                    parent[other] = root
+        return {gid: _find(parent, gid) for gid in list(parent)}
+
+    def iter_shard_groups(self, shard):
+        for gid, members in self.conn.execute(
+                "SELECT id, members FROM groups WHERE shard = ? ORDER BY id", (shard,)):
+            yield gid, json.loads(members)
+
+    def load_groups(self, group_ids):
+        placeholders = ",".join("?" * len(group_ids))
+        return [
+            json.loads(members)
+            for (members,) in self.conn.execute(
+                f"SELECT members FROM groups WHERE id IN ({placeholders}) ORDER BY id",
+                list(group_ids))
+        ]
+
+
+def _merge_members(member_lists):
+    group = [
+        MatchEntry(None, LeadRecord.from_dict(m["record"]), m["confidence"])
+        for members in member_lists for m in members
+    ]
+    merged = merge_records(group)
+    merged.pop("_norm_name", None)
+    merged.pop("_norm_address", None)
+    return merged
+
+
+def deduplicate_external(records, output_file, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                         workers=1, shard_db=SHARD_DB_FILE, keep_shards=False, audit=None):
+    """Deduplicate an iterable of records shard by shard, streaming output.
+
+    Only one shard's records are held in memory at a time; merged leads are
+    written to `output_file` as a JSON array. Merge decisions are appended
+    to `audit` (a MatchAuditLog) when given. Returns (lead count, review
+    flags).
+    """
+    print("Harvest Med Waste — Deduplication Engine (external)")
+    store = ShardStore(shard_db)
+    try:
+        total = store.spill_records(records)
+        print(f"  Input records: {total}")
+
+        capacity = _shard_capacity(memory_budget_mb)
+        split = store.split_oversized(capacity)
+        shards = store.shard_sizes()
+        largest = max((n for _, n in shards), default=0)
+        print(f"  Shards: {len(shards)} (largest {largest} records, "
+              f"budget {memory_budget_mb} MB ≈ {capacity} records)")
+        if split:
+            print(f"  Re-split {len(split)} ZIP3 areas by 5-digit ZIP")
+        if largest > capacity:
+            print("  WARNING: largest shard exceeds the memory budget")
+
+        # Dedup each shard independently and spill its groups
+        review_flags = []
+        group_count = 0
+        for i, (shard, n) in enumerate(shards, 1):
+            groups, review = match_groups(store.load_shard(shard), workers=workers,
+                                          verbose=False, audit=audit)
+            store.save_groups(shard, groups)
+            review_flags.extend(review)
+            group_count += len(groups)
+            if i % 50 == 0 or i == len(shards):
+                print(f"  Deduplicated {i}/{len(shards)} shards ({group_count} groups)", flush=True)
+
+        parents = store.cross_shard_parents(audit=audit)
+        absorbed = defaultdict(list)
+        for gid, root in parents.items():
+            if gid != root:
+                absorbed[root].append(gid)
+        print(f"  Cross-shard NPI/license merges: {sum(len(v) for v in absorbed.values())}")
+
+        # Merge and stream out, one shard at a time
+        print("  Merging records...")
+        lead_count = 0
+        removed = 0
+        type_counts = {}
+        multi_source = 0
+        os.makedirs(os.path.dirname(output_file) or ".", exist_ok=True)
+        with open(output_file, "w") as out:
+            out.write("[")
+            for shard, _ in shards:
+                shard_leads = []
+                for gid, members in store.iter_shard_groups(shard):
+                    if parents.get(gid, gid) != gid:
+                        continue
+                    member_lists = [members]
+                    if gid in absorbed:
+                        member_lists.extend(store.load_groups(absorbed[gid]))
+                    shard_leads.append(_merge_members(member_lists))
+
+                if audit:
+                    audit_leads(audit, shard_leads)
+                kept = drop_individuals_at_org_addresses(shard_leads)
+                removed += len(shard_leads) - len(kept)
+                for lead in kept:
+                    out.write(",\n" if lead_count else "\n")
+                    out.write(json.dumps(lead, indent=2, default=str))
+                    lead_count += 1
+                    ft = lead.get("facility_type", "Other")
+                    type_counts[ft] = type_counts.get(ft, 0) + 1
+                    if len(lead.get("sources", [])) > 1:
+                        multi_source += 1
+            out.write("\n]\n")
+    finally:
+        store.close(keep=keep_shards)
+
+    if removed:
+        print(f"  Removed {removed} individuals at organization addresses")
+    if audit:
+        print(f"  Audit log: {audit.flush()} events ({audit.path})")
+    print_dedup_summary(lead_count, type_counts, multi_source, len(review_flags))
+    return lead_count, review_flags
+
+
+def deduplicate_external_from_file(input_file, output_file, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                                   workers=1, review_file=None, audit=True):
+    """Stream records from a JSON array file through deduplicate_external()."""
+    if not os.path.exists(input_file):
+        print(f"ERROR: {input_file} not found. Run tools/normalize.py first.")
+        sys.exit(1)
+
+    lead_count, review = deduplicate_external(
+        iter_json_array(input_file), output_file,
+        memory_budget_mb=memory_budget_mb, workers=workers,
+        audit=MatchAuditLog() if audit else None)
+    print(f"\nSaved {lead_count} leads to {output_file}")
+
+    if review and review_file:
+        with open(review_file, "w") as f:
+            json.dump(review, f, indent=2, default=str)
+        print(f"Saved {len(review)} review flags to {review_file}")
+
+    return lead_count, review
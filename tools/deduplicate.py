@@ -8,32 +8,97 @@ Match hierarchy (highest confidence first):
 1. NPI number match (confidence 1.0)
 2. License number match (confidence 0.95)
 3. Exact address + name match (confidence 0.9)
-4. Fuzzy address + fuzzy name (confidence 0.75)
+4. Fuzzy address + fuzzy name (confidence 0.75), blocked by name token /
+   street number so only plausible pairs within a ZIP are compared
 5. Same address, different name — flagged for review (confidence 0.5)
+6. Shared phone number + similar name or address (confidence 0.8)
+7. Same street number + street name across ZIPs in the same city or
+   3-digit ZIP area, fuzzy name + address (confidence 0.7) — catches
+   mistyped and PO-box ZIPs
 
 Usage:
     python tools/deduplicate.py
     python tools/deduplicate.py --json   # Read from .tmp/normalized_records.json
+    python tools/deduplicate.py --workers 4   # Fuzzy-match ZIP blocks on 4 processes
+    python tools/deduplicate.py --rebuild     # Full dedup, rebuilding the master index
+    python tools/deduplicate.py --no-audit    # Don't append to .tmp/dedup_audit.jsonl
+    python tools/deduplicate.py --external --memory-budget-mb 2048
+                                             # Sharded on-disk dedup (tools/dedup_external.py)
+
+Runs are incremental: the match index is persisted to
+.tmp/dedup_master_index.json and only new or changed records, plus the
+existing master leads they could join, are re-matched, so lead_uids stay
+stable across runs.
+
+Every merge is appended to .tmp/dedup_audit.jsonl (pass, key, similarity
+scores, record ids); explain a lead with tools/match_audit.py <lead_uid>.
 """
 
 import json
 import os
+import re
 import sys
+import hashlib
 import argparse
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
 from tools.normalize import normalize_address, normalize_name
+from tools.lead_record import LeadRecord
+from tools.match_audit import MatchAuditLog, record_id
 
 try:
-    from rapidfuzz import fuzz
+    import numpy as np
+    from rapidfuzz import fuzz, process
     HAS_RAPIDFUZZ = True
 except ImportError:
     HAS_RAPIDFUZZ = False
     print("Warning: rapidfuzz not installed. Fuzzy matching disabled.")
-    print("Install with: pip install rapidfuzz")
+    print("Install with: pip install rapidfuzz numpy")
+
+# Pass 4 similarity thresholds (both must be exceeded to merge)
+FUZZY_NAME_THRESHOLD = 0.85
+FUZZY_ADDRESS_THRESHOLD = 0.8
+
+# Blocking: only records sharing a name token or street number are compared.
+# Keys shared by more records than this (e.g. "DENTAL" in a dense Birmingham
+# ZIP) are too generic to narrow anything down and are ignored.
+MAX_BLOCK_KEY_SIZE = 200
+
+# Blocks at least this large are scored with all CPU cores
+PARALLEL_CDIST_MIN_SIZE = 64
+
+NAME_STOPWORDS = {"THE", "OF", "AND", "AT", "FOR", "IN", "ON"}
+
+ADDRESS_NUMBER_RE = re.compile(r"^\d+")
+
+# Phone / cross-ZIP passes. Buckets larger than these (switchboards,
+# billing services, long commercial streets) are skipped rather than
+# compared pairwise.
+PHONE_MATCH_CONFIDENCE = 0.8
+CROSS_ZIP_CONFIDENCE = 0.7
+MAX_PHONE_BUCKET_SIZE = 10
+MAX_STREET_BUCKET_SIZE = 50
+
+DIRECTIONALS = {"N", "S", "E", "W", "NE", "NW", "SE", "SW"}
+
+# Persisted match index for incremental runs
+MASTER_INDEX_FILE = os.path.join(PROJECT_ROOT, ".tmp", "dedup_master_index.json")
+MASTER_INDEX_VERSION = 2
+
+
+class MatchEntry:
+    """A source record's membership in a match group."""
+
+    __slots__ = ("idx", "record", "confidence")
+
+    def __init__(self, idx, record, confidence=1.0):
+        self.idx = idx                # Position in the input list (None for indexed members)
+        self.record = record          # LeadRecord
+        self.confidence = confidence
 
 
 def make_address_key(record):
@@ -47,6 +112,253 @@ def make_address_key(record):
     return key if key != "||" else None
 
 
+def blocking_keys(norm_name, norm_address):
+    """Return the blocking keys for a record: name tokens and street number."""
+    keys = set()
+    for token in norm_name.split():
+        if len(token) >= 2 and token not in NAME_STOPWORDS:
+            keys.add("n:" + token)
+    m = ADDRESS_NUMBER_RE.match(norm_address)
+    if m:
+        keys.add("a:" + m.group())
+    return keys
+
+
+def normalize_phone(phone):
+    """Reduce a phone number to its 10 digits, or None if unusable."""
+    digits = re.sub(r"\D", "", phone or "")
+    if len(digits) == 11 and digits.startswith("1"):
+        digits = digits[1:]
+    if len(digits) != 10 or len(set(digits)) == 1:
+        return None
+    return digits
+
+
+def street_key(norm_address):
+    """Street number + first street-name token, e.g. "1234|UNIVERSITY".
+
+    Independent of ZIP, so it finds the same building filed under a
+    mistyped or PO-box ZIP.
+    """
+    tokens = norm_address.split()
+    if len(tokens) < 2 or not tokens[0].isdigit():
+        return None
+    for token in tokens[1:]:
+        if token not in DIRECTIONALS:
+            return f"{tokens[0]}|{token}"
+    return None
+
+
+def _similarity(a, b):
+    if not a or not b:
+        return 0.0
+    if HAS_RAPIDFUZZ:
+        return fuzz.ratio(a, b) / 100.0
+    return 1.0 if a == b else 0.0
+
+
+def phone_match(rec1, rec2):
+    """Same phone is only trusted when the name or the address also agrees."""
+    return (_similarity(rec1.get("_norm_name", ""), rec2.get("_norm_name", "")) > FUZZY_NAME_THRESHOLD
+            or _similarity(rec1.get("_norm_address", ""), rec2.get("_norm_address", "")) > FUZZY_ADDRESS_THRESHOLD)
+
+
+def cross_zip_match(rec1, rec2):
+    """Fuzzy name + address match for records in the same city or ZIP3 area."""
+    city1 = (rec1.get("city") or "").upper().strip()
+    city2 = (rec2.get("city") or "").upper().strip()
+    zip1 = (rec1.get("zip5") or "")[:3]
+    zip2 = (rec2.get("zip5") or "")[:3]
+    if not ((city1 and city1 == city2) or (zip1 and zip1 == zip2)):
+        return False
+    return (_similarity(rec1.get("_norm_name", ""), rec2.get("_norm_name", "")) > FUZZY_NAME_THRESHOLD
+            and _similarity(rec1.get("_norm_address", ""), rec2.get("_norm_address", "")) > FUZZY_ADDRESS_THRESHOLD)
+
+
+def _record_phone(rec):
+    return normalize_phone(rec.get("phone"))
+
+
+def _record_street(rec):
+    return street_key(rec.get("_norm_address", ""))
+
+
+def audit_pair(audit, pass_name, key, rec_a, rec_b, lead_uid=None):
+    """Log a pairwise union with its name and address similarity."""
+    audit.union(pass_name, key, [record_id(rec_a), record_id(rec_b)], lead_uid=lead_uid,
+                name_sim=_similarity(rec_a.get("_norm_name", ""), rec_b.get("_norm_name", "")),
+                addr_sim=_similarity(rec_a.get("_norm_address", ""), rec_b.get("_norm_address", "")))
+
+
+def merge_groups_by_key(groups, key_func, match_func, confidence, max_bucket, on_merge=None):
+    """Union groups whose records share a hashed key and pass match_func.
+
+    Records are bucketed by key_func; only pairs inside a bucket (from
+    different groups) are compared. Records in absorbed groups have their
+    confidence capped at `confidence`. on_merge(key, rec_a, rec_b) is
+    called for each union. Returns (groups, merge_count) with surviving
+    groups in their original order.
+    """
+    buckets = defaultdict(list)
+    for gi, group in enumerate(groups):
+        for e in group:
+            key = key_func(e.record)
+            if key:
+                buckets[key].append((gi, e.record))
+
+    parent = list(range(len(groups)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    merges = 0
+    for key, members in buckets.items():
+        if len(members) < 2 or len(members) > max_bucket:
+            continue
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                root_a, root_b = find(members[a][0]), find(members[b][0])
+                if root_a == root_b:
+                    continue
+                if match_func(members[a][1], members[b][1]):
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+                    merges += 1
+                    if on_merge:
+                        on_merge(key, members[a][1], members[b][1])
+
+    if not merges:
+        return groups, 0
+
+    merged = {}
+    for gi, group in enumerate(groups):
+        root = find(gi)
+        if root != gi:
+            for e in group:
+                e.confidence = min(e.confidence, confidence)
+        merged.setdefault(root, []).extend(group)
+    return [merged[root] for root in sorted(merged)], merges
+
+
+def fuzzy_match_pairs(names, addresses, threads=-1):
+    """Find fuzzy-matching record pairs within one ZIP block.
+
+    Candidate pairs come from shared blocking keys; each key bucket is
+    scored in bulk with rapidfuzz's cdist instead of pair-by-pair.
+    `threads` is the cdist thread count for large buckets (-1 = all cores).
+    Returns (matches, candidate_count) where matches is a set of (i, j)
+    position pairs with i < j.
+    """
+    buckets = defaultdict(list)
+    for i, (name, addr) in enumerate(zip(names, addresses)):
+        for key in blocking_keys(name, addr):
+            buckets[key].append(i)
+
+    n = len(names)
+    candidate_codes = []
+    match_codes = []
+    for members in buckets.values():
+        if len(members) < 2 or len(members) > MAX_BLOCK_KEY_SIZE:
+            continue
+
+        workers = threads if len(members) >= PARALLEL_CDIST_MIN_SIZE else 1
+        block_names = [names[m] for m in members]
+        block_addrs = [addresses[m] for m in members]
+        name_sim = process.cdist(block_names, block_names, scorer=fuzz.ratio,
+                                 score_cutoff=FUZZY_NAME_THRESHOLD * 100,
+                                 dtype=np.float64, workers=workers) / 100.0
+        addr_sim = process.cdist(block_addrs, block_addrs, scorer=fuzz.ratio,
+                                 score_cutoff=FUZZY_ADDRESS_THRESHOLD * 100,
+                                 dtype=np.float64, workers=workers) / 100.0
+
+        # Members are in ascending position order, so the upper triangle
+        # yields each pair once as (i, j) with i < j, encoded as i * n + j
+        rows, cols = np.triu_indices(len(members), k=1)
+        positions = np.asarray(members, dtype=np.int64)
+        codes = positions[rows] * n + positions[cols]
+        hits = (name_sim[rows, cols] > FUZZY_NAME_THRESHOLD) & \
+               (addr_sim[rows, cols] > FUZZY_ADDRESS_THRESHOLD)
+        candidate_codes.append(codes)
+        match_codes.append(codes[hits])
+
+    if not candidate_codes:
+        return set(), 0
+
+    candidate_count = len(np.unique(np.concatenate(candidate_codes)))
+    matches = {divmod(int(code), n) for code in np.unique(np.concatenate(match_codes))}
+    return matches, candidate_count
+
+
+def fuzzy_match_block(names, addresses, threads=-1):
+    """Group one ZIP block's records by fuzzy name + address similarity.
+
+    Each unmatched record (in input order) starts a group and absorbs every
+    later unmatched record it matches. Returns (groups, candidate_count)
+    where groups are lists of positions into names/addresses.
+    """
+    matches, candidate_count = fuzzy_match_pairs(names, addresses, threads=threads)
+    neighbours = defaultdict(list)
+    for i, j in matches:
+        neighbours[i].append(j)
+
+    matched = set()
+    groups = []
+    for i in range(len(names)):
+        if i in matched:
+            continue
+        group = [i]
+        for j in sorted(neighbours.get(i, ())):
+            if j not in matched:
+                group.append(j)
+                matched.add(j)
+        groups.append(group)
+
+    return groups, candidate_count
+
+
+def _match_zip_block(names, addresses):
+    """Process-pool entry point: match one ZIP block single-threaded.
+
+    Each pool worker owns one core, so cdist must not spawn its own threads.
+    """
+    return fuzzy_match_block(names, addresses, threads=1)
+
+
+def match_zip_blocks(zip_blocks, workers=1):
+    """Run fuzzy matching over {zip: (names, addresses)} blocks.
+
+    With workers > 1 the blocks are dispatched to a process pool, largest
+    first so one dense ZIP doesn't end up last on an otherwise idle pool.
+    Returns {zip: (groups, candidate_count)}; callers iterate zip_blocks in
+    their own order, so the merged result doesn't depend on completion order.
+    """
+    if workers <= 1 or len(zip_blocks) < 2:
+        return {z: fuzzy_match_block(names, addrs) for z, (names, addrs) in zip_blocks.items()}
+
+    by_size = sorted(zip_blocks, key=lambda z: len(zip_blocks[z][0]), reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {z: pool.submit(_match_zip_block, *zip_blocks[z]) for z in by_size}
+        return {z: f.result() for z, f in futures.items()}
+
+
+def make_lead_uid(lead):
+    """Derive a lead_uid from a merged lead's strongest identifier."""
+    lead_uid = lead.get("source_id", "")
+    if lead.get("npi_number"):
+        lead_uid = f"npi-{lead['npi_number']}"
+    elif lead.get("license_number"):
+        lead_uid = f"adph-{lead['license_number']}"
+    return lead_uid
+
+
+def record_fingerprint(record):
+    """Stable hash of a normalized record, used to detect changed records."""
+    payload = json.dumps(dict(record.items()), sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
 def merge_records(group):
     """Merge a group of matched records into a single master record.
 
@@ -54,26 +366,26 @@ def merge_records(group):
     Union all available fields.
     """
     if len(group) == 1:
-        merged = dict(group[0]["record"])
-        merged["sources"] = [{"source": group[0]["record"]["source"],
-                               "source_id": group[0]["record"]["source_id"],
-                               "confidence": group[0].get("confidence", 1.0)}]
+        merged = group[0].record.to_dict()
+        merged["sources"] = [{"source": group[0].record["source"],
+                               "source_id": group[0].record["source_id"],
+                               "confidence": group[0].confidence}]
         return merged
 
     # Sort: prefer NPI-2 (org) records, then by source priority (adph > npi > cms)
     source_priority = {"adph": 0, "npi": 1, "cms": 2}
     sorted_group = sorted(group, key=lambda g: (
-        0 if g["record"].get("entity_type") == "NPI-2" else 1,
-        source_priority.get(g["record"]["source"], 9),
+        0 if g.record.get("entity_type") == "NPI-2" else 1,
+        source_priority.get(g.record["source"], 9),
     ))
 
     # Start with best record as base
-    merged = dict(sorted_group[0]["record"])
+    merged = sorted_group[0].record.to_dict()
     sources = []
 
     for item in sorted_group:
-        rec = item["record"]
-        confidence = item.get("confidence", 1.0)
+        rec = item.record
+        confidence = item.confidence
         sources.append({
             "source": rec["source"],
             "source_id": rec["source_id"],
@@ -103,14 +415,16 @@ def merge_records(group):
     return merged
 
 
-def deduplicate(records):
-    """Main deduplication pipeline.
+def match_groups(records, workers=1, verbose=True, audit=None):
+    """Run the match hierarchy (passes 1-7) over normalized records.
 
-    Returns a list of merged lead records and a list of review flags.
+    `workers` > 1 runs the per-ZIP fuzzy pass in a process pool; with
+    verbose=False the per-pass counts are not printed. Unions are recorded
+    to `audit` (a MatchAuditLog) when given. Returns a list of groups (each
+    a list of MatchEntry) and a list of review flags.
     """
-    print("Harvest Med Waste — Deduplication Engine")
-    print(f"  Input records: {len(records)}")
-    print()
+    log = print if verbose else (lambda *args, **kwargs: None)
+    records = [LeadRecord.from_dict(r) for r in records]
 
     # Build indexes for matching
     npi_index = defaultdict(list)       # NPI number → records
@@ -118,7 +432,7 @@ def deduplicate(records):
     address_index = defaultdict(list)   # Normalized address key → records
 
     for i, rec in enumerate(records):
-        entry = {"idx": i, "record": rec, "confidence": 1.0}
+        entry = MatchEntry(i, rec, 1.0)
 
         if rec.get("npi_number"):
             npi_index[rec["npi_number"]].append(entry)
@@ -132,7 +446,7 @@ def deduplicate(records):
 
     # Track which records have been assigned to a group
     assigned = set()
-    groups = []  # list of groups, each group is a list of {"record": ..., "confidence": ...}
+    groups = []  # list of groups, each group is a list of MatchEntry
     review_flags = []
 
     # Pass 1: NPI number matching (confidence 1.0)
@@ -142,147 +456,163 @@ def deduplicate(records):
         group_indices = set()
         group = []
         for e in entries:
-            if e["idx"] not in assigned:
-                e["confidence"] = 1.0
+            if e.idx not in assigned:
+                e.confidence = 1.0
                 group.append(e)
-                group_indices.add(e["idx"])
-                assigned.add(e["idx"])
+                group_indices.add(e.idx)
+                assigned.add(e.idx)
         if group:
             groups.append(group)
+            if audit and len(group) > 1:
+                audit.union("npi", npi, [record_id(e.record) for e in group])
 
-    print(f"  Pass 1 (NPI match): {len(groups)} groups")
+    log(f"  Pass 1 (NPI match): {len(groups)} groups")
 
     # Pass 2: License number matching (confidence 0.95)
     license_groups = 0
     for lic, entries in license_index.items():
         if not lic:
             continue
-        unassigned = [e for e in entries if e["idx"] not in assigned]
+        unassigned = [e for e in entries if e.idx not in assigned]
         if not unassigned:
             # Check if any can be merged into existing groups
             for e in entries:
-                if e["idx"] not in assigned:
+                if e.idx not in assigned:
                     continue
                 # Find the group this record belongs to
                 for g in groups:
-                    if any(ge["idx"] == e["idx"] for ge in g):
+                    if any(ge.idx == e.idx for ge in g):
                         # Add unassigned records from same license to this group
+                        added = []
                         for ue in entries:
-                            if ue["idx"] not in assigned:
-                                ue["confidence"] = 0.95
+                            if ue.idx not in assigned:
+                                ue.confidence = 0.95
                                 g.append(ue)
-                                assigned.add(ue["idx"])
+                                assigned.add(ue.idx)
+                                added.append(record_id(ue.record))
+                        if audit and added:
+                            audit.union("license", lic, [record_id(e.record)] + added)
                         break
             continue
 
         # Create a new group for unassigned records with same license
         for e in unassigned:
-            e["confidence"] = 0.95
-            assigned.add(e["idx"])
+            e.confidence = 0.95
+            assigned.add(e.idx)
         groups.append(unassigned)
         license_groups += 1
+        if audit and len(unassigned) > 1:
+            audit.union("license", lic, [record_id(e.record) for e in unassigned])
 
-    print(f"  Pass 2 (License match): +{license_groups} groups")
+    log(f"  Pass 2 (License match): +{license_groups} groups")
 
-    # Pass 3: Exact address + name matching (confidence 0.9)
+    # Pass 3: Exact address + name matching (confidence 0.9). A record
+    # with no same-name partner at its address is left for pass 4, which
+    # can still fuzzy-match it to a typo'd or reformatted duplicate.
     exact_match_groups = 0
     for addr_key, entries in address_index.items():
-        unassigned = [e for e in entries if e["idx"] not in assigned]
+        unassigned = [e for e in entries if e.idx not in assigned]
         if len(unassigned) < 2:
-            if unassigned:
-                unassigned[0]["confidence"] = 0.9
-                groups.append(unassigned)
-                assigned.add(unassigned[0]["idx"])
             continue
 
         # Sub-group by normalized name
         name_groups = defaultdict(list)
         for e in unassigned:
-            norm_name = e["record"].get("_norm_name", normalize_name(e["record"].get("facility_name", "")))
+            norm_name = e.record.get("_norm_name", normalize_name(e.record.get("facility_name", "")))
             name_groups[norm_name].append(e)
 
         for norm_name, name_entries in name_groups.items():
+            if len(name_entries) < 2:
+                continue
             for e in name_entries:
-                e["confidence"] = 0.9
-                assigned.add(e["idx"])
+                e.confidence = 0.9
+                assigned.add(e.idx)
             groups.append(name_entries)
             exact_match_groups += 1
+            if audit:
+                audit.union("exact", addr_key, [record_id(e.record) for e in name_entries])
 
-    print(f"  Pass 3 (Exact addr+name): +{exact_match_groups} groups")
+    log(f"  Pass 3 (Exact addr+name): +{exact_match_groups} groups")
 
     # Pass 4: Fuzzy matching for remaining unassigned records (confidence 0.75)
     fuzzy_groups = 0
-    remaining = [{"idx": i, "record": r, "confidence": 0.75}
+    remaining = [MatchEntry(i, r, 0.75)
                  for i, r in enumerate(records) if i not in assigned]
 
     if remaining and HAS_RAPIDFUZZ:
         # Group remaining by ZIP code for efficiency
         zip_groups = defaultdict(list)
         for e in remaining:
-            z = e["record"].get("zip5", "")[:5]
+            z = e.record.get("zip5", "")[:5]
             zip_groups[z].append(e)
 
-        for zip_code, zip_entries in zip_groups.items():
-            matched_in_zip = set()
-            for i, e1 in enumerate(zip_entries):
-                if i in matched_in_zip:
-                    continue
-                group = [e1]
-                name1 = e1["record"].get("_norm_name", "")
-                addr1 = e1["record"].get("_norm_address", "")
-
-                for j, e2 in enumerate(zip_entries[i+1:], i+1):
-                    if j in matched_in_zip:
-                        continue
-                    name2 = e2["record"].get("_norm_name", "")
-                    addr2 = e2["record"].get("_norm_address", "")
-
-                    name_sim = fuzz.ratio(name1, name2) / 100.0
-                    addr_sim = fuzz.ratio(addr1, addr2) / 100.0
+        zip_blocks = {
+            z: ([e.record.get("_norm_name", "") for e in entries],
+                [e.record.get("_norm_address", "") for e in entries])
+            for z, entries in zip_groups.items()
+        }
+        block_results = match_zip_blocks(zip_blocks, workers=workers)
 
-                    if name_sim > 0.85 and addr_sim > 0.8:
-                        e2["confidence"] = 0.75
-                        group.append(e2)
-                        matched_in_zip.add(j)
+        candidate_pairs = 0
+        exhaustive_pairs = 0
+        for zip_code, zip_entries in zip_groups.items():
+            block_groups, block_candidates = block_results[zip_code]
+            candidate_pairs += block_candidates
+            exhaustive_pairs += len(zip_entries) * (len(zip_entries) - 1) // 2
 
+            for positions in block_groups:
+                group = [zip_entries[p] for p in positions]
                 if len(group) > 1:
                     fuzzy_groups += 1
-
+                    if audit:
+                        # Each member joined because it matched the group leader
+                        for e in group[1:]:
+                            audit_pair(audit, "fuzzy", zip_code, group[0].record, e.record)
+                elif make_address_key(group[0].record):
+                    # Unmatched, but its full address is known
+                    group[0].confidence = 0.9
                 for e in group:
-                    assigned.add(e["idx"])
+                    assigned.add(e.idx)
                 groups.append(group)
 
-        print(f"  Pass 4 (Fuzzy match): +{fuzzy_groups} groups")
+        log(f"  Pass 4 (Fuzzy match): +{fuzzy_groups} groups "
+              f"({candidate_pairs:,} candidate pairs of {exhaustive_pairs:,})")
     elif remaining:
         # No fuzzy matching — just add remaining as singletons
         for e in remaining:
-            assigned.add(e["idx"])
+            if make_address_key(e.record):
+                e.confidence = 0.9
+            assigned.add(e.idx)
             groups.append([e])
-        print(f"  Pass 4 (No fuzzy): {len(remaining)} singletons added")
+        log(f"  Pass 4 (No fuzzy): {len(remaining)} singletons added")
 
     # Pass 5: Add any truly remaining records as singletons
     for i, rec in enumerate(records):
         if i not in assigned:
-            groups.append([{"idx": i, "record": rec, "confidence": 0.5}])
+            groups.append([MatchEntry(i, rec, 0.5)])
             review_flags.append({
-                "record": rec,
+                "record": rec.to_dict(),
                 "reason": "Unmatched record",
                 "confidence": 0.5,
             })
 
-    # Merge each group
-    print(f"\n  Total groups: {len(groups)}")
-    print("  Merging records...")
+    # Pass 6: Shared phone number, corroborated by name or address
+    groups, phone_merges = merge_groups_by_key(
+        groups, _record_phone, phone_match, PHONE_MATCH_CONFIDENCE, MAX_PHONE_BUCKET_SIZE,
+        on_merge=(lambda key, a, b: audit_pair(audit, "phone", key, a, b)) if audit else None)
+    log(f"  Pass 6 (Phone match): {phone_merges} merges")
 
-    merged_leads = []
-    for group in groups:
-        merged = merge_records(group)
-        # Remove internal matching fields
-        merged.pop("_norm_name", None)
-        merged.pop("_norm_address", None)
-        merged_leads.append(merged)
+    # Pass 7: Street number + street name across neighbouring ZIPs
+    groups, street_merges = merge_groups_by_key(
+        groups, _record_street, cross_zip_match, CROSS_ZIP_CONFIDENCE, MAX_STREET_BUCKET_SIZE,
+        on_merge=(lambda key, a, b: audit_pair(audit, "street", key, a, b)) if audit else None)
+    log(f"  Pass 7 (Cross-ZIP address): {street_merges} merges")
 
-    # Org-over-individual dedup: remove individuals at org addresses
+    return groups, review_flags
+
+
+def drop_individuals_at_org_addresses(merged_leads):
+    """Org-over-individual dedup: remove individuals at org addresses."""
     org_addresses = set()
     for lead in merged_leads:
         if lead.get("entity_type") == "NPI-2":
@@ -290,45 +620,493 @@ def deduplicate(records):
             if key:
                 org_addresses.add(key)
 
-    before_count = len(merged_leads)
-    merged_leads = [
+    return [
         lead for lead in merged_leads
         if lead.get("entity_type") == "NPI-2"
         or make_address_key(lead) not in org_addresses
     ]
+
+
+def print_dedup_summary(lead_count, type_counts, multi_source, review_count):
+    """Print the final lead count, facility type breakdown and flags."""
+    print(f"\n  Final deduplicated leads: {lead_count}")
+
+    print("\n--- Dedup Summary ---")
+    for ft, count in sorted(type_counts.items(), key=lambda x: -x[1]):
+        print(f"  {ft}: {count}")
+
+    print(f"\n  Multi-source leads: {multi_source}")
+    print(f"  Flagged for review: {review_count}")
+
+
+def audit_leads(audit, merged_leads):
+    """Log the final members of every multi-source lead."""
+    for lead in merged_leads:
+        sources = lead.get("sources", [])
+        if len(sources) > 1:
+            audit.lead(lead.get("lead_uid") or make_lead_uid(lead),
+                       [record_id(src) for src in sources])
+
+
+def finalize_leads(merged_leads, review_flags, audit=None):
+    """Strip matching fields, drop individuals at org addresses, print summary.
+
+    Flushes the `audit` log, if given.
+    """
+    for merged in merged_leads:
+        # Remove internal matching fields
+        merged.pop("_norm_name", None)
+        merged.pop("_norm_address", None)
+
+    if audit:
+        print(f"  Audit log: {audit.flush()} events ({audit.path})")
+
+    before_count = len(merged_leads)
+    merged_leads = drop_individuals_at_org_addresses(merged_leads)
     removed = before_count - len(merged_leads)
     if removed:
         print(f"  Removed {removed} individuals at organization addresses")
 
-    print(f"\n  Final deduplicated leads: {len(merged_leads)}")
-
-    # Summary
-    print("\n--- Dedup Summary ---")
     type_counts = {}
     for lead in merged_leads:
         ft = lead.get("facility_type", "Other")
         type_counts[ft] = type_counts.get(ft, 0) + 1
-    for ft, count in sorted(type_counts.items(), key=lambda x: -x[1]):
-        print(f"  {ft}: {count}")
-
     multi_source = sum(1 for l in merged_leads if len(l.get("sources", [])) > 1)
-    print(f"\n  Multi-source leads: {multi_source}")
-    print(f"  Flagged for review: {len(review_flags)}")
+    print_dedup_summary(len(merged_leads), type_counts, multi_source, len(review_flags))
+
+    return merged_leads
+
+
+def deduplicate(records, workers=1, audit=None):
+    """Main deduplication pipeline.
+
+    `workers` > 1 runs the per-ZIP fuzzy pass in a process pool; merge
+    decisions are appended to `audit` (a MatchAuditLog) when given.
+    Returns a list of merged lead records and a list of review flags.
+    """
+    print("Harvest Med Waste — Deduplication Engine")
+    print(f"  Input records: {len(records)}")
+    print()
+
+    groups, review_flags = match_groups(records, workers=workers, audit=audit)
+
+    # Merge each group
+    print(f"\n  Total groups: {len(groups)}")
+    print("  Merging records...")
 
+    merged_leads = [merge_records(g) for g in groups]
+    if audit:
+        audit_leads(audit, merged_leads)
+    merged_leads = finalize_leads(merged_leads, review_flags, audit=audit)
     return merged_leads, review_flags
 
 
-def deduplicate_from_file():
-    """Load normalized records from JSON and deduplicate."""
+class MasterIndex:
+    """Persisted match index over deduplicated master leads.
+
+    Holds each lead's member records plus hash lookups mirroring the match
+    hierarchy (NPI, license, address + name, per-ZIP fuzzy blocking keys,
+    phone, street), so the leads a new or changed record could join are
+    found without re-running the full dedup. Lead uids are assigned once
+    and kept across runs.
+    """
+
+    def __init__(self):
+        self.leads = {}         # lead_uid → [MatchEntry, ...]
+        self.fingerprints = {}  # source_id → [lead_uid, record fingerprint]
+        self.npi = {}           # NPI number → lead_uid
+        self.license = {}       # License number → lead_uid
+        self.address = {}       # Address key → {normalized name → lead_uid}
+        self.blocks = {}        # "zip5|blocking key" → [lead_uid, ...]
+        self.phones = {}        # 10-digit phone → [lead_uid, ...]
+        self.streets = {}       # "number|street" → [lead_uid, ...]
+
+    # ── Persistence ────────────────────────────────────────────
+
+    @classmethod
+    def load(cls, path=MASTER_INDEX_FILE):
+        """Load an index from disk. Returns None if missing or incompatible."""
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return None
+        if data.get("version") != MASTER_INDEX_VERSION:
+            return None
+
+        index = cls()
+        for attr in ("fingerprints", "npi", "license", "address", "blocks",
+                     "phones", "streets"):
+            setattr(index, attr, data[attr])
+        index.leads = {
+            lead_uid: [MatchEntry(None, LeadRecord(m["record"]), m["confidence"]) for m in members]
+            for lead_uid, members in data["leads"].items()
+        }
+        return index
+
+    def save(self, path=MASTER_INDEX_FILE):
+        """Write the index atomically so a crash never leaves a partial file."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            "version": MASTER_INDEX_VERSION,
+            "leads": {
+                lead_uid: [{"record": e.record.to_dict(), "confidence": e.confidence} for e in members]
+                for lead_uid, members in self.leads.items()
+            },
+            "fingerprints": self.fingerprints,
+            "npi": self.npi,
+            "license": self.license,
+            "address": self.address,
+            "blocks": self.blocks,
+            "phones": self.phones,
+            "streets": self.streets,
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            # json.dumps uses the C encoder; json.dump to a file does not
+            f.write(json.dumps(data))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def from_groups(cls, groups):
+        """Build an index from match_groups() output."""
+        index = cls()
+        for group in groups:
+            index.add_lead([MatchEntry(None, e.record, e.confidence) for e in group])
+        return index
+
+    # ── Lookup maintenance ─────────────────────────────────────
+
+    @staticmethod
+    def _add_posting(mapping, key, lead_uid):
+        uids = mapping.setdefault(key, [])
+        if lead_uid not in uids:
+            uids.append(lead_uid)
+
+    @staticmethod
+    def _remove_posting(mapping, key, lead_uid):
+        uids = mapping.get(key)
+        if uids and lead_uid in uids:
+            uids.remove(lead_uid)
+            if not uids:
+                del mapping[key]
+
+    @staticmethod
+    def _fuzzy_keys(rec):
+        zip5 = (rec.get("zip5") or "")[:5]
+        keys = blocking_keys(rec.get("_norm_name", ""), rec.get("_norm_address", ""))
+        return [f"{zip5}|{k}" for k in sorted(keys)]
+
+    def _index_lead(self, lead_uid):
+        for entry in self.leads[lead_uid]:
+            rec = entry.record
+            if rec.get("npi_number"):
+                self.npi[rec["npi_number"]] = lead_uid
+            if rec.get("license_number"):
+                self.license[rec["license_number"]] = lead_uid
+            addr_key = make_address_key(rec)
+            if addr_key:
+                norm_name = rec.get("_norm_name", normalize_name(rec.get("facility_name", "")))
+                self.address.setdefault(addr_key, {})[norm_name] = lead_uid
+            for key in self._fuzzy_keys(rec):
+                self._add_posting(self.blocks, key, lead_uid)
+            phone = _record_phone(rec)
+            if phone:
+                self._add_posting(self.phones, phone, lead_uid)
+            street = _record_street(rec)
+            if street:
+                self._add_posting(self.streets, street, lead_uid)
+            self.fingerprints[rec["source_id"]] = [lead_uid, record_fingerprint(rec)]
+
+    def _unindex_lead(self, lead_uid):
+        for entry in self.leads[lead_uid]:
+            rec = entry.record
+            if self.npi.get(rec.get("npi_number")) == lead_uid:
+                del self.npi[rec["npi_number"]]
+            if self.license.get(rec.get("license_number")) == lead_uid:
+                del self.license[rec["license_number"]]
+            addr_key = make_address_key(rec)
+            names = self.address.get(addr_key)
+            if names:
+                for name in [n for n, uid in names.items() if uid == lead_uid]:
+                    del names[name]
+                if not names:
+                    del self.address[addr_key]
+            for key in self._fuzzy_keys(rec):
+                self._remove_posting(self.blocks, key, lead_uid)
+            self._remove_posting(self.phones, _record_phone(rec), lead_uid)
+            self._remove_posting(self.streets, _record_street(rec), lead_uid)
+            if self.fingerprints.get(rec["source_id"], [None])[0] == lead_uid:
+                del self.fingerprints[rec["source_id"]]
+
+    def add_lead(self, members):
+        """Create a new master lead from member entries. Returns its lead_uid."""
+        base_uid = make_lead_uid(merge_records(members))
+        lead_uid = base_uid
+        suffix = 2
+        while lead_uid in self.leads:
+            lead_uid = f"{base_uid}-{suffix}"
+            suffix += 1
+        self.leads[lead_uid] = members
+        self._index_lead(lead_uid)
+        return lead_uid
+
+    def attach(self, lead_uid, entry):
+        """Add a matched record to an existing master lead."""
+        self._unindex_lead(lead_uid)
+        self.leads[lead_uid].append(entry)
+        self._index_lead(lead_uid)
+
+    def detach(self, source_id):
+        """Remove a source record from its master lead.
+
+        Returns the lead_uid it belonged to; the lead is dropped if it has
+        no members left.
+        """
+        lead_uid = self.fingerprints[source_id][0]
+        self._unindex_lead(lead_uid)
+        members = [e for e in self.leads[lead_uid] if e.record["source_id"] != source_id]
+        if members:
+            self.leads[lead_uid] = members
+            self._index_lead(lead_uid)
+        else:
+            del self.leads[lead_uid]
+        return lead_uid
+
+    # ── Matching ───────────────────────────────────────────────
+
+    def neighbours(self, rec):
+        """Leads that match_groups() could group `rec` with.
+
+        Every lead sharing a key with the record in some pass: NPI, license,
+        address (under any name), a fuzzy blocking key in its ZIP, phone or
+        street. Keys over their pass's size limit are skipped, as
+        match_groups() skips them.
+        """
+        uids = set()
+        for mapping, key in ((self.npi, rec.get("npi_number")),
+                             (self.license, rec.get("license_number"))):
+            if key and key in mapping:
+                uids.add(mapping[key])
+        addr_key = make_address_key(rec)
+        if addr_key:
+            uids.update(self.address.get(addr_key, {}).values())
+        for key in self._fuzzy_keys(rec):
+            block = self.blocks.get(key, [])
+            if len(block) <= MAX_BLOCK_KEY_SIZE:
+                uids.update(block)
+        for mapping, key, max_bucket in ((self.phones, _record_phone(rec), MAX_PHONE_BUCKET_SIZE),
+                                         (self.streets, _record_street(rec), MAX_STREET_BUCKET_SIZE)):
+            bucket = mapping.get(key, []) if key else []
+            if len(bucket) <= max_bucket:
+                uids.update(bucket)
+        return uids
+
+    def regroup(self, lead_uids, groups):
+        """Replace leads `lead_uids` with match_groups() groups.
+
+        Each group keeps the uid of the old lead it holds the most members
+        of (a uid goes to one group only); the other groups get new uids.
+        Returns (the groups' lead_uids in order, old lead_uids left unused).
+        """
+        owner = {}
+        for lead_uid in lead_uids:
+            for e in self.leads[lead_uid]:
+                owner[e.record["source_id"]] = lead_uid
+        overlaps = []
+        for gi, group in enumerate(groups):
+            counts = defaultdict(int)
+            for e in group:
+                if e.record["source_id"] in owner:
+                    counts[owner[e.record["source_id"]]] += 1
+            overlaps.extend((-count, gi, lead_uid) for lead_uid, count in counts.items())
+
+        assigned = [None] * len(groups)
+        claimed = set()
+        for _, gi, lead_uid in sorted(overlaps):
+            if assigned[gi] is None and lead_uid not in claimed:
+                assigned[gi] = lead_uid
+                claimed.add(lead_uid)
+
+        for lead_uid in lead_uids:
+            self._unindex_lead(lead_uid)
+            del self.leads[lead_uid]
+        # Kept uids first, so a new uid never takes one that is about to be reused
+        for gi, group in enumerate(groups):
+            if assigned[gi]:
+                self.leads[assigned[gi]] = [MatchEntry(None, e.record, e.confidence) for e in group]
+                self._index_lead(assigned[gi])
+        for gi, group in enumerate(groups):
+            if not assigned[gi]:
+                assigned[gi] = self.add_lead([MatchEntry(None, e.record, e.confidence) for e in group])
+        return assigned, set(lead_uids) - set(assigned)
+
+    def address_conflicts(self, rec, lead_uid):
+        """Other leads at the record's exact address under a different name."""
+        addr_key = make_address_key(rec)
+        if not addr_key:
+            return []
+        norm_name = rec.get("_norm_name", normalize_name(rec.get("facility_name", "")))
+        return sorted({uid for name, uid in self.address.get(addr_key, {}).items()
+                       if name != norm_name and uid != lead_uid})
+
+    def merged_leads(self):
+        """Merge every master lead's members into a lead record."""
+        merged_leads = []
+        for lead_uid, members in self.leads.items():
+            merged = merge_records(members)
+            merged["lead_uid"] = lead_uid
+            merged_leads.append(merged)
+        return merged_leads
+
+
+def deduplicate_incremental(records, index_file=MASTER_INDEX_FILE, rebuild=False, workers=1,
+                            audit=None):
+    """Deduplicate against the persisted master index.
+
+    Only records that are new or whose content changed since the last run
+    are matched: match_groups() runs over them plus every existing lead
+    they could join, and those leads are replaced by its groups (keeping
+    their lead_uids where they survive). Other leads are left as they
+    are. A placed record sharing its exact address with
+    another lead under a different name is flagged for review. Records
+    absent from this run's input are kept (their count is printed; use
+    `rebuild` to drop them). Falls back to a full dedup when there is no index or `rebuild` is set.
+
+    Returns merged leads (each with its stable lead_uid), review flags, the
+    set of lead_uids created or modified by this run, and the set of
+    lead_uids that no longer exist (merged into another lead, left with no
+    records, or gone after a rebuild). Merge decisions are appended to
+    `audit` (a MatchAuditLog) when given.
+    """
+    print("Harvest Med Waste — Deduplication Engine (incremental)")
+    print(f"  Input records: {len(records)}")
+    print()
+
+    index = None if rebuild else MasterIndex.load(index_file)
+    changed = index is None
+    removed = set()
+
+    if index is None:
+        print("  Full rebuild of master index")
+        previous = MasterIndex.load(index_file) if rebuild else None
+        groups, review_flags = match_groups(records, workers=workers, audit=audit)
+        index = MasterIndex.from_groups(groups)
+        touched = set(index.leads)
+        if previous:
+            removed = set(previous.leads) - touched
+    else:
+        review_flags = []
+        touched = set()
+        affected = set()
+        pending = []
+        new_count = changed_count = 0
+        order = {}
+        for rec in records:
+            rec = LeadRecord.from_dict(rec)
+            source_id = rec["source_id"]
+            order[source_id] = len(order)
+            previous = index.fingerprints.get(source_id)
+            if previous and previous[1] == record_fingerprint(rec):
+                continue
+            if previous:
+                old_uid = index.detach(source_id)
+                touched.add(old_uid)
+                if old_uid in index.leads:
+                    # Its other members may no longer belong together
+                    affected.add(old_uid)
+                else:
+                    removed.add(old_uid)
+                changed_count += 1
+                if audit:
+                    audit.union("detach", None, [record_id(rec)], lead_uid=old_uid)
+            else:
+                new_count += 1
+            pending.append(rec)
+
+        if pending:
+            # Re-run the full match hierarchy over the pending records and
+            # every lead they could join, in input order, so the result
+            # matches what a rebuild would give for them
+            for rec in pending:
+                affected |= index.neighbours(rec)
+            affected = sorted(affected)
+            subset = [e.record for lead_uid in affected for e in index.leads[lead_uid]] + pending
+            subset.sort(key=lambda r: order.get(r["source_id"], len(order)))
+            print(f"  Re-matching {len(pending)} records with {len(affected)} existing leads")
+
+            groups, flags = match_groups(subset, workers=workers, verbose=False, audit=audit)
+            review_flags.extend(flags)
+            before = {lead_uid: [(e.record["source_id"], e.confidence) for e in index.leads[lead_uid]]
+                      for lead_uid in affected}
+            lead_uids, dropped = index.regroup(affected, groups)
+            removed |= dropped
+            for lead_uid in lead_uids:
+                members = [(e.record["source_id"], e.confidence) for e in index.leads[lead_uid]]
+                if before.get(lead_uid) != members:
+                    touched.add(lead_uid)
+
+            for rec in pending:
+                lead_uid = index.fingerprints[rec["source_id"]][0]
+                conflicts = index.address_conflicts(rec, lead_uid)
+                if conflicts:
+                    review_flags.append({
+                        "record": rec.to_dict(),
+                        "reason": "Same address, different name",
+                        "confidence": next(e.confidence for e in index.leads[lead_uid]
+                                           if e.record["source_id"] == rec["source_id"]),
+                        "lead_uid": lead_uid,
+                        "other_lead_uids": conflicts,
+                    })
+
+        changed = changed_count + new_count > 0
+        touched &= set(index.leads)
+        # A uid can be dropped and then handed to a new lead in the same run
+        removed -= set(index.leads)
+        print(f"  New records: {new_count}")
+        print(f"  Changed records: {changed_count}")
+        print(f"  Unchanged records: {len(records) - new_count - changed_count}")
+        print(f"  Leads created/updated: {len(touched)}")
+        print(f"  Leads merged into others or emptied: {len(removed)}")
+        absent = sum(1 for members in index.leads.values()
+                     if not any(e.record["source_id"] in order for e in members))
+        if absent:
+            print(f"  Leads with no records in this input (kept): {absent}")
+
+    if changed:
+        index.save(index_file)
+    print(f"\n  Master index: {len(index.leads)} leads ({index_file})")
+
+    merged_leads = index.merged_leads()
+    if audit:
+        audit_leads(audit, [lead for lead in merged_leads if lead["lead_uid"] in touched])
+    merged_leads = finalize_leads(merged_leads, review_flags, audit=audit)
+    return merged_leads, review_flags, touched, removed
+
+
+def deduplicate_from_file(workers=1, incremental=True, rebuild=False, audit=True):
+    """Load normalized records from JSON and deduplicate.
+
+    By default matches against the persisted master index; pass
+    incremental=False for a stateless full dedup. Merge decisions are
+    appended to the audit log unless audit=False.
+    """
     input_file = os.path.join(PROJECT_ROOT, ".tmp", "normalized_records.json")
     if not os.path.exists(input_file):
         print(f"ERROR: {input_file} not found. Run tools/normalize.py first.")
         sys.exit(1)
 
     with open(input_file) as f:
-        records = json.load(f)
+        records = [LeadRecord.from_dict(r) for r in json.load(f)]
 
-    merged, review = deduplicate(records)
+    audit_log = MatchAuditLog() if audit else None
+    if incremental:
+        merged, review, _, _ = deduplicate_incremental(records, rebuild=rebuild, workers=workers,
+                                                       audit=audit_log)
+    else:
+        merged, review = deduplicate(records, workers=workers, audit=audit_log)
 
     # Save results
     output_file = os.path.join(PROJECT_ROOT, ".tmp", "deduplicated_leads.json")
@@ -345,21 +1123,33 @@ def deduplicate_from_file():
     return merged, review
 
 
-def deduplicate_and_save_to_db(records):
-    """Deduplicate records and save to the leads table."""
-    from tools.db import upsert_lead, upsert_lead_source
+def deduplicate_and_save_to_db(records, workers=1, incremental=True, rebuild=False, audit=True):
+    """Deduplicate records and save to the leads table.
 
-    merged, review = deduplicate(records)
+    In incremental mode only leads created or changed by this run are
+    written, and leads the run merged away or emptied are deleted (their
+    sources go with them; the records live on in the surviving leads). Use
+    rebuild=True to rewrite every lead (e.g. after a DB reset). Merge
+    decisions are appended to the audit log unless audit=False.
+    """
+    from tools.db import upsert_lead, upsert_lead_source, delete_leads
+
+    audit_log = MatchAuditLog() if audit else None
+    removed = set()
+    if incremental:
+        merged, review, touched, removed = deduplicate_incremental(
+            records, rebuild=rebuild, workers=workers, audit=audit_log)
+        to_save = [lead for lead in merged if lead["lead_uid"] in touched]
+    else:
+        merged, review = deduplicate(records, workers=workers, audit=audit_log)
+        to_save = merged
 
     print("\nSaving to database...")
+    if removed:
+        print(f"  Deleted {delete_leads(sorted(removed))} merged or emptied leads")
     saved = 0
-    for lead in merged:
-        # Generate lead_uid from primary source
-        lead_uid = lead.get("source_id", "")
-        if lead.get("npi_number"):
-            lead_uid = f"npi-{lead['npi_number']}"
-        elif lead.get("license_number"):
-            lead_uid = f"adph-{lead['license_number']}"
+    for lead in to_save:
+        lead_uid = lead.get("lead_uid") or make_lead_uid(lead)
 
         lead_data = {
             "lead_uid": lead_uid,
@@ -395,7 +1185,7 @@ def deduplicate_and_save_to_db(records):
 
         saved += 1
         if saved % 1000 == 0:
-            print(f"  Saved {saved}/{len(merged)}...", flush=True)
+            print(f"  Saved {saved}/{len(to_save)}...", flush=True)
 
     print(f"  Saved {saved} leads to database")
     return merged, review
@@ -404,5 +1194,29 @@ def deduplicate_and_save_to_db(records):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Deduplicate normalized records")
     parser.add_argument("--json", action="store_true", help="Read from .tmp JSON files")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes for the per-ZIP fuzzy pass (0 = all cores)")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignore the persisted master index and dedup everything. "
+                             "Incremental runs keep leads whose records are no longer "
+                             "in the input; a rebuild drops them")
+    parser.add_argument("--no-audit", action="store_true",
+                        help="Don't append merge decisions to the audit log")
+    parser.add_argument("--external", action="store_true",
+                        help="Spill to on-disk ZIP shards for inputs larger than memory")
+    parser.add_argument("--memory-budget-mb", type=int, default=1024,
+                        help="Per-shard memory budget for --external (default: 1024)")
     args = parser.parse_args()
-    deduplicate_from_file()
+    workers = args.workers or os.cpu_count() or 1
+    if args.external:
+        from tools.dedup_external import deduplicate_external_from_file
+        deduplicate_external_from_file(
+            os.path.join(PROJECT_ROOT, ".tmp", "normalized_records.json"),
+            os.path.join(PROJECT_ROOT, ".tmp", "deduplicated_leads.json"),
+            memory_budget_mb=args.memory_budget_mb,
+            workers=workers,
+            review_file=os.path.join(PROJECT_ROOT, ".tmp", "review_flags.json"),
+            audit=not args.no_audit,
+        )
+    else:
+        deduplicate_from_file(workers=workers, rebuild=args.rebuild, audit=not args.no_audit)
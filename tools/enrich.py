@@ -3,60 +3,212 @@ enrich.py — Enrichment engine that runs all enabled plugins on leads.
 
 Loads enrichment plugins and applies them to each lead, merging the
 results back into the lead record. Produces an enrichment log for
-auditing and a summary report on completion.
+auditing and a summary report on completion. The log is streamed to
+.tmp/enrichment_log.jsonl.gz (one JSON object per lead × plugin outcome)
+in buffered blocks; only the per-plugin counters are kept in memory.
+
+Network plugins (io_bound: geo_distance, hunter_email) run on their own
+thread pools with per-plugin concurrency and rate limits while the CPU
+plugins run inline, so wall time is bounded by the slowest API rather
+than the sum of them. Plugins are grouped into waves by `depends_on`:
+a plugin that reads another's fields runs in a later wave when that
+plugin is io_bound (or it is), and in plugin order within a wave
+otherwise. Results are merged on the main thread only.
+
+Plugins are called through enrich_batch() on chunks of `batch_size`
+leads, so simple plugins can vectorize and API plugins can look up each
+distinct key once per chunk.
+
+Plugins that declare `input_fields` are skipped on leads whose inputs
+haven't changed since the plugin (at its current `version`) last
+enriched them; the stored result is replayed instead (see
+tools/enrichment_fingerprints.py), so re-running on an unchanged dataset
+is near-instant. --force re-runs everything.
+
+Plugins are imported by name only when requested, and third-party plugins
+are discovered through package entry points (see
+tools/enrichment_plugins/registry.py), so a run of one cheap plugin
+starts without loading the others.
+
+Plugins that spend paid API credits (hunter_email) plan the run first:
+they see every lead, pick the ones worth this run's credit budget, and
+skip the rest until a later run.
 
 Usage:
     python tools/enrich.py                  # Enrich from DB
     python tools/enrich.py --json           # Enrich from .tmp JSON files
     python tools/enrich.py --plugins waste_volume,geo_distance  # Run specific plugins only
     python tools/enrich.py --dry-run        # Preview without modifying data
+    python tools/enrich.py --geocode-batch census   # Batch-geocode uncached addresses first
+    python tools/enrich.py --serial         # Run every plugin inline (debugging)
+    python tools/enrich.py --force          # Ignore stored fingerprints, re-run every plugin
+    python tools/enrich.py --log-changes-only   # Log enrichments and errors, not skips
+    python tools/enrich.py --hunter-credits 200 # Hunter.io credits to spend this run
 """
 
+import gzip
 import json
 import os
 import sys
 import argparse
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
-from tools.enrichment_plugins.waste_volume import WasteVolumeEstimator
-from tools.enrichment_plugins.geo_distance import GeoDistanceCalculator
-from tools.enrichment_plugins.cms_bed_count import CMSBedCountEnricher
-from tools.enrichment_plugins.data_completeness import DataCompletenessScorer
-from tools.enrichment_plugins.hunter_email import HunterEmailEnricher
-
-# Registry of available plugins
-AVAILABLE_PLUGINS = {
-    "waste_volume": WasteVolumeEstimator,
-    "geo_distance": GeoDistanceCalculator,
-    "cms_bed_count": CMSBedCountEnricher,
-    "data_completeness": DataCompletenessScorer,
-    "hunter_email": HunterEmailEnricher,
-}
+from tools.enrichment_plugins.registry import available_plugins, create_plugin, plugin_target
+from tools.enrichment_plugins.batch_geocoder import BATCH_BACKENDS
+from tools.lead_record import LeadRecord
+from tools.enrichment_fingerprints import FingerprintStore
 
 # Default plugin execution order (data_completeness should run last)
 DEFAULT_ORDER = ["cms_bed_count", "waste_volume", "geo_distance", "hunter_email", "data_completeness"]
 
-ENRICHMENT_LOG_FILE = os.path.join(PROJECT_ROOT, ".tmp", "enrichment_log.json")
+ENRICHMENT_LOG_FILE = os.path.join(PROJECT_ROOT, ".tmp", "enrichment_log.jsonl.gz")
+LOG_FLUSH_EVERY = 10000  # Entries per compressed block
+
+
+class EnrichmentLogWriter:
+    """Streams lead × plugin outcomes to gzip-compressed JSONL.
+
+    Lines are buffered and written LOG_FLUSH_EVERY at a time, each block
+    ending in a gzip sync flush, so the file stays readable up to the last
+    block if the run dies. With `changes_only`, skips and unchanged
+    (fingerprint-replayed) outcomes aren't written.
+    """
+
+    def __init__(self, path=ENRICHMENT_LOG_FILE, changes_only=False):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.changes_only = changes_only
+        self.written = 0
+        self._buffer = []
+        self._file = gzip.open(path, "wt", encoding="utf-8")
+
+    def wants(self, status):
+        return not (self.changes_only and status in ("skipped", "unchanged"))
+
+    def write(self, lead_uid, plugin_name, status, fields_added=None, error=None):
+        if not self.wants(status):
+            return
+        entry = {"lead_uid": lead_uid, "plugin": plugin_name, "status": status}
+        if fields_added:
+            entry["fields_added"] = fields_added
+        if error is not None:
+            entry["error"] = error
+        self._buffer.append(json.dumps(entry, default=str, separators=(",", ":")))
+        if len(self._buffer) >= LOG_FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self.written += len(self._buffer)
+            self._buffer = []
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
 
 
 def get_plugins(plugin_names=None):
-    """Instantiate and return the requested plugins in order."""
+    """Import, instantiate and return the requested plugins in order.
+
+    Only the requested plugins' modules are imported (see
+    tools/enrichment_plugins/registry.py).
+    """
     if plugin_names:
-        names = [n.strip() for n in plugin_names if n.strip() in AVAILABLE_PLUGINS]
+        names = []
+        for name in (n.strip() for n in plugin_names):
+            if plugin_target(name):
+                names.append(name)
+            elif name:
+                print(f"  Unknown plugin: {name} (available: {', '.join(available_plugins())})")
     else:
         names = DEFAULT_ORDER
 
     plugins = []
     for name in names:
-        cls = AVAILABLE_PLUGINS.get(name)
-        if cls:
-            plugins.append(cls())
+        try:
+            plugins.append(create_plugin(name))
+        except Exception as e:
+            print(f"  Could not load plugin {name}: {e}")
     return plugins
 
 
+def plan_waves(plugins, concurrent=True):
+    """Group plugins (in order) into waves that respect `depends_on`.
+
+    A plugin's wave is the latest of its dependencies' waves, plus one if
+    either side runs on a pool (pool results are merged only at the end
+    of a wave). Dependencies that aren't active in this run are ignored.
+    """
+    wave_of = {}
+    waves = []
+    for plugin in plugins:
+        pooled = concurrent and plugin.io_bound
+        wave = 0
+        for dep in plugin.depends_on:
+            if dep in wave_of:
+                dep_wave, dep_pooled = wave_of[dep]
+                wave = max(wave, dep_wave + (1 if pooled or dep_pooled else 0))
+        wave_of[plugin.name] = (wave, pooled)
+        while len(waves) <= wave:
+            waves.append([])
+        waves[wave].append(plugin)
+    return waves
+
+
+def run_plugin(plugin, lead):
+    """Run one plugin on one lead. Returns ("enriched", fields), ("skipped", None) or ("error", exc)."""
+    try:
+        if plugin.can_enrich(lead):
+            fields = plugin.enrich(lead)
+            if fields:
+                return "enriched", fields
+        return "skipped", None
+    except Exception as e:
+        return "error", e
+
+
+def run_batch(plugin, leads):
+    """Run one plugin on a chunk of leads. Returns one run_plugin()-style outcome per lead.
+
+    If enrich_batch() raises, the chunk is retried lead by lead so a bad
+    lead only fails itself.
+    """
+    try:
+        return [("enriched", fields) if fields else ("skipped", None)
+                for fields in plugin.enrich_batch(leads)]
+    except Exception:
+        return [run_plugin(plugin, lead) for lead in leads]
+
+
+def run_changed(plugin, leads, outcomes):
+    """run_batch() on the leads whose outcome isn't already known (None).
+
+    Returns `outcomes` with those slots filled in.
+    """
+    todo = [i for i, outcome in enumerate(outcomes) if outcome is None]
+    if todo:
+        for i, outcome in zip(todo, run_batch(plugin, [leads[i] for i in todo])):
+            outcomes[i] = outcome
+    return outcomes
+
+
+def _chunks(count, size):
+    return [(start, min(start + size, count)) for start in range(0, count, size)]
+
+
+def _job_indices(plugin, leads):
+    """Lead indices in the order a pooled plugin wants them submitted."""
+    if hasattr(plugin, "job_order"):
+        return list(plugin.job_order(leads))
+    return list(range(len(leads)))
+
+
 def enrich_lead(lead, plugins):
     """Run all plugins on a single lead and merge results."""
     for plugin in plugins:
@@ -70,8 +222,20 @@ def enrich_lead(lead, plugins):
     return lead
 
 
-def enrich_all(leads, plugin_names=None, dry_run=False):
-    """Run enrichment on a list of leads. Returns enriched leads + stats."""
+def enrich_all(leads, plugin_names=None, dry_run=False, geocode_batch=None, concurrent=True,
+               force=False, log_changes_only=False, credit_budget=None):
+    """Run enrichment on a list of leads. Returns enriched leads + stats.
+
+    Leads are converted to compact LeadRecords in place for the duration
+    of the run (so the original dicts can be freed one by one) and back
+    to dicts before returning. With `geocode_batch` (a BATCH_BACKENDS
+    name), plugins that support it prefetch their lookups in bulk first.
+    With `concurrent=False` every plugin runs inline, one lead at a time.
+    `force` ignores stored fingerprints (results are still recorded).
+    `log_changes_only` leaves skips out of the enrichment log.
+    `credit_budget` overrides the per-run budget of plugins that plan
+    paid API credits.
+    """
     print("Harvest Med Waste — Enrichment Engine")
     if dry_run:
         print("  *** DRY RUN — no data will be modified ***")
@@ -82,76 +246,143 @@ def enrich_all(leads, plugin_names=None, dry_run=False):
     print(f"Leads to enrich: {len(leads)}")
     print()
 
-    stats = {p.name: {"enriched": 0, "skipped": 0, "errors": 0} for p in plugins}
-    enrichment_log = []
+    stats = {p.name: {"enriched": 0, "unchanged": 0, "skipped": 0, "errors": 0} for p in plugins}
     start = time.time()
+    fingerprints = FingerprintStore([p.name for p in plugins])
 
     for i, lead in enumerate(leads):
+        leads[i] = LeadRecord.from_dict(lead)
+
+    if geocode_batch:
         for plugin in plugins:
-            log_entry = {
-                "lead_uid": lead.get("lead_uid", lead.get("id", f"idx-{i}")),
-                "plugin": plugin.name,
-                "status": None,
-                "fields_added": [],
-                "error": None,
-            }
-
-            try:
-                if plugin.can_enrich(lead):
-                    fields = plugin.enrich(lead)
-                    if fields:
-                        if not dry_run:
-                            lead.update(fields)
-                        # Track which fields were added (skip internal fields)
-                        log_entry["fields_added"] = [
-                            k for k in fields.keys() if not k.startswith("_")
-                        ]
-                        log_entry["status"] = "enriched"
-                        stats[plugin.name]["enriched"] += 1
-                    else:
-                        log_entry["status"] = "skipped"
-                        stats[plugin.name]["skipped"] += 1
-                else:
-                    log_entry["status"] = "skipped"
-                    stats[plugin.name]["skipped"] += 1
-            except Exception as e:
-                log_entry["status"] = "error"
-                log_entry["error"] = str(e)
-                stats[plugin.name]["errors"] += 1
-                if stats[plugin.name]["errors"] <= 5:
-                    print(f"  {plugin.name} error: {e}")
-
-            enrichment_log.append(log_entry)
-
-        if (i + 1) % 2000 == 0:
-            print(f"  Enriched {i + 1}/{len(leads)}...", flush=True)
+            if hasattr(plugin, "prefetch"):
+                plugin.prefetch(leads, BATCH_BACKENDS[geocode_batch]())
+
+    for plugin in plugins:
+        if hasattr(plugin, "plan"):
+            if credit_budget is not None:
+                plugin.credit_budget = credit_budget
+            plugin.plan(leads)
+
+    def known_outcomes(plugin, chunk):
+        """Fingerprint a chunk. Returns (fingerprints, outcomes): outcomes hold
+        the stored result for unchanged leads and None for leads to run."""
+        fps = fingerprints.fingerprints(plugin, chunk)
+        if force:
+            return fps, [None] * len(chunk)
+        outcomes = []
+        for lead, fp in zip(chunk, fps):
+            fields = fingerprints.lookup(plugin, lead, fp)
+            outcomes.append(None if fields is None else ("unchanged", fields))
+        return fps, outcomes
+
+    def record(plugin, i, lead, outcome, fp=None):
+        """Merge one plugin result into its lead and log it (main thread only)."""
+        status, result = outcome
+        fields_added, error = None, None
+        if status in ("enriched", "unchanged"):
+            if not dry_run:
+                lead.update(result)
+            # Track which fields were added (skip internal fields)
+            fields_added = [k for k in result.keys() if not k.startswith("_")]
+            if status == "enriched" and plugin.is_final(lead, result):
+                fingerprints.remember(plugin, lead, fp, result)
+        elif status == "error":
+            error = str(result)
+            if stats[plugin.name]["errors"] < 5:
+                print(f"  {plugin.name} error: {result}")
+        stats[plugin.name]["errors" if status == "error" else status] += 1
+        if enrichment_log.wants(status):
+            enrichment_log.write(lead.get("lead_uid", lead.get("id", f"idx-{i}")), plugin.name, status,
+                                 fields_added, error)
+
+    def run_wave(wave):
+        """Run one wave: pooled plugins in the background, inline plugins chunk by chunk."""
+        pooled = [p for p in wave if concurrent and p.io_bound]
+        inline = [p for p in wave if p not in pooled]
+
+        # Start the network plugins first; workers only read the lead
+        executors, pending = [], []
+        for plugin in pooled:
+            executor = ThreadPoolExecutor(max_workers=plugin.max_workers,
+                                          thread_name_prefix=plugin.name)
+            executors.append(executor)
+            jobs = []
+            order = _job_indices(plugin, leads)
+            for begin, end in _chunks(len(order), plugin.batch_size):
+                indices = order[begin:end]
+                chunk = [leads[i] for i in indices]
+                fps, outcomes = known_outcomes(plugin, chunk)
+                jobs.append((begin, indices, fps, executor.submit(run_changed, plugin, chunk, outcomes)))
+            pending.append((plugin, jobs))
+            print(f"  {plugin.name}: running on {plugin.max_workers} worker(s)")
+
+        try:
+            if inline:
+                for begin, end in _chunks(len(leads), min(p.batch_size for p in inline)):
+                    chunk = leads[begin:end]
+                    for plugin in inline:
+                        # Fingerprinted after earlier plugins in the wave merged into the chunk
+                        fps, outcomes = known_outcomes(plugin, chunk)
+                        for offset, outcome in enumerate(run_changed(plugin, chunk, outcomes)):
+                            record(plugin, begin + offset, chunk[offset], outcome, fps[offset])
+                    if end // 2000 > begin // 2000:
+                        print(f"  Enriched {end}/{len(leads)} ({', '.join(p.name for p in inline)})...",
+                              flush=True)
+
+            # Merge pooled results in submission order so runs are reproducible
+            for plugin, jobs in pending:
+                for begin, indices, fps, future in jobs:
+                    outcomes = future.result()
+                    for i, fp, outcome in zip(indices, fps, outcomes):
+                        record(plugin, i, leads[i], outcome, fp)
+                    end = begin + len(outcomes)
+                    if end // 2000 > begin // 2000:
+                        print(f"  {plugin.name}: {end}/{len(leads)}...", flush=True)
+        finally:
+            for executor in executors:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    enrichment_log = EnrichmentLogWriter(changes_only=log_changes_only)
+    try:
+        for wave in plan_waves(plugins, concurrent):
+            run_wave(wave)
+    finally:
+        enrichment_log.close()
 
     elapsed = time.time() - start
 
+    for i, lead in enumerate(leads):
+        leads[i] = lead.to_dict()
+
     # Flush geo cache if the geo_distance plugin was used
     for plugin in plugins:
         if hasattr(plugin, "flush_cache"):
             plugin.flush_cache()
 
-    # Write enrichment log
-    os.makedirs(os.path.dirname(ENRICHMENT_LOG_FILE), exist_ok=True)
-    with open(ENRICHMENT_LOG_FILE, "w") as f:
-        json.dump(enrichment_log, f, indent=2)
+    # Dry runs don't merge fields, so later plugins saw stale inputs
+    if not dry_run:
+        fingerprints.flush()
 
     # Print summary
     total_enriched = sum(s["enriched"] for s in stats.values())
     total_errors = sum(s["errors"] for s in stats.values())
     total_skipped = sum(s["skipped"] for s in stats.values())
+    total_unchanged = sum(s["unchanged"] for s in stats.values())
 
     print(f"\nEnrichment complete ({elapsed:.1f}s):")
     print(f"  Enriched: {total_enriched:,} lead-plugin pairs")
+    print(f"  Unchanged: {total_unchanged:,} (inputs same as last run, results reused)")
     print(f"  Failed: {total_errors:,} (see {ENRICHMENT_LOG_FILE})")
     print(f"  Skipped: {total_skipped:,}")
+    print(f"  Log: {enrichment_log.written:,} entries in {ENRICHMENT_LOG_FILE}")
     print()
     print("  By plugin:")
     for plugin in plugins:
         s = stats[plugin.name]
         parts = [f"{s['enriched']} enriched"]
+        if s["unchanged"]:
+            parts.append(f"{s['unchanged']} unchanged")
         if s["skipped"]:
             parts.append(f"{s['skipped']} skipped")
         if s["errors"]:
@@ -161,7 +392,8 @@ def enrich_all(leads, plugin_names=None, dry_run=False):
     return leads, stats
 
 
-def enrich_from_json(plugin_names=None, dry_run=False):
+def enrich_from_json(plugin_names=None, dry_run=False, geocode_batch=None, concurrent=True,
+                     force=False, log_changes_only=False, credit_budget=None):
     """Load leads from JSON, enrich, and save."""
     input_file = os.path.join(PROJECT_ROOT, ".tmp", "deduplicated_leads.json")
     if not os.path.exists(input_file):
@@ -185,7 +417,9 @@ def enrich_from_json(plugin_names=None, dry_run=False):
         if "zip" in lead and "zip5" not in lead:
             lead["zip5"] = lead.get("zip", "")[:5]
 
-    leads, stats = enrich_all(leads, plugin_names, dry_run=dry_run)
+    leads, stats = enrich_all(leads, plugin_names, dry_run=dry_run, geocode_batch=geocode_batch,
+                              concurrent=concurrent, force=force, log_changes_only=log_changes_only,
+                              credit_budget=credit_budget)
 
     if not dry_run:
         output_file = os.path.join(PROJECT_ROOT, ".tmp", "enriched_leads.json")
@@ -198,7 +432,8 @@ def enrich_from_json(plugin_names=None, dry_run=False):
     return leads
 
 
-def enrich_from_db(plugin_names=None, dry_run=False):
+def enrich_from_db(plugin_names=None, dry_run=False, geocode_batch=None, concurrent=True,
+                   force=False, log_changes_only=False, credit_budget=None):
     """Load leads from database, enrich, and update."""
     from tools.db import fetch_all, get_cursor
 
@@ -210,7 +445,8 @@ def enrich_from_db(plugin_names=None, dry_run=False):
                estimated_waste_lbs_per_day, distance_from_birmingham,
                latitude, longitude, facility_established_date,
                contract_expiry_date,
-               contact_email, contact_name, contact_title, email_confidence
+               contact_email, contact_name, contact_title, email_confidence,
+               lead_score, priority_tier
         FROM leads
     """)
 
@@ -218,7 +454,9 @@ def enrich_from_db(plugin_names=None, dry_run=False):
         print("No leads in database. Run the pipeline first.")
         return []
 
-    leads, stats = enrich_all(rows, plugin_names, dry_run=dry_run)
+    leads, stats = enrich_all(rows, plugin_names, dry_run=dry_run, geocode_batch=geocode_batch,
+                              concurrent=concurrent, force=force, log_changes_only=log_changes_only,
+                              credit_budget=credit_budget)
 
     if not dry_run:
         # Update database with enrichment fields
@@ -270,16 +508,29 @@ if __name__ == "__main__":
     parser.add_argument("--json", action="store_true", help="Read from JSON files")
     parser.add_argument("--plugins", type=str, help="Comma-separated plugin names")
     parser.add_argument("--dry-run", action="store_true", help="Preview enrichment without modifying data")
+    parser.add_argument("--geocode-batch", choices=sorted(BATCH_BACKENDS),
+                        help="Batch-geocode uncached addresses before the per-lead pass")
+    parser.add_argument("--serial", action="store_true",
+                        help="Run network plugins inline instead of on thread pools")
+    parser.add_argument("--force", action="store_true",
+                        help="Re-run every plugin even where its inputs are unchanged")
+    parser.add_argument("--log-changes-only", action="store_true",
+                        help="Write only enrichments and errors to the enrichment log")
+    parser.add_argument("--hunter-credits", type=int,
+                        help="Hunter.io credits to spend this run (default $HUNTER_CREDIT_BUDGET or 500)")
     args = parser.parse_args()
 
     plugin_list = args.plugins.split(",") if args.plugins else None
+    options = dict(dry_run=args.dry_run, geocode_batch=args.geocode_batch, concurrent=not args.serial,
+                   force=args.force, log_changes_only=args.log_changes_only,
+                   credit_budget=args.hunter_credits)
 
     if args.json:
-        enrich_from_json(plugin_list, dry_run=args.dry_run)
+        enrich_from_json(plugin_list, **options)
     else:
         try:
-            enrich_from_db(plugin_list, dry_run=args.dry_run)
+            enrich_from_db(plugin_list, **options)
         except Exception as e:
             print(f"DB error: {e}")
             print("Falling back to JSON mode...")
-            enrich_from_json(plugin_list, dry_run=args.dry_run)
+            enrich_from_json(plugin_list, **options)
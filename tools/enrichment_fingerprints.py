@@ -0,0 +1,115 @@
+"""
+enrichment_fingerprints.py — Skip enrichment plugins whose inputs haven't changed.
+
+Each plugin declares the lead fields it reads (`input_fields`) and a
+`version`. After a plugin enriches a lead, enrich.py stores a hash of
+those input values together with the fields the plugin returned, keyed by
+(lead, plugin), in .tmp/enrichment_fingerprints.db. On the next run a lead
+whose inputs hash the same under the same plugin version isn't passed to
+the plugin again; the stored fields are replayed instead, so the output
+is identical and re-running an unchanged dataset costs only the hashing.
+
+Bumping a plugin's `version` re-runs just that plugin. Only successful,
+final enrichments are stored: skips, errors and provisional results (see
+EnrichmentPlugin.is_final) are retried every run (they may depend on
+things outside the lead, like an API key or a geocoding service). Changes to a
+plugin's external data (a new CMS file, a cleared cache) need a version
+bump or `enrich.py --force`.
+
+Usage:
+    store = FingerprintStore([p.name for p in plugins])
+    fps = store.fingerprints(plugin, leads)
+    fields = store.lookup(plugin, lead, fp)     # None → run the plugin
+    store.remember(plugin, lead, fp, fields)
+    store.flush()
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+
+from tools.lead_record import column
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FINGERPRINT_DB = os.path.join(PROJECT_ROOT, ".tmp", "enrichment_fingerprints.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fingerprints (
+    lead_key TEXT NOT NULL,
+    plugin TEXT NOT NULL,
+    version TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    fields TEXT NOT NULL,
+    PRIMARY KEY (plugin, lead_key)
+) WITHOUT ROWID;
+"""
+
+
+def lead_key(lead):
+    """Stable identity for a lead across runs, or None."""
+    key = lead.get("lead_uid") or lead.get("id")
+    return str(key) if key is not None else None
+
+
+class FingerprintStore:
+    """Stored (version, input hash, output fields) per (plugin, lead)."""
+
+    def __init__(self, plugin_names, path=FINGERPRINT_DB):
+        self.path = path
+        self._known = {name: {} for name in plugin_names}
+        self._pending = []
+        if os.path.exists(path):
+            conn = sqlite3.connect(path)
+            for name in plugin_names:
+                self._known[name] = {
+                    key: (version, fingerprint, fields)
+                    for key, version, fingerprint, fields in conn.execute(
+                        "SELECT lead_key, version, fingerprint, fields FROM fingerprints "
+                        "WHERE plugin = ?", (name,))
+                }
+            conn.close()
+
+    def fingerprints(self, plugin, leads):
+        """Hash of the plugin's input fields for each lead (None if untracked).
+
+        Lead values are plain str/int/float/None, whose repr() is stable.
+        """
+        if not plugin.input_fields:
+            return [None] * len(leads)
+        columns = [column(leads, field) for field in plugin.input_fields]
+        return [hashlib.blake2b(repr(values).encode(), digest_size=16).hexdigest()
+                for values in zip(*columns)]
+
+    def lookup(self, plugin, lead, fingerprint):
+        """Fields stored for an unchanged (lead, plugin, version), else None."""
+        if fingerprint is None:
+            return None
+        stored = self._known[plugin.name].get(lead_key(lead))
+        if stored is None or stored[0] != str(plugin.version) or stored[1] != fingerprint:
+            return None
+        return json.loads(stored[2])
+
+    def remember(self, plugin, lead, fingerprint, fields):
+        """Queue a successful enrichment for flush()."""
+        key = lead_key(lead)
+        if fingerprint is None or key is None:
+            return
+        self._pending.append((key, plugin.name, str(plugin.version), fingerprint,
+                              json.dumps(fields, default=str)))
+
+    def flush(self):
+        """Write queued fingerprints in one transaction. Returns the number written."""
+        if not self._pending:
+            return 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO fingerprints (lead_key, plugin, version, fingerprint, fields) "
+                "VALUES (?, ?, ?, ?, ?)", self._pending)
+        conn.close()
+        written = len(self._pending)
+        self._pending = []
+        return written
@@ -2,18 +2,72 @@
 base.py — Enrichment plugin interface.
 
 All enrichment plugins must inherit from EnrichmentPlugin and implement
-the can_enrich() and enrich() methods.
+the can_enrich() and enrich() methods. enrich.py calls enrich_batch() on
+chunks of leads; override it to vectorize or to look up each distinct key
+once per chunk.
+
+Execution hints read by enrich.py:
+  io_bound     network plugins run on their own thread pool, concurrently
+               with the CPU plugins (which run inline)
+  max_workers  pool size for an io_bound plugin
+  depends_on   names of plugins whose fields this one reads; it only runs
+               once they have finished for every lead
+  batch_size   leads per enrich_batch() call (pooled plugins run one
+               chunk per worker at a time)
+  input_fields lead fields the plugin's result depends on; a lead whose
+               inputs are unchanged since the last run is skipped (see
+               tools/enrichment_fingerprints.py). Empty = always run
+  is_final()   False for a provisional result (a fallback a later run can
+               improve on); those aren't fingerprinted, so the lead runs
+               again next time
+  version      bump when the plugin's logic or reference data changes,
+               to re-run it on every lead
 """
 
+import threading
+import time
 from abc import ABC, abstractmethod
 
 
+class RateLimiter:
+    """Thread-safe request pacing shared by all of a plugin's workers.
+
+    Hands out start times at least 1/per_second apart, so N workers
+    together never exceed the rate.
+    """
+
+    def __init__(self, per_second):
+        self.interval = 1.0 / per_second if per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def pause(self, seconds):
+        """Hold every worker's next request for `seconds` (e.g. after a 429)."""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
 class EnrichmentPlugin(ABC):
     """Base class for enrichment plugins."""
 
     name: str = "base"
     description: str = "Base enrichment plugin"
 
+    io_bound: bool = False
+    max_workers: int = 1
+    depends_on: tuple = ()
+    batch_size: int = 1000
+    input_fields: tuple = ()
+    version: int = 1
+
     @abstractmethod
     def can_enrich(self, lead: dict) -> bool:
         """Return True if this plugin can add data to the given lead."""
@@ -24,8 +78,22 @@ class EnrichmentPlugin(ABC):
         """Return a dict of enrichment fields to merge into the lead.
 
         Should NOT modify the lead in place — return only the new/updated fields.
+        io_bound plugins are called from worker threads, so any shared
+        state (caches, counters) must be guarded.
         """
         pass
 
+    def is_final(self, lead: dict, fields: dict) -> bool:
+        """Return False if `fields` is a provisional result worth retrying next run."""
+        return True
+
+    def enrich_batch(self, leads) -> list:
+        """Return one dict of enrichment fields per lead ({} for nothing to add).
+
+        The default loops over can_enrich()/enrich(). An exception fails the
+        whole chunk; enrich.py then retries it lead by lead to isolate the error.
+        """
+        return [(self.enrich(lead) or {}) if self.can_enrich(lead) else {} for lead in leads]
+
     def __repr__(self):
         return f"<{self.__class__.__name__}: {self.name}>"
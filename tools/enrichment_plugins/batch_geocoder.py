@@ -0,0 +1,139 @@
+"""
+batch_geocoder.py — Batch geocoding backends in the Census batch CSV format.
+
+The Census Bureau batch geocoder takes up to 10,000 addresses per request
+as a headerless CSV of
+
+    Unique ID, Street address, City, State, ZIP
+
+and returns one row per address:
+
+    "ID","Input address","Match","Exact","Matched address","-86.80,33.52","TIGER id","L"
+
+with "No_Match" / "Tie" in the third column when it can't place one.
+GeoDistanceCalculator.prefetch() submits every uncached address of a run
+through one of these backends and writes the matches to the geocode cache
+in bulk, so the per-lead loop only reads the cache for them. Misses aren't
+cached; those addresses take the per-lead path as before.
+
+Backends:
+  census  CensusBatchGeocoder — the public Census endpoint (no API key)
+  local   LocalBatchGeocoder  — answers from the local gazetteer (or a
+          given lookup function) but round-trips the same CSV format, for
+          tests and offline runs
+"""
+
+import csv
+import io
+
+CENSUS_BATCH_URL = "https://geocoding.geo.census.gov/geocoder/locations/addressbatch"
+CENSUS_BENCHMARK = "Public_AR_Current"
+CENSUS_BATCH_SIZE = 10000
+CENSUS_TIMEOUT = 600
+
+
+def format_batch_csv(rows):
+    """Rows of (id, street, city, state, zip) → Census batch request CSV."""
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator="\n")
+    writer.writerows(rows)
+    return out.getvalue()
+
+
+def parse_batch_response(text):
+    """Census batch response CSV → {id: (lat, lon) or (None, None)}."""
+    results = {}
+    for row in csv.reader(io.StringIO(text)):
+        if not row:
+            continue
+        row_id = row[0]
+        lat = lon = None
+        if len(row) >= 6 and row[2] == "Match":
+            try:
+                lon_text, lat_text = row[5].split(",")
+                lat, lon = float(lat_text), float(lon_text)
+            except ValueError:
+                lat = lon = None
+        results[row_id] = (lat, lon)
+    return results
+
+
+class CensusBatchGeocoder:
+    """Submits addresses to the Census batch endpoint in 10k-row jobs."""
+
+    name = "census"
+
+    def __init__(self, url=CENSUS_BATCH_URL, benchmark=CENSUS_BENCHMARK,
+                 batch_size=CENSUS_BATCH_SIZE, timeout=CENSUS_TIMEOUT):
+        self.url = url
+        self.benchmark = benchmark
+        self.batch_size = batch_size
+        self.timeout = timeout
+
+    def _submit(self, csv_text):
+        import requests
+        resp = requests.post(
+            self.url,
+            data={"benchmark": self.benchmark},
+            files={"addressFile": ("addresses.csv", csv_text, "text/csv")},
+            timeout=self.timeout,
+        )
+        resp.raise_for_status()
+        return resp.text
+
+    def geocode(self, rows):
+        """Geocode (id, street, city, state, zip) rows. Returns {id: (lat, lon)}.
+
+        A failed job leaves its ids out of the result (they stay uncached
+        and fall through to the single-address path).
+        """
+        # Imported here so enrich.py can list the backends without loading requests
+        import requests
+        results = {}
+        for start in range(0, len(rows), self.batch_size):
+            chunk = rows[start:start + self.batch_size]
+            try:
+                results.update(parse_batch_response(self._submit(format_batch_csv(chunk))))
+            except requests.RequestException as e:
+                print(f"  Census batch job {start // self.batch_size + 1} failed: {e}")
+            print(f"  Batch geocoded {min(start + self.batch_size, len(rows))}/{len(rows)}...",
+                  flush=True)
+        return results
+
+
+class LocalBatchGeocoder:
+    """Stand-in batch backend speaking the Census CSV format.
+
+    `lookup(street, zip5)` returns (lat, lon) or (None, None); defaults to
+    the local gazetteer.
+    """
+
+    name = "local"
+
+    def __init__(self, lookup=None):
+        if lookup is None:
+            from tools.gazetteer import LocalGeocoder
+            lookup = LocalGeocoder().geocode
+        self.lookup = lookup
+
+    def _respond(self, csv_text):
+        out = io.StringIO()
+        writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\n")
+        for row_id, street, city, state, zip5 in csv.reader(io.StringIO(csv_text)):
+            input_address = f"{street}, {city}, {state}, {zip5}"
+            lat, lon = self.lookup(street, zip5)
+            if lat is None:
+                writer.writerow([row_id, input_address, "No_Match"])
+            else:
+                writer.writerow([row_id, input_address, "Match", "Exact", input_address.upper(),
+                                 f"{lon:.6f},{lat:.6f}", "", ""])
+        return out.getvalue()
+
+    def geocode(self, rows):
+        return parse_batch_response(self._respond(format_batch_csv(rows)))
+
+
+BATCH_BACKENDS = {
+    "census": CensusBatchGeocoder,
+    "local": LocalBatchGeocoder,
+}
@@ -7,6 +7,8 @@ bed counts, hospital type, and ownership information.
 
 import json
 import os
+from collections import defaultdict
+from difflib import SequenceMatcher
 from tools.enrichment_plugins.base import EnrichmentPlugin
 from tools.normalize import normalize_name, normalize_address
 
@@ -20,14 +22,25 @@ NO_BED_TYPES = {
     "Podiatry", "Dialysis", "Medical Spa",
 }
 
+# Character n-gram length for the partial name match index
+NGRAM = 3
+
+
+def _ngrams(text):
+    return {text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1)}
+
 
 class CMSBedCountEnricher(EnrichmentPlugin):
     name = "cms_bed_count"
+    input_fields = ("facility_type", "facility_name", "address_line1", "city", "bed_count")
     description = "Add bed counts and hospital classification from CMS POS data"
 
     def __init__(self):
         self._cms_data = None
         self._name_index = {}
+        self._gram_index = {}     # Character trigram → [normalized CMS names]
+        self._anchor_index = {}   # Rarest trigram of a CMS name → [normalized CMS names]
+        self._short_names = []    # CMS names too short to have a trigram
         self._address_index = {}
         self._loaded = False
 
@@ -72,6 +85,47 @@ class CMSBedCountEnricher(EnrichmentPlugin):
                 key = f"{addr}|{city}"
                 self._address_index[key] = rec
 
+        # Trigram indexes for partial (substring) name matching
+        gram_index = defaultdict(list)
+        for name in self._name_index:
+            for gram in _ngrams(name):
+                gram_index[gram].append(name)
+        anchor_index = defaultdict(list)
+        for name in self._name_index:
+            grams = _ngrams(name)
+            if grams:
+                anchor = min(grams, key=lambda g: (len(gram_index[g]), g))
+                anchor_index[anchor].append(name)
+            else:
+                self._short_names.append(name)
+        self._gram_index = dict(gram_index)
+        self._anchor_index = dict(anchor_index)
+
+    def _partial_name_match(self, lead_name):
+        """Best CMS name containing, or contained in, the lead name.
+
+        Candidates come from the trigram indexes instead of a scan: a CMS
+        name containing the lead name has every lead trigram, and a CMS name
+        inside the lead name has its rarest trigram among the lead trigrams.
+        Names shorter than a trigram are checked directly. Substring matches are ranked by similarity to the lead name, ties
+        broken by name, so the result doesn't depend on index order.
+        """
+        grams = _ngrams(lead_name)
+        if grams:
+            postings = sorted((self._gram_index.get(g, []) for g in grams), key=len)
+            candidates = set(postings[0]).intersection(*postings[1:])
+        else:
+            candidates = {name for name in self._name_index if lead_name in name}
+        for gram in grams:
+            candidates.update(self._anchor_index.get(gram, ()))
+        candidates.update(self._short_names)
+
+        matches = [name for name in candidates if lead_name in name or name in lead_name]
+        if not matches:
+            return None
+        best = min(matches, key=lambda name: (-SequenceMatcher(None, lead_name, name).ratio(), name))
+        return self._name_index[best]
+
     def can_enrich(self, lead: dict) -> bool:
         self._load()
         facility_type = lead.get("facility_type", "")
@@ -112,11 +166,9 @@ class CMSBedCountEnricher(EnrichmentPlugin):
 
         # Try partial name matching
         if not cms_rec and lead_name:
-            for name, rec in self._name_index.items():
-                if name and (lead_name in name or name in lead_name):
-                    cms_rec = rec
-                    match_confidence = 0.8
-                    break
+            cms_rec = self._partial_name_match(lead_name)
+            if cms_rec:
+                match_confidence = 0.8
 
         # Fallback: address-based matching
         if not cms_rec:
@@ -5,7 +5,10 @@ Checks which fields are populated and returns a completeness score
 between 0.0 (no data) and 1.0 (fully populated).
 """
 
+import numpy as np
+
 from tools.enrichment_plugins.base import EnrichmentPlugin
+from tools.lead_record import column
 
 # Fields and their weights for completeness scoring
 SCORED_FIELDS = {
@@ -28,6 +31,9 @@ SCORED_FIELDS = {
 class DataCompletenessScorer(EnrichmentPlugin):
     name = "data_completeness"
     description = "Score lead data completeness (0-1)"
+    # Runs last: scores the lead once every other plugin has filled it in
+    depends_on = ("cms_bed_count", "waste_volume", "geo_distance", "hunter_email")
+    input_fields = tuple(SCORED_FIELDS)
 
     def can_enrich(self, lead: dict) -> bool:
         return True
@@ -46,3 +52,24 @@ class DataCompletenessScorer(EnrichmentPlugin):
         return {
             "completeness_score": score,
         }
+
+    def enrich_batch(self, leads):
+        """Column-wise enrich(): each lead's filled fields become a bitmask,
+        and each distinct mask is scored once (in enrich()'s summation order,
+        so scores are identical)."""
+        masks = np.zeros(len(leads), dtype=np.int64)
+        for bit, field in enumerate(SCORED_FIELDS):
+            filled = [bool(v and str(v).strip()) for v in column(leads, field)]
+            masks |= np.array(filled, dtype=np.int64) << bit
+
+        total_weight = sum(SCORED_FIELDS.values())
+        weights = list(SCORED_FIELDS.values())
+        scores = {}
+        for mask in np.unique(masks).tolist():
+            filled_weight = 0.0
+            for bit, weight in enumerate(weights):
+                if mask >> bit & 1:
+                    filled_weight += weight
+            scores[mask] = round(filled_weight / total_weight, 2) if total_weight > 0 else 0
+
+        return [{"completeness_score": scores[mask]} for mask in masks.tolist()]
@@ -1,17 +1,22 @@
 """
 geo_distance.py — Geocode lead addresses and calculate distance from Birmingham, AL.
 
-Uses Nominatim (OpenStreetMap) for geocoding with aggressive caching.
-Falls back to ZIP centroid table if geocoding fails.
-Respects Nominatim usage policy: 1 req/sec, custom User-Agent.
+Geocodes against the local gazetteer (tools/gazetteer.py) first, then
+Nominatim (OpenStreetMap) for addresses it can't place, with aggressive
+caching in .tmp/geocode_cache.db (see geocode_cache.py). Falls back to
+5-digit ZCTA, then 3-digit ZIP centroids if geocoding fails
+(tools/zip_centroids.py).
+Respects Nominatim usage policy: 1 req/sec (shared across worker
+threads), custom User-Agent.
 """
 
-import json
 import math
-import os
-import time
+import threading
 import requests
-from tools.enrichment_plugins.base import EnrichmentPlugin
+from tools.enrichment_plugins.base import EnrichmentPlugin, RateLimiter
+from tools.enrichment_plugins.geocode_cache import GeocodeCache
+from tools.gazetteer import LocalGeocoder
+from tools.zip_centroids import get_zip_centroids
 
 # Birmingham, AL coordinates
 BIRMINGHAM_LAT = 33.5207
@@ -23,11 +28,12 @@ NOMINATIM_HEADERS = {
     "User-Agent": "HarvestMedWaste/1.0 (contact@harvestmedwaste.com)",
 }
 
-# Cache file for geocoded coordinates
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-GEOCODE_CACHE_FILE = os.path.join(PROJECT_ROOT, ".tmp", "geocode_cache.json")
+# _geocode() result for timeouts, connection errors and non-200 responses
+# (rate limits, outages): retried next time, never cached as a failure
+GEOCODE_FAILED = object()
 
-# Alabama ZIP code centroids (fallback when geocoding fails)
+# Alabama 3-digit ZIP prefix centroids (fallback for ZIPs missing from
+# data/zcta_centroids.csv)
 AL_ZIP_CENTROIDS = {
     "350": (33.52, -86.80),   # Birmingham
     "351": (33.52, -86.80),   # Birmingham
@@ -76,10 +82,17 @@ def haversine(lat1, lon1, lat2, lon2):
 
 
 def get_zip_coords(zip5):
-    """Look up approximate coordinates for an Alabama ZIP code (fallback)."""
+    """Look up approximate coordinates for a ZIP code (fallback).
+
+    Uses the 5-digit ZCTA centroid table, then the 3-digit Alabama prefixes.
+    """
     if not zip5 or len(zip5) < 3:
         return None, None
 
+    lat, lon = get_zip_centroids().coords(zip5)
+    if lat is not None:
+        return lat, lon
+
     prefix = zip5[:3]
     if prefix in AL_ZIP_CENTROIDS:
         return AL_ZIP_CENTROIDS[prefix]
@@ -90,34 +103,18 @@ def get_zip_coords(zip5):
 class GeoDistanceCalculator(EnrichmentPlugin):
     name = "geo_distance"
     description = "Geocode addresses and calculate distance from Birmingham, AL"
+    io_bound = True
+    # Cache and gazetteer hits proceed while another worker waits on Nominatim
+    max_workers = 2
+    batch_size = 200
+    input_fields = ("address_line1", "city", "state", "zip5", "zip", "latitude", "longitude")
 
     def __init__(self):
-        self._cache = None
-        self._cache_dirty = False
-        self._last_request_time = 0
-
-    def _load_cache(self):
-        """Load geocode cache from disk."""
-        if self._cache is not None:
-            return
-
-        if os.path.exists(GEOCODE_CACHE_FILE):
-            try:
-                with open(GEOCODE_CACHE_FILE) as f:
-                    self._cache = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self._cache = {}
-        else:
-            self._cache = {}
-
-    def _save_cache(self):
-        """Persist geocode cache to disk."""
-        if not self._cache_dirty or self._cache is None:
-            return
-        os.makedirs(os.path.dirname(GEOCODE_CACHE_FILE), exist_ok=True)
-        with open(GEOCODE_CACHE_FILE, "w") as f:
-            json.dump(self._cache, f)
-        self._cache_dirty = False
+        self._cache = GeocodeCache()
+        self._local = LocalGeocoder()
+        self._limiter = RateLimiter(1.0)
+        self._requests_lock = threading.Lock()
+        self.requests = 0  # Nominatim calls made (the geocode scheduler budgets these)
 
     def _build_address_string(self, lead):
         """Build a full address string for geocoding."""
@@ -134,11 +131,15 @@ class GeoDistanceCalculator(EnrichmentPlugin):
         return ", ".join(parts)
 
     def _geocode(self, address_string):
-        """Geocode an address using Nominatim. Returns (lat, lon) or (None, None)."""
+        """Geocode an address using Nominatim.
+
+        Returns (lat, lon), (None, None) when Nominatim answered with no
+        result, or GEOCODE_FAILED when it didn't answer usably.
+        """
         # Rate limit: 1 request per second
-        elapsed = time.time() - self._last_request_time
-        if elapsed < 1.0:
-            time.sleep(1.0 - elapsed)
+        self._limiter.wait()
+        with self._requests_lock:
+            self.requests += 1
 
         try:
             resp = requests.get(
@@ -147,16 +148,84 @@ class GeoDistanceCalculator(EnrichmentPlugin):
                 headers=NOMINATIM_HEADERS,
                 timeout=10,
             )
-            self._last_request_time = time.time()
 
-            if resp.status_code == 200:
-                results = resp.json()
-                if results:
-                    return float(results[0]["lat"]), float(results[0]["lon"])
+            if resp.status_code != 200:
+                return GEOCODE_FAILED
+            results = resp.json()
+            if results:
+                return float(results[0]["lat"]), float(results[0]["lon"])
+            return None, None
         except (requests.RequestException, ValueError, KeyError, IndexError):
-            self._last_request_time = time.time()
+            return GEOCODE_FAILED
+
+    def needs_request(self, leads):
+        """Indices of `leads` that enrich() would send to Nominatim.
+
+        The rest resolve without a request: coordinates already set, no
+        street address (ZIP centroid), an address in the cache (a hit or
+        an unexpired failure), or one the local gazetteer can place.
+        """
+        pending = {}
+        for i, lead in enumerate(leads):
+            if lead.get("latitude") is not None and lead.get("longitude") is not None:
+                continue
+            if not (lead.get("address_line1") or "").strip() or not self.can_enrich(lead):
+                continue
+            pending[i] = self._build_address_string(lead).upper().strip()
+
+        known = self._cache.known(set(pending.values()))
+        needed = set()
+        for i, key in pending.items():
+            if key in known:
+                continue
+            lead = leads[i]
+            lat, _ = self._local.geocode(lead.get("address_line1"),
+                                         (lead.get("zip5") or lead.get("zip") or "").strip(),
+                                         count=False)
+            if lat is None:
+                needed.add(i)
+        return needed
+
+    def prefetch(self, leads, backend):
+        """Batch-geocode every uncached address in `leads` into the cache.
+
+        Addresses are de-duplicated and submitted through a batch backend
+        (see batch_geocoder.py); matches are written to the cache in bulk,
+        so enrich() then resolves them without any requests. Misses aren't
+        cached: a batch backend (the local stand-in above all) isn't
+        authoritative, so they still go through the gazetteer and Nominatim.
+        """
+        pending = {}
+        for lead in leads:
+            if lead.get("latitude") is not None and lead.get("longitude") is not None:
+                continue
+            street = (lead.get("address_line1") or "").strip()
+            if not street:
+                continue
+            cache_key = self._build_address_string(lead).upper().strip()
+            if cache_key not in pending:
+                pending[cache_key] = (
+                    street,
+                    (lead.get("city") or "").strip(),
+                    (lead.get("state") or "AL").strip(),
+                    (lead.get("zip5") or lead.get("zip") or "").strip(),
+                )
+
+        known = self._cache.known(pending)
+        keys = [key for key in pending if key not in known]
+        print(f"  geo_distance batch ({backend.name}): {len(keys)} uncached addresses "
+              f"({len(pending) - len(keys)} already cached)")
+        if not keys:
+            return
 
-        return None, None
+        rows = [(str(i), *pending[key]) for i, key in enumerate(keys)]
+        results = backend.geocode(rows)
+        matches = [(keys[int(row_id)], lat, lon)
+                   for row_id, (lat, lon) in results.items() if lat is not None]
+        self._cache.put_many(matches)
+        matched = len(matches)
+        print(f"  geo_distance batch ({backend.name}): {matched} matched, "
+              f"{len(results) - matched} not found")
 
     def can_enrich(self, lead: dict) -> bool:
         # Can enrich if we have an address or a ZIP code
@@ -165,8 +234,6 @@ class GeoDistanceCalculator(EnrichmentPlugin):
         return has_address or has_zip
 
     def enrich(self, lead: dict) -> dict:
-        self._load_cache()
-
         lat = lead.get("latitude")
         lon = lead.get("longitude")
 
@@ -179,32 +246,37 @@ class GeoDistanceCalculator(EnrichmentPlugin):
         address_string = self._build_address_string(lead)
         cache_key = address_string.upper().strip()
 
-        # Check cache
-        if cache_key in self._cache:
-            cached = self._cache[cache_key]
-            lat, lon = cached.get("lat"), cached.get("lon")
-            if lat is not None and lon is not None:
+        has_address = bool((lead.get("address_line1") or "").strip())
+        zip5 = (lead.get("zip5") or lead.get("zip") or "").strip()
+
+        # Check cache (a cached failure skips Nominatim)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            lat, lon = cached
+            if lat is not None:
                 distance = haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, lat, lon)
                 return self._build_result(lat, lon, distance)
 
-        # Try Nominatim geocoding if we have a real address
-        if (lead.get("address_line1") or "").strip():
-            lat, lon = self._geocode(address_string)
+        # Local gazetteer: exact or interpolated street address, no network
+        if has_address:
+            lat, lon = self._local.geocode(lead.get("address_line1"), zip5)
             if lat is not None:
-                self._cache[cache_key] = {"lat": lat, "lon": lon}
-                self._cache_dirty = True
-                # Periodically save cache (every 100 new entries)
-                if len(self._cache) % 100 == 0:
-                    self._save_cache()
                 distance = haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, lat, lon)
                 return self._build_result(lat, lon, distance)
 
-            # Cache the failure too so we don't retry
-            self._cache[cache_key] = {"lat": None, "lon": None}
-            self._cache_dirty = True
+        # Nominatim only for addresses neither the cache nor the gazetteer knows
+        if has_address and cached is None:
+            result = self._geocode(address_string)
+            if result is not GEOCODE_FAILED:
+                # Written immediately; "no result" answers are cached as
+                # negatives, request errors aren't cached at all
+                self._cache.put(cache_key, *result)
+                lat, lon = result
+            if lat is not None:
+                distance = haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, lat, lon)
+                return self._build_result(lat, lon, distance)
 
-        # Fall back to ZIP centroid
-        zip5 = (lead.get("zip5") or lead.get("zip") or "").strip()
+        # Fall back to 5-digit ZCTA centroid, then the 3-digit prefix table
         fallback_lat, fallback_lon = get_zip_coords(zip5)
         if fallback_lat is not None:
             distance = haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, fallback_lat, fallback_lon)
@@ -216,6 +288,31 @@ class GeoDistanceCalculator(EnrichmentPlugin):
 
         return {}
 
+    def is_final(self, lead, fields):
+        """Only geocoded results are final; a ZIP-centroid distance is retried next run."""
+        return fields.get("latitude") is not None and fields.get("longitude") is not None
+
+    def enrich_batch(self, leads):
+        """enrich() with each distinct address resolved once per chunk."""
+        results = [{} for _ in leads]
+        by_address = {}
+        for i, lead in enumerate(leads):
+            if not self.can_enrich(lead):
+                continue
+            if lead.get("latitude") is not None and lead.get("longitude") is not None:
+                results[i] = self.enrich(lead)
+                continue
+            # Everything enrich() reads for a lead without coordinates
+            key = (self._build_address_string(lead).upper().strip(),
+                   (lead.get("zip5") or lead.get("zip") or "").strip())
+            by_address.setdefault(key, []).append(i)
+
+        for indices in by_address.values():
+            fields = self.enrich(leads[indices[0]])
+            for i in indices:
+                results[i] = dict(fields)
+        return results
+
     def _build_result(self, lat, lon, distance):
         """Build the enrichment result dict."""
         return {
@@ -233,5 +330,12 @@ class GeoDistanceCalculator(EnrichmentPlugin):
         return "Zone 5 - Out of Area"
 
     def flush_cache(self):
-        """Force save the cache to disk. Call after batch processing."""
-        self._save_cache()
+        """Report cache and gazetteer counters. Entries are already on disk as they're written."""
+        s = self._cache.stats()
+        if any(s.values()):
+            print(f"  geo_distance cache: {s['hits']} hits, {s['negative_hits']} cached failures, "
+                  f"{s['misses']} misses, {s['writes']} written")
+        g = self._local.counts
+        if any(g.values()):
+            print(f"  geo_distance gazetteer: {g['point']} exact, {g['range']} street range, "
+                  f"{g['interpolated']} interpolated, {g['miss']} not found")
@@ -0,0 +1,179 @@
+"""
+geocode_cache.py — Persistent SQLite cache of geocoded addresses.
+
+Replaces the single .tmp/geocode_cache.json dict that was loaded whole and
+rewritten whole on flush. Each lookup result is committed as it arrives
+(WAL mode, so writes are cheap and a crash loses at most the request in
+flight). Addresses Nominatim answered with no result are cached as
+negatives with a TTL, so they're retried eventually, not every run.
+Request errors (timeouts, rate limits, outages) aren't cached.
+
+The legacy JSON cache is imported once, the first time the database is
+opened; the JSON file itself is left in place. One connection is shared
+by the enrichment worker threads, serialized by a lock.
+
+Usage:
+    from tools.enrichment_plugins.geocode_cache import GeocodeCache
+    cache = GeocodeCache()
+    cache.get("123 MAIN ST, BIRMINGHAM, AL 35203")   # (lat, lon), (None, None) or None
+    cache.put("123 MAIN ST, BIRMINGHAM, AL 35203", 33.5, -86.8)
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+GEOCODE_CACHE_DB = os.path.join(PROJECT_ROOT, ".tmp", "geocode_cache.db")
+LEGACY_CACHE_FILE = os.path.join(PROJECT_ROOT, ".tmp", "geocode_cache.json")
+
+# Failed lookups are retried after this long (addresses get added to OSM)
+NEGATIVE_TTL_SECONDS = 30 * 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS geocodes (
+    address TEXT PRIMARY KEY,
+    lat REAL,
+    lon REAL,
+    fetched_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class GeocodeCache:
+    """Address → (lat, lon) cache with per-entry writes and hit/miss counters."""
+
+    def __init__(self, path=GEOCODE_CACHE_DB, legacy_file=LEGACY_CACHE_FILE,
+                 negative_ttl=NEGATIVE_TTL_SECONDS):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.negative_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._conn = None
+        self._lock = threading.RLock()
+
+    def _connect(self):
+        """Open the database on first use. Callers hold self._lock."""
+        if self._conn is not None:
+            return self._conn
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Autocommit: every put() is its own transaction
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute("PRAGMA synchronous = NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._import_legacy()
+        return self._conn
+
+    def _import_legacy(self):
+        """One-time import of the old JSON cache."""
+        done = self._conn.execute("SELECT value FROM meta WHERE key = 'legacy_imported'").fetchone()
+        if done or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file) as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            legacy = {}
+
+        # Legacy entries carry no timestamp; negatives count from the import
+        now = time.time()
+        rows = [(key, entry.get("lat"), entry.get("lon"), now)
+                for key, entry in legacy.items() if isinstance(entry, dict)]
+        with self._conn:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO geocodes (address, lat, lon, fetched_at) VALUES (?, ?, ?, ?)",
+                rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('legacy_imported', ?)",
+                (str(len(rows)),))
+        print(f"  Imported {len(rows)} geocodes from {self.legacy_file}")
+
+    def get(self, address):
+        """Return (lat, lon), (None, None) for a cached failure, or None on a miss.
+
+        Expired failures count as misses.
+        """
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT lat, lon, fetched_at FROM geocodes WHERE address = ?", (address,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            lat, lon, fetched_at = row
+            if lat is None or lon is None:
+                if time.time() - fetched_at > self.negative_ttl:
+                    self.misses += 1
+                    return None
+                self.negative_hits += 1
+                return None, None
+            self.hits += 1
+            return lat, lon
+
+    def put(self, address, lat, lon):
+        """Store a lookup result (lat/lon None for a failure) immediately."""
+        with self._lock:
+            self._connect().execute(
+                "INSERT OR REPLACE INTO geocodes (address, lat, lon, fetched_at) VALUES (?, ?, ?, ?)",
+                (address, lat, lon, time.time()))
+            self.writes += 1
+
+    def put_many(self, entries):
+        """Store (address, lat, lon) results from a batch job in one transaction."""
+        now = time.time()
+        rows = [(address, lat, lon, now) for address, lat, lon in entries]
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("BEGIN")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO geocodes (address, lat, lon, fetched_at) VALUES (?, ?, ?, ?)",
+                    rows)
+            self.writes += len(rows)
+
+    def known(self, addresses):
+        """Subset of `addresses` with a usable entry (a hit or an unexpired failure).
+
+        Doesn't touch the hit/miss counters.
+        """
+        addresses = list(addresses)
+        cutoff = time.time() - self.negative_ttl
+        found = set()
+        with self._lock:
+            conn = self._connect()
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(addresses), 500):
+                chunk = addresses[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in conn.execute(
+                    f"SELECT address FROM geocodes WHERE address IN ({placeholders}) "
+                    f"AND (lat IS NOT NULL OR fetched_at >= ?)", chunk + [cutoff]))
+        return found
+
+    def __len__(self):
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM geocodes").fetchone()[0]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "negative_hits": self.negative_hits,
+            "misses": self.misses,
+            "writes": self.writes,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,169 @@
+"""
+hunter_cache.py — Hunter.io lookup cache backed by an append-only journal.
+
+Replaces .tmp/hunter_cache.json, which was rewritten whole and only when
+the entry count happened to be a multiple of 100 (so most runs never
+saved). Every lookup result is appended to .tmp/hunter_cache.jsonl as one
+JSON line the moment it's known, so a crash loses at most the requests in
+flight. Loading replays the journal (later lines win, a torn last line is
+skipped); flush() compacts it once most lines are superseded.
+
+Keys:
+  company:<CLEAN NAME>     {"domain": resolved domain or null, "result": contact or null}
+  domain:<domain>          contact found by Domain Search for that domain
+  finder:<domain>|<NAME>   contact found by Email Finder for a person
+
+A company's contact is read through its domain entry when it has one, so
+company-name variants that resolve to the same domain share a result and
+Email Finder lookups are keyed (and made) by domain rather than name.
+
+Misses expire after MISS_TTL_SECONDS so companies Hunter didn't know get
+another try; found contacts don't expire. The legacy JSON cache is
+imported once, when no journal exists yet.
+
+Usage:
+    from tools.enrichment_plugins.hunter_cache import HunterCache, MISSING
+    cache = HunterCache()
+    cache.get("company:ACME DENTAL")        # value, None (cached miss) or MISSING
+    cache.put("domain:acme.com", {...})
+"""
+
+import json
+import os
+import threading
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+HUNTER_CACHE_JOURNAL = os.path.join(PROJECT_ROOT, ".tmp", "hunter_cache.jsonl")
+LEGACY_CACHE_FILE = os.path.join(PROJECT_ROOT, ".tmp", "hunter_cache.json")
+
+# Companies Hunter had nothing for are retried after this long
+MISS_TTL_SECONDS = 30 * 24 * 3600
+
+# Compact when the journal has this many more lines than live entries
+COMPACT_MIN_DEAD_LINES = 1000
+
+MISSING = object()
+
+
+def _is_miss(value):
+    if value is None:
+        return True
+    return isinstance(value, dict) and "result" in value and value["result"] is None
+
+
+class HunterCache:
+    """Thread-safe key → value cache with an append-only JSONL journal."""
+
+    def __init__(self, path=HUNTER_CACHE_JOURNAL, legacy_file=LEGACY_CACHE_FILE,
+                 miss_ttl=MISS_TTL_SECONDS):
+        self.path = path
+        self.legacy_file = legacy_file
+        self.miss_ttl = miss_ttl
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._entries = None   # key → (value, fetched_at)
+        self._lines = 0        # Lines in the journal, live or superseded
+        self._file = None
+        self._lock = threading.Lock()
+
+    # ── Journal ────────────────────────────────────────────────
+
+    def _load(self):
+        """Replay the journal on first use. Callers hold self._lock."""
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if not os.path.exists(self.path):
+            self._import_legacy()
+            return
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    row = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                self._entries[row["key"]] = (row.get("value"), row.get("at", 0))
+                self._lines += 1
+
+    def _import_legacy(self):
+        """Seed the journal from the old company-keyed JSON cache."""
+        if not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file) as f:
+                legacy = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            return
+        if not legacy or not isinstance(legacy, dict):
+            return
+        # Legacy entries carry no timestamp; misses count from the import
+        now = time.time()
+        for company, result in legacy.items():
+            self._append(f"company:{company}", {"domain": None, "result": result}, now)
+        self._file.flush()
+        print(f"  Imported {len(legacy)} Hunter lookups from {self.legacy_file}")
+
+    def _append(self, key, value, fetched_at):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "a")
+        self._file.write(json.dumps({"key": key, "value": value, "at": round(fetched_at, 1)}) + "\n")
+        self._entries[key] = (value, fetched_at)
+        self._lines += 1
+
+    # ── Lookups ────────────────────────────────────────────────
+
+    def get(self, key, count=True):
+        """Cached value (None for a cached miss), or MISSING if absent or expired.
+
+        `count=False` leaves the hit/miss counters alone (internal re-reads).
+        """
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if entry is None or (_is_miss(entry[0]) and time.time() - entry[1] > self.miss_ttl):
+                if count:
+                    self.misses += 1
+                return MISSING
+            if count:
+                self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Record a lookup result and append it to the journal immediately."""
+        with self._lock:
+            self._load()
+            self._append(key, value, time.time())
+            self._file.flush()
+            self.writes += 1
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._entries)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes}
+
+    def flush(self):
+        """Compact the journal if most of it is superseded. Returns live entries."""
+        with self._lock:
+            if self._entries is None:
+                return 0
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            now = time.time()
+            live = {key: entry for key, entry in self._entries.items()
+                    if not (_is_miss(entry[0]) and now - entry[1] > self.miss_ttl)}
+            if self._lines - len(live) >= COMPACT_MIN_DEAD_LINES:
+                tmp_path = self.path + ".tmp"
+                with open(tmp_path, "w") as f:
+                    for key, (value, fetched_at) in live.items():
+                        f.write(json.dumps({"key": key, "value": value, "at": round(fetched_at, 1)}) + "\n")
+                os.replace(tmp_path, self.path)
+                self._entries = live
+                self._lines = len(live)
+            return len(self._entries)
@@ -3,37 +3,95 @@ hunter_email.py — Find decision-maker emails via Hunter.io API.
 
 Two-phase lookup:
   1. Domain Search: query by company name, filter for decision-maker titles
-  2. Email Finder (fallback): look up a specific person if administrator name exists
-
-Caches results to .tmp/hunter_cache.json to avoid re-querying on re-runs.
+  2. Email Finder (fallback): look up a specific person if administrator name
+     exists, by the company's resolved domain when Domain Search found one
+
+Runs on enrich.py's worker pool: requests from all workers share one rate
+limiter, a 429 pauses every worker (honoring Retry-After) and is retried
+with backoff, and concurrent lookups of the same company wait for the
+first instead of spending a second credit. Results are cached by company
+and by resolved domain in an append-only journal (see hunter_cache.py);
+transient failures aren't cached.
+
+Credits are spent by plan(), which enrich.py calls before the run: leads
+are grouped by cleaned company name (a chain shares one lookup), groups
+are ranked by the sum of lead_score × estimated waste over their leads,
+and only the top groups that fit the per-run credit budget are looked
+up. A group is budgeted at the most its lookup can spend: two credits
+when it has an administrator name (Domain Search, then Email Finder),
+else one, so admitted companies never run out of credits. Cached
+companies cost nothing and are always included. The rest are deferred:
+can_enrich() skips them, so they aren't fingerprinted and are planned
+again next run. enrich.py submits the leads in plan rank order
+(job_order()), so the most valuable companies are looked up first.
 """
 
-import json
 import os
 import re
+import threading
 import time
+from contextlib import contextmanager
+
 import requests
-from tools.enrichment_plugins.base import EnrichmentPlugin
+from tools.enrichment_plugins.base import EnrichmentPlugin, RateLimiter
+from tools.enrichment_plugins.hunter_cache import HunterCache, MISSING
+from tools.enrichment_plugins.waste_volume import WasteVolumeEstimator
 
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-HUNTER_CACHE_FILE = os.path.join(PROJECT_ROOT, ".tmp", "hunter_cache.json")
 
-HUNTER_API_KEY = os.environ.get("HUNTER_API_KEY", "")
+_api_key = None
+
+
+def hunter_api_key():
+    """HUNTER_API_KEY from the environment, else from .env (read once, on first use)."""
+    global _api_key
+    if _api_key is None:
+        _api_key = os.environ.get("HUNTER_API_KEY", "")
+        env_path = os.path.join(PROJECT_ROOT, ".env")
+        if not _api_key and os.path.exists(env_path):
+            with open(env_path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith("HUNTER_API_KEY=") and not line.startswith("#"):
+                        _api_key = line.split("=", 1)[1].strip().strip('"').strip("'")
+                        break
+    return _api_key
+
+
+# Credits (successful Domain Search / Email Finder calls) to spend per run,
+# unless HUNTER_CREDIT_BUDGET or enrich.py --hunter-credits says otherwise
+DEFAULT_CREDIT_BUDGET = 500
+
+
+def default_credit_budget():
+    """HUNTER_CREDIT_BUDGET from the environment (read when a plugin is created).
+
+    A value that isn't a non-negative integer is reported and ignored.
+    """
+    value = os.environ.get("HUNTER_CREDIT_BUDGET", "").strip()
+    if not value:
+        return DEFAULT_CREDIT_BUDGET
+    try:
+        budget = int(value)
+    except ValueError:
+        budget = -1
+    if budget < 0:
+        print(f"  [hunter_email] Ignoring HUNTER_CREDIT_BUDGET={value!r} (not a non-negative "
+              f"integer); using {DEFAULT_CREDIT_BUDGET}")
+        return DEFAULT_CREDIT_BUDGET
+    return budget
 
-# Load from .env if not in environment
-if not HUNTER_API_KEY:
-    env_path = os.path.join(PROJECT_ROOT, ".env")
-    if os.path.exists(env_path):
-        with open(env_path) as f:
-            for line in f:
-                line = line.strip()
-                if line.startswith("HUNTER_API_KEY=") and not line.startswith("#"):
-                    HUNTER_API_KEY = line.split("=", 1)[1].strip().strip('"').strip("'")
-                    break
 
 DOMAIN_SEARCH_URL = "https://api.hunter.io/v2/domain-search"
 EMAIL_FINDER_URL = "https://api.hunter.io/v2/email-finder"
 
+# Hunter allows 15 req/s; stay well under it across all workers
+REQUESTS_PER_SECOND = 1 / 0.15
+MAX_RETRIES = 4
+
+# Returned by the API helpers for transient failures (not cached)
+API_FAILED = object()
+
 # Decision-maker titles to keep (case-insensitive substring match)
 DECISION_MAKER_TITLES = [
     "administrator",
@@ -60,95 +118,230 @@ def clean_company_name(name):
     return cleaned
 
 
+def company_key(lead):
+    """Cache / planning key for a lead's company ("" if it has no usable name)."""
+    facility_name = (lead.get("facility_name") or lead.get("name") or "").strip()
+    company = clean_company_name(facility_name)
+    return f"company:{company.upper()}" if company else ""
+
+
+def lead_value(lead, waste_estimator):
+    """lead_score × estimated waste lbs/day — what a contact for this lead is worth.
+
+    Unscored leads count as score 1 so they still rank by waste; leads
+    without a waste estimate yet (first run) get one from waste_volume.
+    """
+    waste = lead.get("estimated_waste_lbs_per_day")
+    if waste is None and waste_estimator.can_enrich(lead):
+        waste = waste_estimator.enrich(lead)["estimated_waste_lbs_per_day"]
+    return max(lead.get("lead_score") or 0, 1) * (waste or 0)
+
+
+def lookup_credits(lead):
+    """Most credits a lookup for this lead can spend.
+
+    Domain Search costs one; Email Finder, the fallback, another, and it
+    only runs for an administrator with a first and last name.
+    """
+    return 2 if len((lead.get("administrator") or "").split()) >= 2 else 1
+
+
+def plan_credits(groups, budget, cached, costs=None):
+    """Choose which company groups to look up this run.
+
+    `groups` maps company key → list of lead values; `cached` is the set
+    of keys answerable from the cache; `costs` maps key → credits its
+    lookup may spend (default 1). Groups are taken by total value,
+    highest first; an uncached group is admitted if its cost still fits
+    in `budget` (None means no limit). Returns (admitted keys, deferred
+    keys), both in rank order.
+    """
+    costs = costs or {}
+    admitted, deferred = [], []
+    for key in sorted(groups, key=lambda key: (-sum(groups[key]), key)):
+        cost = 0 if key in cached else costs.get(key, 1)
+        if budget is None or cost <= budget:
+            admitted.append(key)
+            if budget is not None:
+                budget -= cost
+        else:
+            deferred.append(key)
+    return admitted, deferred
+
+
 class HunterEmailEnricher(EnrichmentPlugin):
     name = "hunter_email"
     description = "Find decision-maker emails via Hunter.io"
+    io_bound = True
+    max_workers = 4
+    batch_size = 100
+    input_fields = ("facility_name", "name", "administrator", "contact_email")
 
     def __init__(self):
-        self._cache = None
-        self._cache_dirty = False
-        self._last_request_time = 0
+        self._cache = HunterCache()
+        self._limiter = RateLimiter(REQUESTS_PER_SECOND)
+        self._inflight_lock = threading.Lock()
+        self._inflight_keys = {}
+        self._requests_lock = threading.Lock()
+        self.requests = 0  # API calls made, including retries
+        self.credits = 0   # Calls that got an answer (what Hunter bills)
+        self.credit_budget = default_credit_budget()
+        self._credits_reserved = 0
+        self._planned = None  # Company key → rank, admitted by plan(); None → no plan, look up anything
         self._api_disabled = False  # Set True on auth errors to stop all calls
 
-    # ── Cache ──────────────────────────────────────────────────
-
-    def _load_cache(self):
-        if self._cache is not None:
-            return
-        if os.path.exists(HUNTER_CACHE_FILE):
-            try:
-                with open(HUNTER_CACHE_FILE) as f:
-                    self._cache = json.load(f)
-            except (json.JSONDecodeError, IOError):
-                self._cache = {}
-        else:
-            self._cache = {}
-
-    def _save_cache(self):
-        if not self._cache_dirty or self._cache is None:
+    def flush_cache(self):
+        """Compact the cache journal and report counters. Called after batch processing."""
+        entries = self._cache.flush()
+        s = self._cache.stats()
+        if any(s.values()) or self.requests:
+            budget = "" if self.credit_budget is None else f" of {self.credit_budget}"
+            print(f"  hunter_email cache: {s['hits']} hits, {s['misses']} misses, "
+                  f"{s['writes']} written ({entries} entries); {self.requests} API requests, "
+                  f"{self.credits}{budget} credits")
+
+    # ── Credit planning ────────────────────────────────────────
+
+    def plan(self, leads):
+        """Admit the companies worth this run's credits (see plan_credits)."""
+        self._planned = None
+        waste_estimator = WasteVolumeEstimator()
+        groups, costs = {}, {}
+        for lead in leads:
+            if self.can_enrich(lead):
+                key = company_key(lead)
+                if key:
+                    groups.setdefault(key, []).append(lead_value(lead, waste_estimator))
+                    costs[key] = max(costs.get(key, 1), lookup_credits(lead))
+        if not groups:
             return
-        os.makedirs(os.path.dirname(HUNTER_CACHE_FILE), exist_ok=True)
-        with open(HUNTER_CACHE_FILE, "w") as f:
-            json.dump(self._cache, f)
-        self._cache_dirty = False
 
-    def flush_cache(self):
-        """Force save cache to disk. Called after batch processing."""
-        self._save_cache()
+        cached = {key for key in groups if self._cache.get(key, count=False) is not MISSING}
+        remaining = None if self.credit_budget is None else max(self.credit_budget - self._credits_reserved, 0)
+        admitted, deferred = plan_credits(groups, remaining, cached, costs)
+        self._planned = {key: rank for rank, key in enumerate(admitted)}
+
+        lookups = len(admitted) - len(cached)
+        reserved = sum(costs[key] for key in admitted if key not in cached)
+        deferred_leads = sum(len(groups[key]) for key in deferred)
+        print(f"  hunter_email plan: {len(groups)} companies ({sum(map(len, groups.values()))} leads), "
+              f"{len(cached)} cached, {lookups} to look up (up to {reserved} credits)"
+              + (f", {len(deferred)} deferred ({deferred_leads} leads) to later runs" if deferred else ""))
+
+    def job_order(self, leads):
+        """Lead indices in plan rank order (unplanned leads last, in lead order)."""
+        if not self._planned:
+            return range(len(leads))
+        last = len(self._planned)
+        return sorted(range(len(leads)), key=lambda i: self._planned.get(company_key(leads[i]), last))
+
+    def _reserve_credit(self):
+        """Claim one credit of the run's budget. False once it's spent."""
+        with self._requests_lock:
+            if self.credit_budget is not None and self._credits_reserved >= self.credit_budget:
+                return False
+            self._credits_reserved += 1
+            return True
+
+    def _release_credit(self):
+        """Return a reserved credit that the call didn't spend."""
+        with self._requests_lock:
+            self._credits_reserved -= 1
+
+    @contextmanager
+    def _inflight(self, key):
+        """Serialize lookups of one key across workers."""
+        with self._inflight_lock:
+            lock = self._inflight_keys.setdefault(key, threading.Lock())
+        with lock:
+            yield
+        with self._inflight_lock:
+            self._inflight_keys.pop(key, None)
 
     # ── Rate limiting ──────────────────────────────────────────
 
     def _throttle(self):
-        """Wait at least 0.15s between requests."""
-        elapsed = time.time() - self._last_request_time
-        if elapsed < 0.15:
-            time.sleep(0.15 - elapsed)
+        """Wait for this worker's request slot (shared across all worker threads)."""
+        self._limiter.wait()
 
     # ── API calls ──────────────────────────────────────────────
 
     def _api_get(self, url, params):
-        """Make a Hunter.io API GET request with error handling."""
-        self._throttle()
-        params["api_key"] = HUNTER_API_KEY
+        """Make a Hunter.io API GET request with retries.
 
-        try:
-            resp = requests.get(url, params=params, timeout=15)
-            self._last_request_time = time.time()
+        Returns the parsed JSON, None when Hunter answered but had nothing
+        usable (cacheable), or API_FAILED for auth, network and rate-limit
+        failures that outlast the retries.
+        """
+        params = dict(params, api_key=hunter_api_key())
 
-            if resp.status_code in (401, 403):
-                print(f"  [hunter_email] Auth error ({resp.status_code}) — disabling further API calls")
-                self._api_disabled = True
-                return None
+        for attempt in range(MAX_RETRIES + 1):
+            if self._api_disabled:
+                return API_FAILED
+            self._throttle()
+            with self._requests_lock:
+                self.requests += 1
 
-            if resp.status_code == 429:
-                # Rate limited — back off and retry once
-                retry_after = int(resp.headers.get("Retry-After", 10))
-                print(f"  [hunter_email] Rate limited, waiting {retry_after}s...")
-                time.sleep(retry_after)
+            try:
                 resp = requests.get(url, params=params, timeout=15)
-                self._last_request_time = time.time()
-                if resp.status_code != 200:
-                    return None
+            except requests.RequestException:
+                # Network error — back off this worker only
+                time.sleep(2 ** attempt)
+                continue
 
             if resp.status_code == 200:
-                return resp.json()
+                try:
+                    data = resp.json()
+                except ValueError:
+                    return API_FAILED
+                with self._requests_lock:
+                    self.credits += 1
+                return data
+
+            if resp.status_code in (401, 403):
+                print(f"  [hunter_email] Auth error ({resp.status_code}) — disabling further API calls")
+                self._api_disabled = True
+                return API_FAILED
+
+            if resp.status_code == 429 or resp.status_code >= 500:
+                # Rate limited / server error — hold every worker, then retry
+                try:
+                    retry_after = int(resp.headers.get("Retry-After", ""))
+                except ValueError:
+                    retry_after = 2 * 2 ** attempt
+                print(f"  [hunter_email] HTTP {resp.status_code}, pausing requests {retry_after}s...")
+                self._limiter.pause(retry_after)
+                continue
 
-        except requests.RequestException as e:
-            self._last_request_time = time.time()
-            # Network error — skip this lead, don't disable
             return None
 
-        return None
+        return API_FAILED
+
+    def _billed_get(self, url, params):
+        """_api_get() within the credit budget; API_FAILED (not cached) once it's spent."""
+        if not self._reserve_credit():
+            return API_FAILED
+        result = self._api_get(url, params)
+        if result is API_FAILED or result is None:
+            self._release_credit()
+        return result
 
     def _domain_search(self, company_name):
-        """Search Hunter.io by company name for decision-maker emails."""
-        result = self._api_get(DOMAIN_SEARCH_URL, {"company": company_name, "limit": 10})
+        """Search Hunter.io by company name for decision-maker emails.
+
+        Returns (contact or None, resolved domain or None), or API_FAILED.
+        """
+        result = self._billed_get(DOMAIN_SEARCH_URL, {"company": company_name, "limit": 10})
+        if result is API_FAILED:
+            return API_FAILED
         if not result:
-            return None
+            return None, None
 
-        emails = result.get("data", {}).get("emails", [])
+        data = result.get("data") or {}
+        domain = (data.get("domain") or "").lower() or None
+        emails = data.get("emails", [])
         if not emails:
-            return None
+            return None, domain
 
         # Filter for decision-maker titles
         for email_entry in emails:
@@ -163,7 +356,7 @@ class HunterEmailEnricher(EnrichmentPlugin):
                     "contact_title": email_entry.get("position", ""),
                     "email_confidence": email_entry.get("confidence", 0),
                     "email_source": "hunter_domain",
-                }
+                }, domain
 
         # No decision-maker title found — take the first email as fallback
         best = emails[0]
@@ -176,10 +369,14 @@ class HunterEmailEnricher(EnrichmentPlugin):
             "contact_title": best.get("position", ""),
             "email_confidence": best.get("confidence", 0),
             "email_source": "hunter_domain",
-        }
+        }, domain
+
+    def _email_finder(self, company_name, domain, full_name):
+        """Try to find a specific person's email via Hunter.io Email Finder.
 
-    def _email_finder(self, company_name, full_name):
-        """Try to find a specific person's email via Hunter.io Email Finder."""
+        Queries by domain when known (more precise than the name). Returns
+        a contact, None, or API_FAILED.
+        """
         parts = full_name.strip().split()
         if len(parts) < 2:
             return None
@@ -187,11 +384,14 @@ class HunterEmailEnricher(EnrichmentPlugin):
         first_name = parts[0]
         last_name = parts[-1]
 
-        result = self._api_get(EMAIL_FINDER_URL, {
-            "company": company_name,
-            "first_name": first_name,
-            "last_name": last_name,
-        })
+        params = {"first_name": first_name, "last_name": last_name}
+        if domain:
+            params["domain"] = domain
+        else:
+            params["company"] = company_name
+        result = self._billed_get(EMAIL_FINDER_URL, params)
+        if result is API_FAILED:
+            return API_FAILED
         if not result:
             return None
 
@@ -208,53 +408,100 @@ class HunterEmailEnricher(EnrichmentPlugin):
             "email_source": "hunter_finder",
         }
 
+    # ── Lookup ─────────────────────────────────────────────────
+
+    def _lookup(self, company, key, administrator):
+        """Resolve a company not in the cache. Returns its cache entry or API_FAILED."""
+        with self._inflight(key):
+            # Another worker may have resolved it while we waited
+            entry = self._cache.get(key, count=False)
+            if entry is not MISSING:
+                return entry
+
+            # Phase 1: Domain Search
+            found = self._domain_search(company)
+            if found is API_FAILED:
+                return API_FAILED
+            result, domain = found
+            if domain:
+                self._cache.put(f"domain:{domain}", result)
+
+            # Phase 2: Email Finder fallback
+            if not result and administrator:
+                finder_key = f"finder:{domain or key}|{administrator.upper()}"
+                result = self._cache.get(finder_key)
+                if result is MISSING:
+                    result = self._email_finder(company, domain, administrator)
+                    if result is API_FAILED:
+                        return API_FAILED
+                    self._cache.put(finder_key, result)
+
+            entry = {"domain": domain, "result": result}
+            self._cache.put(key, entry)
+            return entry
+
+    def _contact(self, entry):
+        """A company entry's contact, read through its domain when it has one."""
+        domain = entry.get("domain")
+        if domain:
+            shared = self._cache.get(f"domain:{domain}", count=False)
+            if shared:
+                return shared
+        return entry.get("result")
+
     # ── Plugin interface ───────────────────────────────────────
 
     def can_enrich(self, lead: dict) -> bool:
         if self._api_disabled:
             return False
-        if not HUNTER_API_KEY:
+        if not hunter_api_key():
             return False
         if not (lead.get("facility_name") or "").strip():
             return False
         # Skip if already has a contact email
         if (lead.get("contact_email") or "").strip():
             return False
+        # Deferred by plan() to a later run
+        if self._planned is not None and company_key(lead) not in self._planned:
+            return False
         return True
 
     def enrich(self, lead: dict) -> dict:
-        self._load_cache()
-
-        facility_name = (lead.get("facility_name") or lead.get("name") or "").strip()
-        company = clean_company_name(facility_name)
-        if not company:
+        key = company_key(lead)
+        if not key:
             return {}
 
-        cache_key = company.upper()
-
-        # Check cache
-        if cache_key in self._cache:
-            cached = self._cache[cache_key]
-            if cached is None:
-                # Cached miss
-                return {}
-            return dict(cached)
-
-        # Phase 1: Domain Search
-        result = self._domain_search(company)
-
-        # Phase 2: Email Finder fallback
-        if not result:
+        entry = self._cache.get(key)
+        if entry is MISSING:
+            facility_name = (lead.get("facility_name") or lead.get("name") or "").strip()
             administrator = (lead.get("administrator") or "").strip()
-            if administrator:
-                result = self._email_finder(company, administrator)
-
-        # Cache the result (or miss)
-        self._cache[cache_key] = result
-        self._cache_dirty = True
-
-        # Periodically save cache
-        if len(self._cache) % 100 == 0:
-            self._save_cache()
+            entry = self._lookup(clean_company_name(facility_name), key, administrator)
+            if entry is API_FAILED:
+                return {}
 
-        return result if result else {}
+        contact = self._contact(entry)
+        return dict(contact) if contact else {}
+
+    def is_final(self, lead, fields):
+        """Only a found contact is final; misses are retried (the cache decides when)."""
+        return bool(fields.get("contact_email"))
+
+    def enrich_batch(self, leads):
+        """enrich() with each distinct company looked up once per chunk.
+
+        The cache is keyed by company, so later leads of a company would
+        get the first lead's result anyway; this just skips the repeats.
+        """
+        results = [{} for _ in leads]
+        by_company = {}
+        for i, lead in enumerate(leads):
+            if self.can_enrich(lead):
+                by_company.setdefault(company_key(lead), []).append(i)
+
+        for indices in by_company.values():
+            if self._api_disabled:
+                break
+            fields = self.enrich(leads[indices[0]])
+            for i in indices:
+                results[i] = dict(fields)
+        return results
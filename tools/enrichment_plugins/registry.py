@@ -0,0 +1,84 @@
+"""
+registry.py — Enrichment plugin discovery with lazy imports.
+
+Plugins are registered by name as "module:Class" strings and imported
+only when a run asks for them, so `enrich.py --plugins waste_volume`
+doesn't pay for requests, the CMS matcher or hunter_email's .env read.
+Plugins keep their own data (CMS index, geocode and Hunter caches) lazy
+as well, loading it on first use rather than in __init__.
+
+Third-party plugins register under the ENTRY_POINT_GROUP entry point
+group of an installed package, e.g. in its pyproject.toml:
+
+    [project.entry-points."harvest_med_waste.enrichment_plugins"]
+    npi_taxonomy = "harvest_npi.plugins:NPITaxonomyEnricher"
+
+They are listed after the built-ins, can't shadow a built-in name, and
+run when named in --plugins (the default run is the built-in order).
+Installed packages are only scanned when a name isn't built in.
+
+Usage:
+    from tools.enrichment_plugins.registry import available_plugins, create_plugin
+    available_plugins()             # {name: "module:Class"}
+    plugin = create_plugin("waste_volume")
+"""
+
+import importlib
+
+ENTRY_POINT_GROUP = "harvest_med_waste.enrichment_plugins"
+
+# Built-in plugins: name → "module:Class"
+BUILTIN_PLUGINS = {
+    "waste_volume": "tools.enrichment_plugins.waste_volume:WasteVolumeEstimator",
+    "geo_distance": "tools.enrichment_plugins.geo_distance:GeoDistanceCalculator",
+    "cms_bed_count": "tools.enrichment_plugins.cms_bed_count:CMSBedCountEnricher",
+    "data_completeness": "tools.enrichment_plugins.data_completeness:DataCompletenessScorer",
+    "hunter_email": "tools.enrichment_plugins.hunter_email:HunterEmailEnricher",
+}
+
+_discovered = None
+_classes = {}
+
+
+def _entry_point_plugins():
+    """Third-party plugins from installed packages (read once per process)."""
+    global _discovered
+    if _discovered is None:
+        # importlib.metadata alone costs more than the rest of enrich.py's imports
+        from importlib.metadata import entry_points
+        _discovered = {}
+        for ep in entry_points(group=ENTRY_POINT_GROUP):
+            if ep.name in BUILTIN_PLUGINS:
+                print(f"  Ignoring plugin entry point {ep.name} ({ep.value}): name is built in")
+                continue
+            _discovered[ep.name] = ep.value
+    return _discovered
+
+
+def available_plugins():
+    """All plugin names → "module:Class", built-ins first. Imports nothing."""
+    return {**BUILTIN_PLUGINS, **_entry_point_plugins()}
+
+
+def plugin_target(name):
+    """The "module:Class" registered as `name`, or None."""
+    return BUILTIN_PLUGINS.get(name) or _entry_point_plugins().get(name)
+
+
+def load_plugin_class(name):
+    """Import and return the plugin class registered as `name`.
+
+    Raises KeyError for an unknown name.
+    """
+    if name not in _classes:
+        target = plugin_target(name)
+        if target is None:
+            raise KeyError(name)
+        module_name, _, class_name = target.partition(":")
+        _classes[name] = getattr(importlib.import_module(module_name), class_name)
+    return _classes[name]
+
+
+def create_plugin(name):
+    """Instantiate the plugin registered as `name`."""
+    return load_plugin_class(name)()
@@ -0,0 +1,313 @@
+"""
+gazetteer.py — Offline geocoding from a local address gazetteer.
+
+Builds .tmp/gazetteer.db (SQLite) from public address extracts and
+geocodes addresses against it without any network calls:
+  - OpenAddresses points  → exact house-number lookup, and interpolation
+                            between the nearest known numbers on a street
+  - TIGER address ranges  → interpolated street-range lookup
+
+Either source can be loaded; GeoDistanceCalculator uses whatever is
+present and only calls Nominatim for addresses the gazetteer can't place.
+5-digit ZIP centroids (the distance-only fallback) live in the packaged
+table built by tools/zip_centroids.py; --zcta here is a shortcut to it.
+
+Input formats:
+  --openaddresses  OpenAddresses CSV (LON, LAT, NUMBER, STREET, POSTCODE)
+  --tiger-ranges   CSV export of TIGER/Line ADDRFEAT edges with FULLNAME,
+                   LFROMHN, LTOHN, RFROMHN, RTOHN, ZIPL, ZIPR and the edge's
+                   start/end points as FROMLAT, FROMLON, TOLAT, TOLON, e.g.
+                   ogr2ogr -f CSV out.csv tl_2023_01001_addrfeat.shp -dialect sqlite
+                     -sql "SELECT *, ST_Y(ST_StartPoint(geometry)) AS FROMLAT,
+                           ST_X(ST_StartPoint(geometry)) AS FROMLON,
+                           ST_Y(ST_EndPoint(geometry)) AS TOLAT,
+                           ST_X(ST_EndPoint(geometry)) AS TOLON FROM tl_2023_01001_addrfeat"
+  --zcta           Census Gazetteer ZCTA file (tab-separated GEOID, INTPTLAT, INTPTLONG),
+                   written to data/zcta_centroids.csv
+
+Usage:
+    python tools/gazetteer.py --openaddresses data/oa/al/statewide.csv
+    python tools/gazetteer.py --tiger-ranges .tmp/addrfeat_al.csv --zcta 2023_Gaz_zcta_national.txt
+    python tools/gazetteer.py --lookup "2000 6th Ave S" --zip 35233
+"""
+
+import argparse
+import csv
+import os
+import re
+import sqlite3
+import sys
+import threading
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.normalize import normalize_address
+from tools.zip_centroids import ZCTA_CENTROIDS_FILE, build_from_gazetteer
+
+GAZETTEER_DB = os.path.join(PROJECT_ROOT, ".tmp", "gazetteer.db")
+
+# Interpolate between known house numbers only when they're this close
+MAX_POINT_GAP = 200
+INSERT_BATCH_SIZE = 50000
+
+HOUSE_NUMBER_RE = re.compile(r"^(\d+)[A-Z]?(?:-\d+)?\s+(.+)$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS points (
+    street TEXT NOT NULL,
+    zip5 TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    lat REAL NOT NULL,
+    lon REAL NOT NULL,
+    PRIMARY KEY (street, zip5, number)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS ranges (
+    street TEXT NOT NULL,
+    zip5 TEXT NOT NULL,
+    lo INTEGER NOT NULL,
+    hi INTEGER NOT NULL,
+    from_num INTEGER NOT NULL,
+    to_num INTEGER NOT NULL,
+    lat1 REAL NOT NULL,
+    lon1 REAL NOT NULL,
+    lat2 REAL NOT NULL,
+    lon2 REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_ranges_street ON ranges (street, zip5, lo);
+"""
+
+
+def split_address(address_line1):
+    """Split a street address into (house number, normalized street), or None."""
+    m = HOUSE_NUMBER_RE.match(normalize_address(address_line1))
+    if not m:
+        return None
+    return int(m.group(1)), m.group(2)
+
+
+def _parse_number(value):
+    m = re.match(r"\d+", (value or "").strip())
+    return int(m.group()) if m else None
+
+
+def _interpolate(number, from_num, to_num, lat1, lon1, lat2, lon2):
+    t = 0.5 if to_num == from_num else (number - from_num) / (to_num - from_num)
+    return lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t
+
+
+# ── Building ───────────────────────────────────────────────────
+
+
+def _connect_for_build(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA synchronous = OFF")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _csv_rows(path, delimiter=","):
+    """Yield CSV rows as dicts with upper-cased, stripped header names."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter=delimiter)
+        header = [h.strip().upper() for h in next(reader)]
+        for row in reader:
+            yield dict(zip(header, row))
+
+
+def _insert_batches(conn, sql, rows):
+    count = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            conn.executemany(sql, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        conn.executemany(sql, batch)
+        count += len(batch)
+    conn.commit()
+    return count
+
+
+def load_openaddresses(conn, path):
+    """Load OpenAddresses points. Returns the number of rows inserted."""
+    streets = {}  # Raw street → normalized (streets repeat heavily)
+
+    def rows():
+        for rec in _csv_rows(path):
+            number = _parse_number(rec.get("NUMBER"))
+            zip5 = (rec.get("POSTCODE") or "").strip()[:5]
+            raw_street = (rec.get("STREET") or "").strip().upper()
+            if number is None or len(zip5) != 5 or not raw_street:
+                continue
+            try:
+                lat, lon = float(rec["LAT"]), float(rec["LON"])
+            except (KeyError, ValueError):
+                continue
+            street = streets.get(raw_street)
+            if street is None:
+                street = streets[raw_street] = normalize_address(raw_street)
+            yield street, zip5, number, lat, lon
+
+    return _insert_batches(
+        conn, "INSERT OR IGNORE INTO points (street, zip5, number, lat, lon) VALUES (?, ?, ?, ?, ?)",
+        rows())
+
+
+def load_tiger_ranges(conn, path):
+    """Load TIGER ADDRFEAT left/right address ranges. Returns rows inserted."""
+    streets = {}
+
+    def rows():
+        for rec in _csv_rows(path):
+            raw_street = (rec.get("FULLNAME") or "").strip().upper()
+            if not raw_street:
+                continue
+            try:
+                ends = [float(rec[k]) for k in ("FROMLAT", "FROMLON", "TOLAT", "TOLON")]
+            except (KeyError, ValueError):
+                continue
+            street = streets.get(raw_street)
+            if street is None:
+                street = streets[raw_street] = normalize_address(raw_street)
+            for side in ("L", "R"):
+                from_num = _parse_number(rec.get(f"{side}FROMHN"))
+                to_num = _parse_number(rec.get(f"{side}TOHN"))
+                zip5 = (rec.get(f"ZIP{side}") or "").strip()[:5]
+                if from_num is None or to_num is None or len(zip5) != 5:
+                    continue
+                yield (street, zip5, min(from_num, to_num), max(from_num, to_num),
+                       from_num, to_num, *ends)
+
+    return _insert_batches(
+        conn, "INSERT INTO ranges (street, zip5, lo, hi, from_num, to_num, lat1, lon1, lat2, lon2) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        rows())
+
+
+# ── Lookup ─────────────────────────────────────────────────────
+
+
+class LocalGeocoder:
+    """Read-only geocoder over the gazetteer database.
+
+    Every method returns (None, None) when the database hasn't been built,
+    so callers can use it unconditionally. Safe to share between threads
+    (lookups are serialized on one connection).
+    """
+
+    def __init__(self, path=GAZETTEER_DB):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+        self.counts = {"point": 0, "range": 0, "interpolated": 0, "miss": 0}
+
+    def _connect(self):
+        if self._conn is None:
+            if not os.path.exists(self.path):
+                return None
+            self._conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True,
+                                         check_same_thread=False)
+        return self._conn
+
+    def available(self):
+        return self._connect() is not None
+
+    def geocode(self, address_line1, zip5, count=True):
+        """Place a street address. Returns (lat, lon) or (None, None).
+
+        Tries an exact house-number point, then a TIGER range containing the
+        number (same side of the street preferred), then interpolation
+        between the nearest known numbers on the same street and ZIP.
+        `count=False` leaves self.counts alone (planning lookups).
+        """
+        parsed = split_address(address_line1)
+        zip5 = (zip5 or "").strip()[:5]
+        if not parsed or len(zip5) != 5:
+            return None, None
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return None, None
+            kind, coords = self._lookup(conn, *parsed, zip5)
+            if count:
+                self.counts[kind] += 1
+            return coords
+
+    def _lookup(self, conn, number, street, zip5):
+        """Returns (match kind, (lat, lon) or (None, None))."""
+        row = conn.execute(
+            "SELECT lat, lon FROM points WHERE street = ? AND zip5 = ? AND number = ?",
+            (street, zip5, number)).fetchone()
+        if row:
+            return "point", row
+
+        ranges = conn.execute(
+            "SELECT from_num, to_num, lat1, lon1, lat2, lon2 FROM ranges "
+            "WHERE street = ? AND zip5 = ? AND lo <= ? AND hi >= ? ORDER BY hi - lo",
+            (street, zip5, number, number)).fetchall()
+        if ranges:
+            same_side = [r for r in ranges if (number - r[0]) % 2 == 0 and (r[1] - r[0]) % 2 == 0]
+            return "range", _interpolate(number, *(same_side or ranges)[0])
+
+        below = conn.execute(
+            "SELECT number, lat, lon FROM points WHERE street = ? AND zip5 = ? AND number < ? "
+            "ORDER BY number DESC LIMIT 1", (street, zip5, number)).fetchone()
+        above = conn.execute(
+            "SELECT number, lat, lon FROM points WHERE street = ? AND zip5 = ? AND number > ? "
+            "ORDER BY number LIMIT 1", (street, zip5, number)).fetchone()
+        if below and above and above[0] - below[0] <= MAX_POINT_GAP:
+            return "interpolated", _interpolate(number, below[0], above[0],
+                                                below[1], below[2], above[1], above[2])
+
+        return "miss", (None, None)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the offline geocoding gazetteer")
+    parser.add_argument("--db", default=GAZETTEER_DB, help="Gazetteer database path")
+    parser.add_argument("--openaddresses", help="OpenAddresses CSV to load")
+    parser.add_argument("--tiger-ranges", help="TIGER ADDRFEAT range CSV to load")
+    parser.add_argument("--zcta", help="Census Gazetteer ZCTA file for data/zcta_centroids.csv")
+    parser.add_argument("--lookup", help="Geocode one street address (with --zip)")
+    parser.add_argument("--zip", help="ZIP code for --lookup")
+    args = parser.parse_args()
+
+    if args.lookup:
+        geocoder = LocalGeocoder(args.db)
+        lat, lon = geocoder.geocode(args.lookup, args.zip)
+        if lat is None:
+            print("Not found")
+        else:
+            kind = next(k for k, v in geocoder.counts.items() if v)
+            print(f"{kind}: {lat:.6f}, {lon:.6f}")
+        return
+
+    if not (args.openaddresses or args.tiger_ranges or args.zcta):
+        parser.error("nothing to load: pass --openaddresses, --tiger-ranges and/or --zcta")
+
+    print("Harvest Med Waste — Gazetteer Builder")
+    if args.openaddresses or args.tiger_ranges:
+        conn = _connect_for_build(args.db)
+        if args.openaddresses:
+            print(f"  Address points: {load_openaddresses(conn, args.openaddresses):,}")
+        if args.tiger_ranges:
+            print(f"  Street ranges:  {load_tiger_ranges(conn, args.tiger_ranges):,}")
+        conn.execute("ANALYZE")
+        conn.close()
+        print(f"\nSaved gazetteer to {args.db}")
+    if args.zcta:
+        print(f"  ZCTA centroids: {build_from_gazetteer(args.zcta):,}")
+        print(f"\nSaved ZIP centroids to {ZCTA_CENTROIDS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
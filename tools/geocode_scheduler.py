@@ -0,0 +1,248 @@
+"""
+geocode_scheduler.py — Budgeted, priority-ordered geocoding across tiers.
+
+Replaces geocode_hot_leads.py. Each run spends a fixed budget of Nominatim
+requests (and/or wall-clock minutes) on the uncached addresses that matter
+most, in priority order:
+
+    tier (Hot, Warm, Cool, Cold) → lead_score → estimated waste lbs/day
+
+Leads whose address is already cached, that the local gazetteer can place,
+or that only have a ZIP are resolved for free and don't touch the budget
+(GeoDistanceCalculator.needs_request() tells them apart). Progress persists
+between runs: every Nominatim answer (including "no result") lands in the
+geocode cache, so the next run's queue starts where this one stopped
+(request errors stay queued),
+and a per-run summary is appended to .tmp/geocode_schedule.json. Weekly
+runs therefore finish Hot first, then work down through Warm and Cool.
+
+Usage:
+    python tools/geocode_scheduler.py                      # Default budget
+    python tools/geocode_scheduler.py --max-requests 500
+    python tools/geocode_scheduler.py --max-minutes 30
+    python tools/geocode_scheduler.py --status             # Coverage by tier, no requests
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.enrichment_plugins.geo_distance import GeoDistanceCalculator
+
+INPUT_FILE = os.path.join(PROJECT_ROOT, "data", "alabama_leads.json")
+SCHEDULE_STATE_FILE = os.path.join(PROJECT_ROOT, ".tmp", "geocode_schedule.json")
+
+# ~50 minutes at Nominatim's 1 request/second
+DEFAULT_MAX_REQUESTS = 3000
+
+TIER_ORDER = ["Hot", "Warm", "Cool", "Cold"]
+TIER_RANK = {tier: rank for rank, tier in enumerate(TIER_ORDER)}
+
+
+def normalize_lead(lead):
+    """Normalize legacy field names for the geo_distance plugin."""
+    if "name" in lead and "facility_name" not in lead:
+        lead["facility_name"] = lead["name"]
+    if "address" in lead and "address_line1" not in lead:
+        lead["address_line1"] = lead.get("address", "")
+    if "zip" in lead and "zip5" not in lead:
+        lead["zip5"] = lead.get("zip", "")[:5]
+    return lead
+
+
+def priority_key(lead):
+    """Sort key: best tier, then highest score, then most waste first."""
+    return (
+        TIER_RANK.get(lead.get("priority_tier"), len(TIER_ORDER)),
+        -(lead.get("lead_score") or 0),
+        -(lead.get("estimated_waste_lbs_per_day") or 0),
+    )
+
+
+def _has_coords(lead):
+    return lead.get("latitude") is not None and lead.get("longitude") is not None
+
+
+def plan(leads, plugin):
+    """Split leads needing coordinates into (free, queue).
+
+    `free` can be enriched without a Nominatim call (cached address, one
+    the local gazetteer places, or no street address at all); `queue` is a
+    heap of (priority, index) for the addresses that need a request.
+    """
+    needed = plugin.needs_request(leads)
+    free = [i for i, lead in enumerate(leads)
+            if i not in needed and not _has_coords(lead) and plugin.can_enrich(lead)]
+    queue = [(priority_key(leads[i]), i) for i in needed]
+    heapq.heapify(queue)
+    return free, queue
+
+
+def coverage(leads, queue):
+    """Per-tier counts of leads with coordinates and addresses still queued."""
+    counts = {tier: {"leads": 0, "geocoded": 0, "queued": 0} for tier in TIER_ORDER}
+    for lead in leads:
+        c = counts.get(lead.get("priority_tier"))
+        if c is not None:
+            c["leads"] += 1
+            c["geocoded"] += _has_coords(lead)
+    for _, i in queue:
+        c = counts.get(leads[i].get("priority_tier"))
+        if c is not None:
+            c["queued"] += 1
+    return counts
+
+
+def print_coverage(counts):
+    for tier in TIER_ORDER:
+        c = counts[tier]
+        print(f"  {tier:5s} {c['geocoded']:>6}/{c['leads']:<6} geocoded, {c['queued']:>6} queued")
+
+
+def _enrich(plugin, lead):
+    fields = plugin.enrich(lead)
+    if fields:
+        lead.update(fields)
+    return bool(fields)
+
+
+def run(leads, plugin, max_requests=DEFAULT_MAX_REQUESTS, max_minutes=None):
+    """Geocode `leads` in place within the budget. Returns the run summary."""
+    deadline = time.time() + max_minutes * 60 if max_minutes else None
+    free, queue = plan(leads, plugin)
+    print(f"Free (cached / gazetteer / ZIP only): {len(free)}")
+    print(f"Queued for geocoding:                 {len(queue)}")
+    print()
+
+    summary = {"free": 0, "requests": 0, "resolved": {}, "errors": 0}
+    for i in free:
+        try:
+            summary["free"] += _enrich(plugin, leads[i])
+        except Exception as e:
+            summary["errors"] += 1
+            print(f"  Error on {leads[i].get('facility_name', '?')}: {e}")
+
+    start_requests = plugin.requests
+    processed = 0
+    while queue:
+        if max_requests is not None and plugin.requests - start_requests >= max_requests:
+            print(f"  Request budget of {max_requests} spent")
+            break
+        if deadline is not None and time.time() >= deadline:
+            print(f"  Time budget of {max_minutes} minutes spent")
+            break
+        _, i = heapq.heappop(queue)
+        lead = leads[i]
+        try:
+            _enrich(plugin, lead)
+        except Exception as e:
+            summary["errors"] += 1
+            if summary["errors"] <= 10:
+                print(f"  Error on {lead.get('facility_name', '?')}: {e}")
+        if _has_coords(lead):
+            tier = lead.get("priority_tier") or "Unscored"
+            summary["resolved"][tier] = summary["resolved"].get(tier, 0) + 1
+
+        processed += 1
+        if processed % 100 == 0:
+            print(f"  Progress: {processed} addresses, {plugin.requests - start_requests} requests, "
+                  f"{len(queue)} queued", flush=True)
+
+    summary["requests"] = plugin.requests - start_requests
+    summary["processed"] = processed
+    summary["queued"] = len(queue)
+    summary["coverage"] = coverage(leads, queue)
+    return summary
+
+
+def load_state(path=SCHEDULE_STATE_FILE):
+    if os.path.exists(path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            pass
+    return {"runs": []}
+
+
+def save_state(state, path=SCHEDULE_STATE_FILE):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def save_leads(leads, path=INPUT_FILE):
+    """Write the lead file atomically (a killed run can't truncate it)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(leads, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geocode uncached leads in priority order within a budget")
+    parser.add_argument("--input", default=INPUT_FILE, help="Lead JSON file (updated in place)")
+    parser.add_argument("--max-requests", type=int, default=DEFAULT_MAX_REQUESTS,
+                        help=f"Nominatim requests to spend this run (default {DEFAULT_MAX_REQUESTS})")
+    parser.add_argument("--max-minutes", type=float, help="Stop after this many minutes")
+    parser.add_argument("--status", action="store_true", help="Show coverage by tier and exit")
+    args = parser.parse_args()
+
+    print("Harvest Med Waste — Geocode Scheduler")
+    print()
+
+    with open(args.input) as f:
+        leads = json.load(f)
+    for lead in leads:
+        normalize_lead(lead)
+    print(f"Total leads: {len(leads)}")
+
+    plugin = GeoDistanceCalculator()
+    state = load_state()
+
+    if args.status:
+        _, queue = plan(leads, plugin)
+        print_coverage(coverage(leads, queue))
+        if state["runs"]:
+            last = state["runs"][-1]
+            print(f"\nLast run {last['run']}: {last['requests']} requests, {last['queued']} left queued")
+        return
+
+    summary = run(leads, plugin, max_requests=args.max_requests, max_minutes=args.max_minutes)
+    plugin.flush_cache()
+
+    changed = summary["free"] + sum(summary["resolved"].values())
+    if changed:
+        save_leads(leads, args.input)
+
+    state["runs"].append({
+        "run": datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ"),
+        "requests": summary["requests"],
+        "processed": summary["processed"],
+        "resolved": summary["resolved"],
+        "queued": summary["queued"],
+        "coverage": summary["coverage"],
+    })
+    save_state(state)
+
+    print()
+    print("Done! Results:")
+    print(f"  Requests:  {summary['requests']}")
+    print("  Resolved:  " + (", ".join(f"{t} {n}" for t, n in summary["resolved"].items()) or "none"))
+    print(f"  Free:      {summary['free']}")
+    print(f"  Errors:    {summary['errors']}")
+    print(f"  Queued for next run: {summary['queued']}")
+    print_coverage(summary["coverage"])
+    if changed:
+        print(f"  Saved to: {args.input}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+lead_record.py — Compact in-memory representation of a lead / source record.
+
+Normalized records and leads are plain dicts at the edges of the pipeline
+(JSON files, database rows). Inside the dedup and enrichment hot paths they
+are held as LeadRecord objects instead:
+  - fixed fields live in __slots__, so there is no per-record key table
+  - categorical values (city, county, facility_type, source, ...) are
+    interned, so "Birmingham" is stored once rather than once per record
+  - unknown keys still work, kept in a small overflow dict
+
+LeadRecord supports the dict methods the plugins and dedup code use
+(get, [], in, update, pop, keys/items), so it can be passed anywhere a
+lead dict is read. Convert back with to_dict() before writing output.
+
+Usage:
+    from tools.lead_record import LeadRecord
+    rec = LeadRecord.from_dict(raw)
+    rec.get("city")
+    rec.to_dict()
+    column(records, "bed_count")   # One field across many records
+"""
+
+import sys
+
+# Fields stored in slots, in output order (normalized schema, then
+# enrichment and scoring fields)
+FIELDS = (
+    "id", "lead_uid", "source", "source_id", "facility_name", "facility_type",
+    "address_line1", "address_line2", "city", "state", "zip5", "county",
+    "phone", "fax", "administrator", "npi_number", "license_number",
+    "taxonomy_code", "entity_type", "facility_established_date",
+    "contract_expiry_date", "bed_count", "hospital_type", "ownership_type",
+    "latitude", "longitude", "sources",
+    "estimated_waste_lbs_per_day", "estimated_monthly_volume", "waste_tier",
+    "distance_from_birmingham", "service_zone", "completeness_score",
+    "contact_email", "contact_name", "contact_title", "email_confidence",
+    "email_source", "lead_score", "priority_tier", "status",
+    "_norm_name", "_norm_address",
+)
+
+# Low-cardinality string fields that are interned on assignment
+INTERNED_FIELDS = frozenset({
+    "source", "facility_type", "city", "state", "zip5", "county",
+    "taxonomy_code", "entity_type", "hospital_type", "ownership_type",
+    "waste_tier", "service_zone", "priority_tier", "status", "email_source",
+})
+
+_FIELD_SET = frozenset(FIELDS)
+
+
+class LeadRecord:
+    """Slotted lead record with interned categorical fields."""
+
+    __slots__ = FIELDS + ("_extra",)
+
+    def __init__(self, data=None):
+        self._extra = None
+        if data:
+            self.update(data)
+
+    @classmethod
+    def from_dict(cls, data):
+        """Wrap a dict (or return an existing LeadRecord unchanged)."""
+        if isinstance(data, cls):
+            return data
+        return cls(data)
+
+    def to_dict(self):
+        """Return a plain dict with the same keys and values."""
+        return dict(self.items())
+
+    # ── Mapping interface ──────────────────────────────────────
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            if key in INTERNED_FIELDS and type(value) is str:
+                value = sys.intern(value)
+            setattr(self, key, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _FIELD_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def keys(self):
+        keys = [f for f in FIELDS if hasattr(self, f)]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def items(self):
+        return [(k, self[k]) for k in self.keys()]
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def pop(self, key, *default):
+        try:
+            value = self[key]
+        except KeyError:
+            if default:
+                return default[0]
+            raise
+        del self[key]
+        return value
+
+    def update(self, other=(), **kwargs):
+        items = other.items() if hasattr(other, "items") else other
+        for key, value in items:
+            self[key] = value
+        for key, value in kwargs.items():
+            self[key] = value
+
+    def __eq__(self, other):
+        if isinstance(other, (LeadRecord, dict)):
+            return dict(self.items()) == dict(other.items())
+        return NotImplemented
+
+    def __repr__(self):
+        return f"<LeadRecord: {self.get('source_id') or self.get('lead_uid') or '?'}>"
+
+
+def column(records, key):
+    """Values of `key` across records, None where missing.
+
+    Reads slots directly for LeadRecords (much cheaper than .get() on a
+    missing field), so column-wise plugins can pull whole fields at once.
+    """
+    if key in _FIELD_SET:
+        return [getattr(r, key, None) if type(r) is LeadRecord else r.get(key) for r in records]
+    return [r.get(key) for r in records]
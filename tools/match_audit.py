@@ -0,0 +1,160 @@
+"""
+match_audit.py — Append-only log of dedup merge decisions, and a query tool.
+
+Every union the dedup engine makes is recorded as one JSON line in
+.tmp/dedup_audit.jsonl:
+
+    {"run": "20261018T140512Z", "pass": "fuzzy", "key": "35205",
+     "ids": ["npi:npi-1", "cms:cms-2"], "name_sim": 0.92, "addr_sim": 0.88}
+
+  pass      npi | license | exact | fuzzy | phone | street | cross_shard
+            (union passes), detach (a changed record left its lead), or
+            lead (final membership of a multi-source lead)
+  key       the NPI / license / address / ZIP / phone / street key matched on
+  ids       "source:source_id" of the records joined
+  lead_uid  set on lead and detach events, and on incremental unions
+  name_sim / addr_sim  rapidfuzz ratios for fuzzy, phone and street unions
+
+Events are buffered in memory as tuples and written with one append per
+run, so logging costs a small fraction of the matching itself (measure
+with tools/benchmark_dedup.py --audit).
+
+Usage:
+    python tools/match_audit.py npi-1234567890          # Explain a lead's merges
+    python tools/match_audit.py npi-1234567890 --all-runs
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime, timezone
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUDIT_LOG_FILE = os.path.join(PROJECT_ROOT, ".tmp", "dedup_audit.jsonl")
+
+EVENT_FIELDS = ("pass", "key", "ids", "lead_uid", "name_sim", "addr_sim")
+
+
+def record_id(rec):
+    """Audit identifier for a source record."""
+    return f"{rec.get('source', '')}:{rec.get('source_id', '')}"
+
+
+class MatchAuditLog:
+    """Buffers merge events for one dedup run and appends them on flush."""
+
+    def __init__(self, path=AUDIT_LOG_FILE, run_id=None):
+        self.path = path
+        self.run_id = run_id or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.events = []
+
+    def union(self, pass_name, key, ids, lead_uid=None, name_sim=None, addr_sim=None):
+        """Record that the records in `ids` were joined by `pass_name` on `key`."""
+        self.events.append((pass_name, key, ids, lead_uid, name_sim, addr_sim))
+
+    def lead(self, lead_uid, ids):
+        """Record the final member records of a multi-source lead."""
+        self.events.append(("lead", None, ids, lead_uid, None, None))
+
+    def flush(self):
+        """Append buffered events to the log. Returns the number written."""
+        if not self.events:
+            return 0
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        lines = []
+        for event in self.events:
+            row = {"run": self.run_id}
+            for field, value in zip(EVENT_FIELDS, event):
+                if value is not None:
+                    row[field] = round(value, 3) if field.endswith("_sim") else value
+            lines.append(json.dumps(row))
+        with open(self.path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+        written = len(self.events)
+        self.events = []
+        return written
+
+
+def iter_events(path=AUDIT_LOG_FILE):
+    """Yield logged events in write order, skipping a torn last line."""
+    if not os.path.exists(path):
+        return
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def explain(lead_uid, path=AUDIT_LOG_FILE, all_runs=False):
+    """Return {run: [events]} describing how `lead_uid` was assembled.
+
+    A lead's records are its final members in a run plus anything attached
+    to or detached from it by uid; every union touching one of those
+    records in the same run is included. Only the latest run is returned
+    unless `all_runs` is set.
+    """
+    # First pass: which records made up the lead in each run
+    members = {}
+    for event in iter_events(path):
+        if event.get("lead_uid") == lead_uid:
+            members.setdefault(event["run"], set()).update(event.get("ids", []))
+    if not members:
+        return {}
+
+    runs = sorted(members) if all_runs else [max(members)]
+    history = {run: [] for run in runs}
+
+    # Second pass: every event in those runs involving one of the records
+    for event in iter_events(path):
+        run = event["run"]
+        if run not in history:
+            continue
+        if event.get("lead_uid") == lead_uid or members[run].intersection(event.get("ids", [])):
+            history[run].append(event)
+    return history
+
+
+def format_event(event):
+    """One-line human-readable description of an event."""
+    ids = " + ".join(event.get("ids", []))
+    if event["pass"] == "lead":
+        return f"final members: {ids}"
+    if event["pass"] == "detach":
+        return f"detached (record changed): {ids}"
+    line = f"[{event['pass']}] {ids}"
+    if event.get("key"):
+        line += f"  key={event['key']}"
+    if "name_sim" in event:
+        line += f"  name={event['name_sim']:.2f} addr={event['addr_sim']:.2f}"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain a lead's dedup merge history")
+    parser.add_argument("lead_uid", help="Lead uid, e.g. npi-1234567890")
+    parser.add_argument("--log", default=AUDIT_LOG_FILE, help="Audit log path")
+    parser.add_argument("--all-runs", action="store_true",
+                        help="Show every run, not only the latest")
+    parser.add_argument("--json", action="store_true", help="Print raw events as JSON")
+    args = parser.parse_args()
+
+    history = explain(args.lead_uid, path=args.log, all_runs=args.all_runs)
+    if not history:
+        print(f"No merges recorded for {args.lead_uid} in {args.log}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps(history, indent=2))
+        return
+
+    for run, events in history.items():
+        print(f"Run {run}:")
+        for event in events:
+            print(f"  {format_event(event)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -18,6 +18,7 @@ Usage:
     python tools/orchestrator.py --json              # JSON mode (no DB)
     python tools/orchestrator.py --skip-ingest       # Skip data download
     python tools/orchestrator.py --crm hubspot       # Sync to HubSpot after scoring
+    python tools/orchestrator.py --dedup-rebuild     # Full dedup instead of incremental
 """
 
 import json
@@ -120,16 +121,16 @@ def stage_normalize(json_mode=False):
     return {"records": len(records)}
 
 
-def stage_deduplicate(json_mode=False):
-    """Deduplicate stage: merge records across sources."""
+def stage_deduplicate(json_mode=False, workers=1, rebuild=False):
+    """Deduplicate stage: merge new/changed records into the master index."""
     if json_mode:
         from tools.deduplicate import deduplicate_from_file
-        merged, review = deduplicate_from_file()
+        merged, review = deduplicate_from_file(workers=workers, rebuild=rebuild)
     else:
         from tools.normalize import load_from_db
         from tools.deduplicate import deduplicate_and_save_to_db
         records = load_from_db()
-        merged, review = deduplicate_and_save_to_db(records)
+        merged, review = deduplicate_and_save_to_db(records, workers=workers, rebuild=rebuild)
     return {"leads": len(merged), "review_flags": len(review)}
 
 
@@ -177,7 +178,8 @@ def stage_crm_sync(adapter_name="json", min_score=50):
     return stats
 
 
-def run_pipeline(stages=None, json_mode=False, skip_ingest=False, skip_medspa=False, crm_adapter=None, min_score=50):
+def run_pipeline(stages=None, json_mode=False, skip_ingest=False, skip_medspa=False, crm_adapter=None, min_score=50,
+                 dedup_workers=1, dedup_rebuild=False):
     """Run the full pipeline or specific stages."""
     print("=" * 60)
     print("  HARVEST MED WASTE — LEAD PIPELINE")
@@ -213,7 +215,8 @@ def run_pipeline(stages=None, json_mode=False, skip_ingest=False, skip_medspa=Fa
         elif stage_name == "normalize":
             ok = run_stage("normalize", lambda: stage_normalize(json_mode=json_mode), stage_results)
         elif stage_name == "deduplicate":
-            ok = run_stage("deduplicate", lambda: stage_deduplicate(json_mode=json_mode), stage_results)
+            ok = run_stage("deduplicate", lambda: stage_deduplicate(json_mode=json_mode, workers=dedup_workers,
+                                                                    rebuild=dedup_rebuild), stage_results)
         elif stage_name == "enrich":
             ok = run_stage("enrich", lambda: stage_enrich(json_mode=json_mode), stage_results)
         elif stage_name == "score":
@@ -281,6 +284,10 @@ if __name__ == "__main__":
                         help="CRM adapter for sync stage")
     parser.add_argument("--min-score", type=int, default=50,
                         help="Minimum score for CRM sync")
+    parser.add_argument("--dedup-workers", type=int, default=1,
+                        help="Processes for the dedup fuzzy pass (0 = all cores)")
+    parser.add_argument("--dedup-rebuild", action="store_true",
+                        help="Rebuild the dedup master index from scratch")
     args = parser.parse_args()
 
     stages = args.stages.split(",") if args.stages else None
@@ -292,6 +299,8 @@ if __name__ == "__main__":
         skip_medspa=args.skip_medspa,
         crm_adapter=args.crm,
         min_score=args.min_score,
+        dedup_workers=args.dedup_workers or os.cpu_count() or 1,
+        dedup_rebuild=args.dedup_rebuild,
     )
 
     sys.exit(0 if success else 1)
@@ -0,0 +1,333 @@
+"""
+score_engine.py — Columnar, vectorized lead scoring.
+
+Computes the same five components and total as score_leads.score_lead(),
+but for all leads at once: load_columns() pulls the scoring inputs into
+NumPy arrays (facility type codes, waste, distance with the ZIP centroid
+fallback applied, date ordinals, entity codes, completeness, source
+counts), and score_columns() computes every component with array
+operations.
+
+Floats are added in the same order as score_lead() and rounded to
+Python's round() results (the rare values that sit on a rounding tie
+are redone with round()), so totals and components equal score_lead()
+exactly. --check verifies that on synthetic leads and times both paths.
+
+Usage:
+    from tools.score_engine import load_columns, score_columns
+    totals, components = score_columns(load_columns(leads))
+
+    python tools/score_engine.py --check                 # 100k leads vs score_lead()
+    python tools/score_engine.py --check --leads 1000000 --no-scalar
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.lead_record import column
+from tools.score_leads import (
+    FACILITY_TYPE_SCORES, MAX_WASTE_FOR_SCORING, PROXIMITY_THRESHOLDS, _zip_to_distance,
+    score_lead, score_waste_volume,
+)
+
+COMPONENTS = ("waste_volume", "facility_type", "proximity", "opportunity", "data_confidence")
+
+# Facility type codes: index into FACILITY_TYPES; unknown types get UNKNOWN_TYPE
+FACILITY_TYPES = list(FACILITY_TYPE_SCORES)
+FACILITY_TYPE_CODES = {t: code for code, t in enumerate(FACILITY_TYPES)}
+UNKNOWN_TYPE = len(FACILITY_TYPES)
+TYPE_SCORE_TABLE = np.array([FACILITY_TYPE_SCORES[t] for t in FACILITY_TYPES] + [1], dtype=np.int16)
+
+# Entity type codes and the data-confidence points for each (NPI-2, NPI-1, unknown)
+ENTITY_CODES = {"NPI-2": 0, "NPI-1": 1}
+UNKNOWN_ENTITY = 2
+ENTITY_POINTS = np.array([7, 0, 3], dtype=np.float64)
+
+# Data-confidence points by source count (0, 1, 2, 3+)
+SOURCE_POINTS = np.array([0, 0, 2, 3], dtype=np.float64)
+
+NO_DATE = 0  # Ordinal for a missing or unparseable date
+
+
+def _date_ordinal(value, memo):
+    """Ordinal of a date field as score_opportunity() would parse it, NO_DATE if unusable."""
+    if not value:
+        return NO_DATE
+    ordinal = memo.get(value)
+    if ordinal is None:
+        try:
+            if isinstance(value, date) and not isinstance(value, datetime):
+                ordinal = value.toordinal()
+            else:
+                ordinal = datetime.strptime(str(value)[:10], "%Y-%m-%d").date().toordinal()
+        except (ValueError, TypeError):
+            ordinal = NO_DATE
+        memo[value] = ordinal
+    return ordinal
+
+
+def _float_or_nan(values):
+    return np.array([np.nan if v is None else float(v) for v in values], dtype=np.float64)
+
+
+def load_columns(leads):
+    """Scoring inputs of `leads` (dicts or LeadRecords) as a dict of NumPy arrays.
+
+    NUMERIC columns from the database (Decimal) are read as floats.
+    """
+    n = len(leads)
+
+    # Distance, falling back to the ZIP centroid (computed once per ZIP)
+    distance = _float_or_nan(column(leads, "distance_from_birmingham"))
+    zip_distance = {}
+    for i in np.flatnonzero(np.isnan(distance)):
+        lead = leads[i]
+        zip5 = lead.get("zip5") or lead.get("zip") or ""
+        if zip5 not in zip_distance:
+            zip_distance[zip5] = _zip_to_distance(zip5)
+        d = zip_distance[zip5]
+        if d is not None:
+            distance[i] = d
+
+    date_memo = {}
+    sources = column(leads, "sources")
+
+    return {
+        "count": n,
+        # Missing and unknown types both score as "Other"
+        "facility_type": np.array([FACILITY_TYPE_CODES.get(t, UNKNOWN_TYPE)
+                                   for t in column(leads, "facility_type")], dtype=np.int8),
+        "waste": _float_or_nan(column(leads, "estimated_waste_lbs_per_day")),
+        "distance": distance,
+        "contract_expiry": np.array([_date_ordinal(v, date_memo)
+                                     for v in column(leads, "contract_expiry_date")], dtype=np.int64),
+        "established": np.array([_date_ordinal(v, date_memo)
+                                 for v in column(leads, "facility_established_date")], dtype=np.int64),
+        "entity": np.array([ENTITY_CODES.get(v, UNKNOWN_ENTITY) for v in column(leads, "entity_type")],
+                           dtype=np.int8),
+        "completeness": _float_or_nan(column(leads, "completeness_score")),
+        "sources": np.array([len(s) if isinstance(s, list) else 0 for s in sources], dtype=np.int32),
+    }
+
+
+# ── Components ─────────────────────────────────────────────────
+
+
+def _round1(values, inputs=None, exact=None):
+    """Elementwise round(v, 1) with Python's result.
+
+    rint(v * 10) / 10 agrees with round() except where v * 10 lands within
+    rounding error of a .5 tie; those elements are redone by round() once
+    per distinct value. When `values` only approximates a scalar
+    computation, pass its `inputs` and the scalar function as `exact`.
+    """
+    scaled = values * 10
+    rounded = np.rint(scaled) / 10
+    near = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    if near.size:
+        if exact is None:
+            inputs, exact = values, lambda v: round(v, 1)
+        distinct, inverse = np.unique(inputs[near], return_inverse=True)
+        rounded[near] = np.array([exact(v) for v in distinct.tolist()], dtype=np.float64)[inverse]
+    return rounded
+
+
+def waste_scores(cols, max_waste=MAX_WASTE_FOR_SCORING):
+    waste = cols["waste"]
+    known = waste > 0  # NaN compares False
+    with np.errstate(invalid="ignore"):
+        raw = np.log1p(np.where(known, waste, 0.0)) / math.log1p(max_waste) * 25
+    # np.log1p may differ from math.log1p in the last bit, so ties go to the scalar function
+    scores = _round1(np.minimum(raw, 25), inputs=waste,
+                     exact=lambda w: score_waste_volume({"estimated_waste_lbs_per_day": w}, max_waste))
+    scores[~known] = 3
+    return scores
+
+
+def type_score_table(type_scores):
+    """Score per facility type code for a FACILITY_TYPE_SCORES-style dict.
+
+    Types missing from `type_scores` score 1, like unknown types.
+    """
+    scores = [type_scores.get(t, 1) for t in FACILITY_TYPES] + [1]
+    return np.array(scores, dtype=np.int16 if all(float(v).is_integer() for v in scores) else np.float64)
+
+
+def facility_type_scores(cols, table=TYPE_SCORE_TABLE):
+    return table[cols["facility_type"]]
+
+
+def proximity_scores(cols, thresholds=PROXIMITY_THRESHOLDS):
+    distance = cols["distance"]
+    scores = np.ones(cols["count"], dtype=np.int16)
+    # Walk the thresholds from the widest so the nearest band wins
+    for threshold, score in sorted(thresholds, reverse=True):
+        scores[distance <= threshold] = score
+    scores[np.isnan(distance)] = 5
+    return scores
+
+
+def opportunity_scores(cols, today=None):
+    today = (today or date.today()).toordinal()
+
+    expiry = cols["contract_expiry"]
+    days_until = expiry - today
+    contract = np.select([expiry == NO_DATE, days_until <= 180, days_until <= 365], [4, 8, 5], default=1)
+
+    established = cols["established"]
+    years = (today - established) / 365.25
+    age = np.select(
+        [established == NO_DATE, years < 1, years < 2, years < 3, years < 5, years < 8, years < 12, years < 20],
+        [3, 7, 6, 5, 4, 3, 2, 1], default=0)
+
+    return np.minimum(contract + age, 15).astype(np.int16)
+
+
+def confidence_scores(cols):
+    entity = ENTITY_POINTS[cols["entity"]]
+    completeness = cols["completeness"]
+    completeness_points = np.where(np.isnan(completeness), 2, _round1(completeness * 5))
+    source_points = SOURCE_POINTS[np.minimum(cols["sources"], 3)]
+    # Added in score_data_confidence()'s order so the float sums are identical
+    score = (entity + completeness_points) + source_points
+    return np.minimum(_round1(score), 15)
+
+
+def score_columns(cols, today=None):
+    """All five components and the totals for load_columns() output.
+
+    Returns (totals as int array, {component name: array}).
+    """
+    components = {
+        "waste_volume": waste_scores(cols),
+        "facility_type": facility_type_scores(cols),
+        "proximity": proximity_scores(cols),
+        "opportunity": opportunity_scores(cols, today),
+        "data_confidence": confidence_scores(cols),
+    }
+    return total_scores(components), components
+
+
+def total_scores(components):
+    """Totals from the component arrays, as score_lead() computes them."""
+    # Summed in score_lead()'s order; rint rounds half to even like round()
+    total = components["waste_volume"].astype(np.float64)
+    for name in COMPONENTS[1:]:
+        total += components[name]
+    return np.minimum(np.rint(total), 100).astype(np.int64)
+
+
+def breakdowns(cols, components, max_waste=MAX_WASTE_FOR_SCORING):
+    """Per-lead breakdown dicts with score_lead()'s value types.
+
+    Waste is an int for unknown volume (3) and above the cap (25), and
+    data confidence is an int when completeness is unknown; everything
+    else matches the array dtype.
+    """
+    waste = components["waste_volume"].tolist()
+    confidence = components["data_confidence"].tolist()
+    for i in np.flatnonzero(~(cols["waste"] > 0) | (cols["waste"] > max_waste)).tolist():
+        waste[i] = int(waste[i])
+    for i in np.flatnonzero(np.isnan(cols["completeness"])).tolist():
+        confidence[i] = int(confidence[i])
+    columns = [waste, components["facility_type"].tolist(), components["proximity"].tolist(),
+               components["opportunity"].tolist(), confidence]
+    return [dict(zip(COMPONENTS, values)) for values in zip(*columns)]
+
+
+# ── Differential check ─────────────────────────────────────────
+
+
+def synthetic_leads(count, seed=42):
+    """Leads covering every branch of score_lead(), including bad and missing values."""
+    rng = random.Random(seed)
+    today = date.today()
+    types = FACILITY_TYPES + ["Unknown Type", None]
+    zips = ["35203", "35801", "36104", "36602", "35401", "99999", "", None]
+
+    def some_date():
+        kind = rng.random()
+        if kind < 0.3:
+            return None
+        day = today + timedelta(days=rng.randint(-40 * 365, 3 * 365))
+        if kind < 0.5:
+            return day
+        if kind < 0.55:
+            return "not-a-date"
+        if kind < 0.6:
+            return datetime.combine(day, datetime.min.time())
+        return day.isoformat()
+
+    leads = []
+    for _ in range(count):
+        lead = {
+            "facility_type": rng.choice(types),
+            "estimated_waste_lbs_per_day": rng.choice([None, 0, -1, round(rng.uniform(0, 800), 2),
+                                                       round(rng.lognormvariate(1, 2), 2)]),
+            "distance_from_birmingham": rng.choice([None, round(rng.uniform(0, 300), 1),
+                                                    30, 60, 100, 150]),
+            "zip5": rng.choice(zips),
+            "contract_expiry_date": some_date(),
+            "facility_established_date": some_date(),
+            "entity_type": rng.choice(["NPI-1", "NPI-2", None, ""]),
+            "completeness_score": rng.choice([None, round(rng.random(), 2), round(rng.random(), 4)]),
+            "sources": [None] * rng.randint(0, 4),
+        }
+        if rng.random() < 0.05:
+            del lead["facility_type"]
+        leads.append(lead)
+    return leads
+
+
+def check(count, seed=42, scalar=True):
+    """Compare score_columns() with score_lead() on synthetic leads. Returns mismatches."""
+    print(f"Generating {count:,} synthetic leads...")
+    leads = synthetic_leads(count, seed)
+
+    start = time.perf_counter()
+    cols = load_columns(leads)
+    loaded = time.perf_counter()
+    totals, components = score_columns(cols)
+    scored = time.perf_counter()
+    print(f"  Vectorized: load {loaded - start:.3f}s, score {scored - loaded:.3f}s")
+
+    if not scalar:
+        return 0
+
+    start = time.perf_counter()
+    expected = [score_lead(lead) for lead in leads]
+    elapsed = time.perf_counter() - start
+    print(f"  score_lead(): {elapsed:.3f}s ({elapsed / max(scored - loaded, 1e-9):.0f}x the vectorized scoring)")
+
+    mismatches = 0
+    for i, ((total, breakdown), got) in enumerate(zip(expected, breakdowns(cols, components))):
+        if total != totals[i] or breakdown != got or any(type(breakdown[k]) is not type(got[k])
+                                                          for k in COMPONENTS):
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  Mismatch at {i}: {total} {breakdown} vs {totals[i]} {got}\n    {leads[i]}")
+    print(f"  {mismatches} mismatches in {count:,} leads")
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Vectorized lead scoring engine")
+    parser.add_argument("--check", action="store_true", help="Differential check against score_lead()")
+    parser.add_argument("--leads", type=int, default=100000, help="Synthetic leads for --check")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-scalar", action="store_true", help="Only time the vectorized path")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check(args.leads, args.seed, scalar=not args.no_scalar) else 0)
+    parser.print_help()
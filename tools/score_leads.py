@@ -14,22 +14,30 @@ Tier assignment uses percentile cutoffs to guarantee a usable distribution:
   - Cool: next 35%
   - Cold: bottom 25%
 
+score_lead() is the reference definition of each component; score_all()
+scores the whole list at once with the vectorized engine in
+tools/score_engine.py, which reproduces score_lead() exactly.
+
 Usage:
     python tools/score_leads.py
     python tools/score_leads.py --json    # Score from JSON files
+    python tools/score_leads.py --retention-months 12
 """
 
 import json
 import math
 import os
 import sys
+import time
 import argparse
 from datetime import datetime, date
 
+import numpy as np
+
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
 
-from tools.enrichment_plugins.geo_distance import AL_ZIP_CENTROIDS, haversine, BIRMINGHAM_LAT, BIRMINGHAM_LON
+from tools.enrichment_plugins.geo_distance import get_zip_coords, haversine, BIRMINGHAM_LAT, BIRMINGHAM_LON
 
 # Facility type priority scores (out of 30)
 FACILITY_TYPE_SCORES = {
@@ -62,29 +70,31 @@ PROXIMITY_THRESHOLDS = [
 # Maximum daily waste for normalization (lbs/day)
 MAX_WASTE_FOR_SCORING = 5000  # Large hospital ~5000 lbs/day
 
+# Tiers, best first, and the share of leads at or above each cutoff
+TIERS = ["Hot", "Warm", "Cool", "Cold"]
+TIER_PERCENTILES = (0.12, 0.40, 0.75)  # Hot, Warm, Cool; Cold is the rest
+
 
 def _zip_to_distance(zip5):
-    """Compute distance from Birmingham using ZIP centroid table.
+    """Compute distance from Birmingham using the ZIP centroid tables.
 
-    Returns distance in miles, or None if ZIP prefix not found.
+    5-digit ZCTA centroid where known, else the 3-digit prefix centroid.
+    Returns distance in miles, or None if the ZIP isn't found.
     """
-    if not zip5 or len(zip5) < 3:
+    lat, lon = get_zip_coords(zip5)
+    if lat is None:
         return None
-    prefix = zip5[:3]
-    coords = AL_ZIP_CENTROIDS.get(prefix)
-    if coords is None:
-        return None
-    return haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, coords[0], coords[1])
+    return haversine(BIRMINGHAM_LAT, BIRMINGHAM_LON, lat, lon)
 
 
-def score_waste_volume(lead):
+def score_waste_volume(lead, max_waste=MAX_WASTE_FOR_SCORING):
     """Score waste volume potential (0-25 scale, log-scaled)."""
     waste = lead.get("estimated_waste_lbs_per_day")
     if not waste or waste <= 0:
         return 3  # Baseline for unknown waste volume
 
     # Log scale: log(1+waste) / log(1+MAX) * 25
-    score = math.log1p(waste) / math.log1p(MAX_WASTE_FOR_SCORING) * 25
+    score = math.log1p(waste) / math.log1p(max_waste) * 25
     return round(min(score, 25), 1)
 
 
@@ -216,6 +226,51 @@ def score_data_confidence(lead):
     return min(round(score, 1), 15)
 
 
+def _is_score_range(scores):
+    """True if `scores` are ints in 0-100 (what score_lead() produces)."""
+    return scores.dtype.kind in "iu" and scores.min() >= 0 and scores.max() <= 100
+
+
+def tier_cutoffs(scores, percentiles=TIER_PERCENTILES):
+    """Hot, Warm and Cool cutoff scores for a non-empty score array.
+
+    Each cutoff is the score at rank max(0, int(n * p) - 1) of the scores
+    sorted descending. Integer 0-100 scores are counted into a 101-bucket
+    histogram; anything else uses np.partition. Both are O(n).
+    """
+    n = len(scores)
+    ranks = [max(0, int(n * p) - 1) for p in percentiles]
+    if _is_score_range(scores):
+        # at_or_above[j]: how many scores are >= 100 - j
+        at_or_above = np.cumsum(np.bincount(scores, minlength=101)[::-1])
+        return [100 - int(np.searchsorted(at_or_above, rank + 1)) for rank in ranks]
+    positions = [n - 1 - rank for rank in ranks]
+    partitioned = np.partition(scores, positions)
+    return [partitioned[p].item() for p in positions]
+
+
+def tier_indices(scores, percentiles=TIER_PERCENTILES):
+    """Index into TIERS for each score: Hot if s >= hot cutoff, and so on down."""
+    scores = np.asarray(scores)
+    if not len(scores):
+        return np.zeros(0, dtype=np.int8)
+    hot, warm, cool = tier_cutoffs(scores, percentiles)
+    # Cutoffs are non-increasing, so counting the ones a score misses gives its tier
+    return ((scores < hot).astype(np.int8) + (scores < warm) + (scores < cool)).astype(np.int8)
+
+
+def rank_order(scores):
+    """Indices of `scores` from highest to lowest, ties in original order.
+
+    The same order as a stable sort by descending score; for 0-100
+    integer scores it's a counting (radix) sort.
+    """
+    scores = np.asarray(scores)
+    if len(scores) and _is_score_range(scores):
+        return np.argsort((100 - scores).astype(np.uint8), kind="stable")
+    return np.argsort(-scores, kind="stable")
+
+
 def assign_tiers(leads):
     """Assign tiers based on percentile cutoffs.
 
@@ -227,28 +282,8 @@ def assign_tiers(leads):
     if not leads:
         return
 
-    # Sort by score descending to determine percentile cutoffs
-    scores = sorted([l.get("lead_score", 0) for l in leads], reverse=True)
-    n = len(scores)
-
-    hot_idx = max(0, int(n * 0.12) - 1)
-    warm_idx = max(0, int(n * 0.40) - 1)
-    cool_idx = max(0, int(n * 0.75) - 1)
-
-    hot_cutoff = scores[hot_idx]
-    warm_cutoff = scores[warm_idx]
-    cool_cutoff = scores[cool_idx]
-
-    for lead in leads:
-        s = lead.get("lead_score", 0)
-        if s >= hot_cutoff:
-            lead["priority_tier"] = "Hot"
-        elif s >= warm_cutoff:
-            lead["priority_tier"] = "Warm"
-        elif s >= cool_cutoff:
-            lead["priority_tier"] = "Cool"
-        else:
-            lead["priority_tier"] = "Cold"
+    for lead, tier in zip(leads, tier_indices([l.get("lead_score", 0) for l in leads]).tolist()):
+        lead["priority_tier"] = TIERS[tier]
 
 
 def score_lead(lead):
@@ -274,28 +309,36 @@ def score_lead(lead):
     return total, breakdown
 
 
-def score_all(leads):
-    """Score all leads. Returns scored leads and summary stats."""
+def score_all(leads, sort=True):
+    """Score all leads. Returns scored leads and summary stats.
+
+    With `sort`, leads are reordered by descending score (ties keep their
+    input order); callers that don't need ordered output can skip it.
+    """
     print("Harvest Med Waste — Lead Scoring Engine")
     print(f"  Leads to score: {len(leads)}")
     print()
 
-    for lead in leads:
-        total, breakdown = score_lead(lead)
-        lead["lead_score"] = total
-        lead["score_breakdown"] = breakdown
+    from tools.score_engine import load_columns, score_columns, breakdowns
 
+    cols = load_columns(leads)
+    totals, components = score_columns(cols)
     # Assign tiers using percentile cutoffs
-    assign_tiers(leads)
+    tiers = tier_indices(totals)
+    for lead, total, breakdown, tier in zip(leads, totals.tolist(), breakdowns(cols, components),
+                                            tiers.tolist()):
+        lead["lead_score"] = total
+        lead["score_breakdown"] = breakdown
+        lead["priority_tier"] = TIERS[tier]
 
-    # Sort by score descending
-    leads.sort(key=lambda l: l.get("lead_score", 0), reverse=True)
+    # Order by score descending
+    order = rank_order(totals)
+    if sort:
+        leads[:] = [leads[i] for i in order.tolist()]
+        order = range(len(leads))
 
     # Count tiers
-    tier_counts = {"Hot": 0, "Warm": 0, "Cool": 0, "Cold": 0}
-    for lead in leads:
-        tier = lead.get("priority_tier", "Cold")
-        tier_counts[tier] = tier_counts.get(tier, 0) + 1
+    tier_counts = dict(zip(TIERS, np.bincount(tiers, minlength=len(TIERS)).tolist()))
 
     # Print summary
     print("--- Scoring Summary ---")
@@ -306,13 +349,12 @@ def score_all(leads):
 
     # Score range
     if leads:
-        scores = [l["lead_score"] for l in leads]
-        print(f"\n  Score range: {min(scores)} — {max(scores)}")
+        print(f"\n  Score range: {totals.min()} — {totals.max()}")
     print()
 
     # Top 10 leads
     print("Top 10 Leads:")
-    for lead in leads[:10]:
+    for lead in (leads[i] for i in order[:10]):
         print(f"  [{lead['lead_score']}] {lead.get('priority_tier', '?')} — "
               f"{lead.get('facility_name', '?')} ({lead.get('city', '?')})")
 
@@ -343,9 +385,9 @@ def score_from_json():
     return leads
 
 
-def score_from_db():
-    """Load leads from database, score, and update."""
-    from tools.db import fetch_all, get_cursor, record_score_history
+def fetch_leads_for_scoring():
+    """Load the scoring inputs of every lead (with its sources) from the database."""
+    from tools.db import fetch_all
 
     rows = fetch_all("""
         SELECT id, lead_uid, facility_name, facility_type, city, zip5,
@@ -357,8 +399,7 @@ def score_from_db():
     """)
 
     if not rows:
-        print("No leads in database.")
-        return []
+        return rows
 
     # Get source data for confidence scoring
     source_data = fetch_all("""
@@ -372,43 +413,67 @@ def score_from_db():
 
     for row in rows:
         row["sources"] = lead_sources.get(row["id"], [])
+    return rows
+
+
+def score_from_db(retention_months=None):
+    """Load leads from database, score, and update.
+
+    Only leads whose score, tier or breakdown changed are written, and
+    only those get a score history row. History partitions older than
+    `retention_months` (default SCORE_HISTORY_RETENTION_MONTHS) are dropped.
+    """
+    from tools.db import SCORE_HISTORY_RETENTION_MONTHS, prune_score_history, save_scores
+
+    if retention_months is None:
+        retention_months = SCORE_HISTORY_RETENTION_MONTHS
+    if retention_months < 1:
+        # Checked before anything is written, not only when pruning
+        raise ValueError(f"retention_months must be at least 1, got {retention_months}")
 
-    leads, tier_counts = score_all(rows)
+    rows = fetch_leads_for_scoring()
+    if not rows:
+        print("No leads in database.")
+        return []
 
-    # Update database
+    leads, tier_counts = score_all(rows, sort=False)
+
+    # Update database: changed scores and their history in one transaction
     print("Saving scores to database...")
-    with get_cursor() as cur:
-        for lead in leads:
-            cur.execute("""
-                UPDATE leads SET
-                    lead_score = %s,
-                    priority_tier = %s,
-                    last_updated = NOW()
-                WHERE id = %s
-            """, (lead["lead_score"], lead["priority_tier"], lead["id"]))
-
-            # Record score history
-            record_score_history(
-                lead["id"],
-                lead["lead_score"],
-                lead["priority_tier"],
-                lead.get("score_breakdown", {}),
-            )
-    print("  Database updated")
+    start = time.time()
+    changed = save_scores([
+        (lead["id"], lead["lead_score"], lead["priority_tier"], lead.get("score_breakdown", {}))
+        for lead in leads
+    ])
+    print(f"  Database updated ({changed} of {len(leads)} leads changed, {time.time() - start:.1f}s)")
+
+    dropped = prune_score_history(retention_months)
+    if dropped:
+        print(f"  Dropped {dropped} score history partitions past retention")
 
     return leads
 
 
+def _retention_months(text):
+    """argparse type for --retention-months: an integer of at least 1."""
+    months = int(text)
+    if months < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1 (got {months})")
+    return months
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Score leads")
     parser.add_argument("--json", action="store_true", help="Read from JSON files")
+    parser.add_argument("--retention-months", type=_retention_months,
+                        help="Months of score history to keep (default: SCORE_HISTORY_RETENTION_MONTHS)")
     args = parser.parse_args()
 
     if args.json:
         score_from_json()
     else:
         try:
-            score_from_db()
+            score_from_db(args.retention_months)
         except Exception as e:
             print(f"DB error: {e}")
             print("Falling back to JSON mode...")
@@ -0,0 +1,273 @@
+"""
+score_simulator.py — What-if scoring: compare weight and threshold variants.
+
+Loads the lead matrix once (tools/score_engine.py), then scores any
+number of variants of FACILITY_TYPE_SCORES, PROXIMITY_THRESHOLDS,
+MAX_WASTE_FOR_SCORING and the tier percentiles against it. Nothing is
+written: no lead, database row or score history changes. Components a
+variant doesn't touch are computed once and shared, so each variant
+costs a few array passes.
+
+For each variant it reports:
+  - tier counts (Hot/Warm/Cool/Cold)
+  - Spearman rank correlation of its scores with the current model
+  - top-N churn: share of the current top N leads that drop out of the
+    variant's top N
+
+A variant is a dict of overrides; anything it leaves out keeps the
+current value:
+
+    {"name": "dental-up",
+     "facility_type_scores": {"Dental": 18},
+     "proximity_thresholds": [[25, 15], [50, 12], [100, 9], [150, 5], [9999, 1]],
+     "max_waste": 3000,
+     "tier_percentiles": [0.10, 0.40, 0.75]}
+
+Usage:
+    python tools/score_simulator.py --variants variants.json
+    python tools/score_simulator.py --max-waste 2000,5000,8000 --hot 0.10,0.12,0.15
+    python tools/score_simulator.py --type-score Dental=12,15,18 --top-n 200 --json
+    python tools/score_simulator.py --variants variants.json --output .tmp/whatif.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from tools.score_engine import (
+    confidence_scores, facility_type_scores, load_columns, opportunity_scores,
+    proximity_scores, total_scores, type_score_table, waste_scores,
+)
+from tools.score_leads import (
+    FACILITY_TYPE_SCORES, MAX_WASTE_FOR_SCORING, PROXIMITY_THRESHOLDS, TIER_PERCENTILES, TIERS,
+    rank_order, tier_indices,
+)
+
+DEFAULT_TOP_N = 100
+
+
+def baseline_config():
+    """The scoring parameters score_leads.py uses today."""
+    return {
+        "facility_type_scores": dict(FACILITY_TYPE_SCORES),
+        "proximity_thresholds": [tuple(t) for t in PROXIMITY_THRESHOLDS],
+        "max_waste": MAX_WASTE_FOR_SCORING,
+        "tier_percentiles": tuple(TIER_PERCENTILES),
+    }
+
+
+def resolve_variant(variant):
+    """Baseline config with a variant's overrides applied."""
+    config = baseline_config()
+    config["name"] = variant.get("name", "variant")
+    config["facility_type_scores"].update(variant.get("facility_type_scores", {}))
+    if "proximity_thresholds" in variant:
+        config["proximity_thresholds"] = sorted(tuple(t) for t in variant["proximity_thresholds"])
+    if "max_waste" in variant:
+        config["max_waste"] = variant["max_waste"]
+    if "tier_percentiles" in variant:
+        config["tier_percentiles"] = tuple(variant["tier_percentiles"])
+    unknown = set(config["facility_type_scores"]) - set(FACILITY_TYPE_SCORES)
+    if unknown:
+        raise ValueError(f"{config['name']}: unknown facility types {sorted(unknown)}")
+    return config
+
+
+def average_ranks(scores):
+    """Rank of each score (1 = highest), ties sharing their average rank."""
+    scores = np.asarray(scores)
+    if scores.dtype.kind in "iu" and len(scores) and scores.min() >= 0:
+        # Integer scores: one histogram bucket per value instead of a sort
+        counts = np.bincount(scores)
+        inverse = scores
+    else:
+        _, inverse, counts = np.unique(scores, return_inverse=True, return_counts=True)
+    # Scores above each distinct value, then the mean of the tied positions
+    above = np.cumsum(counts[::-1])[::-1] - counts
+    return (above + (counts + 1) / 2)[inverse]
+
+
+def spearman(ranks_a, ranks_b):
+    """Spearman correlation from two average-rank arrays (1.0 if either is constant)."""
+    if ranks_a.std() == 0 or ranks_b.std() == 0:
+        return 1.0
+    return float(np.corrcoef(ranks_a, ranks_b)[0, 1])
+
+
+class ScoreSimulator:
+    """Lead matrix loaded once; scores variants against the current model."""
+
+    def __init__(self, leads, top_n=DEFAULT_TOP_N):
+        self.cols = load_columns(leads)
+        self.count = self.cols["count"]
+        self.top_n = min(top_n, self.count)
+        # Components no variant parameter touches
+        self._opportunity = opportunity_scores(self.cols)
+        self._confidence = confidence_scores(self.cols)
+        self._waste = {}
+        self._proximity = {}
+
+        baseline = self.score(baseline_config())
+        self.baseline_scores = baseline
+        self.baseline_ranks = average_ranks(baseline)
+        self.baseline_top = set(rank_order(baseline)[:self.top_n].tolist())
+
+    def score(self, config):
+        """Totals for a resolved config (components cached by parameter)."""
+        max_waste = config["max_waste"]
+        if max_waste not in self._waste:
+            self._waste[max_waste] = waste_scores(self.cols, max_waste)
+        thresholds = tuple(config["proximity_thresholds"])
+        if thresholds not in self._proximity:
+            self._proximity[thresholds] = proximity_scores(self.cols, thresholds)
+        return total_scores({
+            "waste_volume": self._waste[max_waste],
+            "facility_type": facility_type_scores(self.cols, type_score_table(config["facility_type_scores"])),
+            "proximity": self._proximity[thresholds],
+            "opportunity": self._opportunity,
+            "data_confidence": self._confidence,
+        })
+
+    def evaluate(self, variant):
+        """Tier counts, rank correlation and top-N churn for one variant."""
+        config = resolve_variant(variant)
+        scores = self.score(config)
+        tiers = tier_indices(scores, config["tier_percentiles"])
+        top = set(rank_order(scores)[:self.top_n].tolist())
+        return {
+            "name": config["name"],
+            "tier_counts": dict(zip(TIERS, np.bincount(tiers, minlength=len(TIERS)).tolist())),
+            "mean_score": round(float(scores.mean()), 2) if self.count else 0.0,
+            "spearman": round(spearman(self.baseline_ranks, average_ranks(scores)), 4) if self.count else 1.0,
+            "top_n_churn": round(1 - len(top & self.baseline_top) / self.top_n, 4) if self.top_n else 0.0,
+            "config": {k: v for k, v in config.items() if k != "name"},
+        }
+
+    def run(self, variants):
+        return [self.evaluate(variant) for variant in variants]
+
+
+def sweep_variants(max_wastes=None, hot_pcts=None, type_scores=None):
+    """Cartesian product of CLI sweep values → variant dicts.
+
+    `type_scores` maps facility type → list of scores to try.
+    """
+    axes = []
+    if max_wastes:
+        axes.append([("max_waste", v) for v in max_wastes])
+    if hot_pcts:
+        axes.append([("hot", v) for v in hot_pcts])
+    for facility_type, values in (type_scores or {}).items():
+        axes.append([(("type", facility_type), v) for v in values])
+
+    variants = []
+    for combo in itertools.product(*axes):
+        variant, name = {}, []
+        for key, value in combo:
+            if key == "max_waste":
+                variant["max_waste"] = value
+                name.append(f"waste{value:g}")
+            elif key == "hot":
+                variant["tier_percentiles"] = (value,) + tuple(TIER_PERCENTILES[1:])
+                name.append(f"hot{value:g}")
+            else:
+                variant.setdefault("facility_type_scores", {})[key[1]] = value
+                name.append(f"{key[1].replace(' ', '')}={value:g}")
+        variant["name"] = ",".join(name) or "baseline"
+        variants.append(variant)
+    return variants
+
+
+def load_leads(from_json):
+    """Leads as score_leads.py would read them (read-only)."""
+    if not from_json:
+        try:
+            from tools.score_leads import fetch_leads_for_scoring
+            return fetch_leads_for_scoring()
+        except Exception as e:
+            print(f"DB error: {e}")
+            print("Falling back to JSON mode...")
+    for path in (os.path.join(PROJECT_ROOT, ".tmp", "enriched_leads.json"),
+                 os.path.join(PROJECT_ROOT, "data", "alabama_leads.json")):
+        if os.path.exists(path):
+            print(f"Loading from {path}...")
+            with open(path) as f:
+                return json.load(f)
+    print("ERROR: No input file found.")
+    sys.exit(1)
+
+
+def print_results(results, top_n):
+    print(f"{'Variant':32s} {'Hot':>6} {'Warm':>6} {'Cool':>6} {'Cold':>6} {'Mean':>6} "
+          f"{'Spearman':>8} {f'Top{top_n} churn':>12}")
+    for r in results:
+        c = r["tier_counts"]
+        print(f"{r['name'][:32]:32s} {c['Hot']:>6} {c['Warm']:>6} {c['Cool']:>6} {c['Cold']:>6} "
+              f"{r['mean_score']:>6.1f} {r['spearman']:>8.4f} {r['top_n_churn']:>12.1%}")
+
+
+def _numbers(text):
+    """Comma-separated numbers, e.g. "1,2.5" → [1, 2.5] (ints stay ints)."""
+    if not text:
+        return None
+    return [int(v) if float(v).is_integer() else float(v) for v in text.split(",")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare lead scoring variants without writing anything")
+    parser.add_argument("--json", action="store_true", help="Read leads from JSON files instead of the DB")
+    parser.add_argument("--variants", help="JSON file with a list of variant dicts")
+    parser.add_argument("--max-waste", help="Comma-separated MAX_WASTE_FOR_SCORING values to sweep")
+    parser.add_argument("--hot", help="Comma-separated Hot tier percentiles to sweep (e.g. 0.10,0.12)")
+    parser.add_argument("--type-score", action="append", default=[],
+                        help="TYPE=score,score,... facility type scores to sweep (repeatable)")
+    parser.add_argument("--top-n", type=int, default=DEFAULT_TOP_N, help="N for top-N churn")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    variants = [{"name": "baseline"}]
+    if args.variants:
+        with open(args.variants) as f:
+            variants.extend(json.load(f))
+    type_scores = {}
+    for spec in args.type_score:
+        facility_type, _, values = spec.partition("=")
+        type_scores[facility_type] = _numbers(values)
+    if args.max_waste or args.hot or type_scores:
+        variants.extend(sweep_variants(_numbers(args.max_waste), _numbers(args.hot), type_scores))
+
+    for variant in variants:
+        try:
+            resolve_variant(variant)
+        except ValueError as e:
+            print(f"ERROR: {e}")
+            sys.exit(1)
+
+    print("Harvest Med Waste — Scoring Simulator (no data is modified)")
+    leads = load_leads(args.json)
+    if not leads:
+        print("No leads to score.")
+        sys.exit(0)
+
+    start = time.time()
+    simulator = ScoreSimulator(leads, top_n=args.top_n)
+    loaded = time.time()
+    results = simulator.run(variants)
+    elapsed = time.time() - loaded
+    print(f"  {len(leads):,} leads loaded in {loaded - start:.2f}s; "
+          f"{len(variants)} variants in {elapsed:.2f}s")
+    print()
+    print_results(results, simulator.top_n)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nSaved {len(results)} results to {args.output}")
@@ -0,0 +1,303 @@
+"""
+zip_centroids.py — 5-digit ZIP (ZCTA) centroid table with nearest/radius queries.
+
+Centroids are packaged in data/zcta_centroids.csv (zip5, lat, lon), built
+from the Census Gazetteer ZCTA file (--build) or, where that download isn't
+reachable, from the zips.json.bz2 point data of the MIT-licensed `zipcodes`
+PyPI package (--build-zipcodes; active ZIPs of every type, so PO Box and
+unique ZIPs resolve too). The packaged table for prefixes 350-369 was built
+with --build-zipcodes from zipcodes 1.2.0. They're held in flat NumPy arrays:
+  - O(1) lookup through a dense 100,000-slot ZIP → row index
+  - a KD-tree over unit-sphere vectors for nearest-ZIP and radius queries
+    (chord distance is monotonic in great-circle distance, so Euclidean
+    pruning on the sphere is exact)
+
+Shared by geo_distance.get_zip_coords() and score_leads' proximity
+fallback; both fall back to the 3-digit prefix table for ZIPs missing here.
+
+Usage:
+    python tools/zip_centroids.py --build 2023_Gaz_zcta_national.txt --prefixes 350-369
+    python tools/zip_centroids.py --build-zipcodes zipcodes/zips.json.bz2 --prefixes 350-369
+    python tools/zip_centroids.py --lookup 35233
+    python tools/zip_centroids.py --near 33.5207,-86.8025 --radius 30
+"""
+
+import argparse
+import bz2
+import csv
+import heapq
+import json
+import math
+import os
+
+import numpy as np
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ZCTA_CENTROIDS_FILE = os.path.join(PROJECT_ROOT, "data", "zcta_centroids.csv")
+
+EARTH_RADIUS_MILES = 3959
+KDTREE_LEAF_SIZE = 16
+
+
+def _unit_vectors(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    return np.column_stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)))
+
+
+def _chord_to_miles(chord):
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(chord / 2, 1.0))
+
+
+def _miles_to_chord(miles):
+    return 2 * math.sin(min(miles / (2 * EARTH_RADIUS_MILES), math.pi / 2))
+
+
+class KDTree:
+    """Static 3-d KD-tree stored as one permutation array.
+
+    Node for index range [start, end) splits at mid = (start + end) // 2 on
+    axis depth % 3; ranges of at most KDTREE_LEAF_SIZE points are leaves
+    scanned with NumPy.
+    """
+
+    def __init__(self, points):
+        self.points = points
+        self.index = np.arange(len(points))
+        self._build(0, len(points), 0)
+
+    def _build(self, start, end, depth):
+        if end - start <= KDTREE_LEAF_SIZE:
+            return
+        axis = depth % 3
+        idx = self.index[start:end]
+        self.index[start:end] = idx[np.argsort(self.points[idx, axis], kind="stable")]
+        mid = (start + end) // 2
+        self._build(start, mid, depth + 1)
+        self._build(mid + 1, end, depth + 1)
+
+    def nearest(self, point, k=1):
+        """Return [(chord distance, point index)] for the k nearest points."""
+        heap = []  # Max-heap of (-distance, index)
+
+        def consider(indices):
+            dists = np.linalg.norm(self.points[indices] - point, axis=1)
+            for d, i in zip(dists.tolist(), indices.tolist()):
+                if len(heap) < k:
+                    heapq.heappush(heap, (-d, i))
+                elif d < -heap[0][0]:
+                    heapq.heapreplace(heap, (-d, i))
+
+        def visit(start, end, depth):
+            if end - start <= KDTREE_LEAF_SIZE:
+                if end > start:
+                    consider(self.index[start:end])
+                return
+            mid = (start + end) // 2
+            axis = depth % 3
+            diff = point[axis] - self.points[self.index[mid], axis]
+            near, far = ((start, mid), (mid + 1, end)) if diff < 0 else ((mid + 1, end), (start, mid))
+            visit(*near, depth + 1)
+            if len(heap) < k or abs(diff) < -heap[0][0]:
+                consider(self.index[mid:mid + 1])
+                visit(*far, depth + 1)
+
+        visit(0, len(self.points), 0)
+        return sorted((-d, i) for d, i in heap)
+
+    def within(self, point, radius):
+        """Return [(chord distance, point index)] within `radius`, nearest first."""
+        found = []
+
+        def consider(indices):
+            dists = np.linalg.norm(self.points[indices] - point, axis=1)
+            hits = dists <= radius
+            found.extend(zip(dists[hits].tolist(), indices[hits].tolist()))
+
+        def visit(start, end, depth):
+            if end - start <= KDTREE_LEAF_SIZE:
+                if end > start:
+                    consider(self.index[start:end])
+                return
+            mid = (start + end) // 2
+            axis = depth % 3
+            diff = point[axis] - self.points[self.index[mid], axis]
+            consider(self.index[mid:mid + 1])
+            if diff - radius <= 0:
+                visit(start, mid, depth + 1)
+            if diff + radius >= 0:
+                visit(mid + 1, end, depth + 1)
+
+        visit(0, len(self.points), 0)
+        return sorted(found)
+
+
+class ZipCentroids:
+    """5-digit ZIP centroids in flat arrays, with a KD-tree built on demand."""
+
+    def __init__(self, zips, lats, lons):
+        self.zips = np.asarray(zips, dtype=np.int32)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self._row = np.full(100000, -1, dtype=np.int32)
+        self._row[self.zips] = np.arange(len(self.zips), dtype=np.int32)
+        self._tree = None
+
+    @classmethod
+    def load(cls, path=ZCTA_CENTROIDS_FILE):
+        """Load the packaged table; an empty table if it hasn't been built."""
+        zips, lats, lons = [], [], []
+        if os.path.exists(path):
+            with open(path, newline="") as f:
+                for rec in csv.DictReader(f):
+                    zips.append(int(rec["zip5"]))
+                    lats.append(float(rec["lat"]))
+                    lons.append(float(rec["lon"]))
+        return cls(zips, lats, lons)
+
+    def __len__(self):
+        return len(self.zips)
+
+    def coords(self, zip5):
+        """O(1) centroid lookup. Returns (lat, lon) or (None, None)."""
+        zip5 = (zip5 or "").strip()[:5]
+        if len(zip5) != 5 or not zip5.isdigit():
+            return None, None
+        row = self._row[int(zip5)]
+        if row < 0:
+            return None, None
+        return float(self.lats[row]), float(self.lons[row])
+
+    @property
+    def tree(self):
+        if self._tree is None:
+            self._tree = KDTree(_unit_vectors(self.lats, self.lons))
+        return self._tree
+
+    def _results(self, hits):
+        if not hits:
+            return []
+        chords, rows = zip(*hits)
+        miles = _chord_to_miles(np.asarray(chords))
+        return [(f"{self.zips[r]:05d}", float(m)) for r, m in zip(rows, miles)]
+
+    def nearest(self, lat, lon, k=1):
+        """The k ZIPs whose centroids are nearest to a point: [(zip5, miles)]."""
+        if not len(self):
+            return []
+        return self._results(self.tree.nearest(_unit_vectors([lat], [lon])[0], k))
+
+    def within(self, lat, lon, radius_miles):
+        """ZIPs with centroids within `radius_miles` of a point, nearest first."""
+        if not len(self):
+            return []
+        return self._results(self.tree.within(_unit_vectors([lat], [lon])[0],
+                                              _miles_to_chord(radius_miles)))
+
+
+_centroids = None
+
+
+def get_zip_centroids():
+    """Process-wide table, loaded on first use."""
+    global _centroids
+    if _centroids is None:
+        _centroids = ZipCentroids.load()
+    return _centroids
+
+
+def _parse_prefixes(spec):
+    """"350-369,386" → set of 3-digit prefixes."""
+    prefixes = set()
+    for part in spec.split(","):
+        lo, _, hi = part.strip().partition("-")
+        prefixes.update(f"{p:03d}" for p in range(int(lo), int(hi or lo) + 1))
+    return prefixes
+
+
+def build_from_gazetteer(gazetteer_file, path=ZCTA_CENTROIDS_FILE, prefixes=None):
+    """Write the packaged table from a Census Gazetteer ZCTA file. Returns rows."""
+    rows = []
+    with open(gazetteer_file, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f, delimiter="\t")
+        header = [h.strip().upper() for h in next(reader)]
+        for values in reader:
+            rec = dict(zip(header, values))
+            zip5 = rec.get("GEOID", "").strip()
+            if len(zip5) != 5 or (prefixes and zip5[:3] not in prefixes):
+                continue
+            try:
+                rows.append((zip5, float(rec["INTPTLAT"]), float(rec["INTPTLONG"])))
+            except (KeyError, ValueError):
+                continue
+
+    return _write_table(rows, path)
+
+
+def build_from_zipcodes(zips_file, path=ZCTA_CENTROIDS_FILE, prefixes=None):
+    """Write the packaged table from the `zipcodes` package's zips.json(.bz2). Returns rows."""
+    opener = bz2.open if zips_file.endswith(".bz2") else open
+    with opener(zips_file, "rt", encoding="utf-8") as f:
+        entries = json.load(f)
+
+    rows = []
+    for rec in entries:
+        zip5 = (rec.get("zip_code") or "").strip()
+        if len(zip5) != 5 or not rec.get("active") or (prefixes and zip5[:3] not in prefixes):
+            continue
+        try:
+            lat, lon = float(rec["lat"]), float(rec["long"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        # Entries without a location carry 0, 0
+        if lat and lon:
+            rows.append((zip5, lat, lon))
+    return _write_table(rows, path)
+
+
+def _write_table(rows, path):
+    rows.sort()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["zip5", "lat", "lon"])
+        writer.writerows((z, f"{lat:.6f}", f"{lon:.6f}") for z, lat, lon in rows)
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query the 5-digit ZIP centroid table")
+    parser.add_argument("--build", metavar="GAZETTEER_FILE",
+                        help="Census Gazetteer ZCTA file to build data/zcta_centroids.csv from")
+    parser.add_argument("--build-zipcodes", metavar="ZIPS_JSON",
+                        help="zipcodes package zips.json(.bz2) to build data/zcta_centroids.csv from")
+    parser.add_argument("--prefixes", help="Keep only these 3-digit prefixes, e.g. 350-369")
+    parser.add_argument("--lookup", metavar="ZIP", help="Print a ZIP's centroid")
+    parser.add_argument("--near", metavar="LAT,LON", help="Nearest ZIPs to a point")
+    parser.add_argument("--radius", type=float, help="With --near: all ZIPs within this many miles")
+    args = parser.parse_args()
+
+    if args.build or args.build_zipcodes:
+        prefixes = _parse_prefixes(args.prefixes) if args.prefixes else None
+        if args.build:
+            count = build_from_gazetteer(args.build, prefixes=prefixes)
+        else:
+            count = build_from_zipcodes(args.build_zipcodes, prefixes=prefixes)
+        print(f"Saved {count} ZIP centroids to {ZCTA_CENTROIDS_FILE}")
+        return
+
+    centroids = get_zip_centroids()
+    if args.lookup:
+        print(centroids.coords(args.lookup))
+    elif args.near:
+        lat, lon = (float(v) for v in args.near.split(","))
+        results = (centroids.within(lat, lon, args.radius) if args.radius
+                   else centroids.nearest(lat, lon, k=5))
+        for zip5, miles in results:
+            print(f"  {zip5}  {miles:6.1f} mi")
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()